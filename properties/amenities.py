@@ -0,0 +1,78 @@
+import threading
+import time
+from django.core.cache import cache
+from django.db import transaction
+from .models import Amenity, amenity_slug, clean_amenity_name
+
+
+class AmenityCache:
+    """
+    Per-process copy of the amenity vocabulary, slug -> id.
+
+    The vocabulary is small and read on every property write, so the first
+    lookup in a process loads all of it and later lookups are dict reads.
+    A version kept in the shared cache is bumped whenever an amenity is
+    created, changed or deleted (see properties.signals), and a process
+    seeing a new version reloads.
+    """
+
+    version_key = "amenity_vocabulary_version"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.ids = {}
+
+    def current(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            version = self.bump()
+        with self.lock:
+            if self.version == version:
+                return self.ids
+        ids = dict(Amenity.objects.values_list("slug", "id"))
+        with self.lock:
+            self.version, self.ids = version, ids
+        return ids
+
+    def resolve(self, names, create=True):
+        """
+        Map each of ``names`` to an amenity id, creating the missing amenities
+        with one insert when ``create`` is set. Names differing only in case
+        or spacing map to the same id; unknown names are left out otherwise.
+        """
+        slugs = {name: amenity_slug(name) for name in names if name.strip()}
+        ids = self.current()
+        missing = {slug for slug in slugs.values() if slug not in ids}
+        if missing and create:
+            new = {}
+            for name, slug in slugs.items():
+                if slug in missing:
+                    new.setdefault(slug, clean_amenity_name(name))
+            # A concurrent writer may insert the same slug; theirs wins.
+            Amenity.objects.bulk_create(
+                [Amenity(name=name, slug=slug) for slug, name in new.items()],
+                ignore_conflicts=True,
+            )
+            # The new rows are only cached once they are committed.
+            created = Amenity.objects.filter(slug__in=missing).values_list("slug", "id")
+            ids = {**ids, **dict(created)}
+            transaction.on_commit(self.invalidate)
+        return {name: ids[slug] for name, slug in slugs.items() if slug in ids}
+
+    def invalidate(self):
+        with self.lock:
+            self.version = None
+        self.bump()
+
+    def bump(self):
+        try:
+            return cache.incr(self.version_key)
+        except ValueError:
+            # Seed from the clock so a lost key never matches an old version.
+            version = time.time_ns()
+            cache.set(self.version_key, version, timeout=None)
+            return version
+
+
+amenity_cache = AmenityCache()
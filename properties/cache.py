@@ -0,0 +1,166 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlencode
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+VERSION_KEY = "properties:response_version"
+HITS_KEY = "properties:response_hits"
+MISSES_KEY = "properties:response_misses"
+RESPONSE_TIMEOUT = 300
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seed from the clock so a lost version key never reuses old entries.
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, int(time.time() * 1000), timeout=None)
+
+
+# Hit/miss counts are buffered per process and flushed at most once per
+# interval, so counting does not turn every cached read into a cache write.
+COUNTER_FLUSH_INTERVAL = 5
+_pending_counts = Counter()
+_pending_lock = threading.Lock()
+_flushed_at = time.monotonic()
+
+
+def increment(key):
+    global _flushed_at
+    with _pending_lock:
+        _pending_counts[key] += 1
+        if time.monotonic() - _flushed_at < COUNTER_FLUSH_INTERVAL:
+            return
+        pending = dict(_pending_counts)
+        _pending_counts.clear()
+        _flushed_at = time.monotonic()
+    flush_counts(pending)
+
+
+def flush_counts(pending):
+    for key, delta in pending.items():
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            cache.add(key, 0, timeout=None)
+            cache.incr(key, delta)
+
+
+def stats():
+    with _pending_lock:
+        pending = dict(_pending_counts)
+        _pending_counts.clear()
+    flush_counts(pending)
+    hits = cache.get(HITS_KEY) or 0
+    misses = cache.get(MISSES_KEY) or 0
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else 0.0,
+        "version": get_version(),
+    }
+
+
+def response_key(request):
+    params = sorted(request.query_params.lists())
+    query = urlencode([(k, v) for k, values in params for v in values])
+    raw = f"{request.get_host()}{request.path}?{query}"
+    digest = hashlib.md5(raw.encode("utf-8")).hexdigest()
+    return f"properties:response:{get_version()}:{digest}"
+
+
+def compute_etag(data):
+    return '"%s"' % hashlib.md5(JSONRenderer().render(data)).hexdigest()
+
+
+def etag_matches(request, etag):
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    candidates = [c.strip().removeprefix("W/") for c in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class CachedResponseMixin:
+    """
+    Cache anonymous GET responses keyed on the host, path and normalized
+    query string. Keys embed a version that properties.signals bumps on any
+    listing change, so stale entries are simply never read again.
+    Responses carry an ETag and conditional requests get a 304.
+    """
+
+    cache_timeout = RESPONSE_TIMEOUT
+
+    def get(self, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return super().get(request, *args, **kwargs)
+
+        key = response_key(request)
+        entry = cache.get(key)
+        response = None
+        if entry is None:
+            response = super().get(request, *args, **kwargs)
+            entry = self.make_entry(response)
+            if entry is None:
+                return response
+            cache.set(key, entry, timeout=self.cache_timeout)
+        return self.cached_response(request, entry, response)
+
+    def is_cacheable(self, request):
+        return not (request.user and request.user.is_authenticated)
+
+    def make_entry(self, response):
+        if response.status_code != status.HTTP_200_OK:
+            return None
+        return {"data": response.data, "etag": compute_etag(response.data)}
+
+    def cached_response(self, request, entry, response=None):
+        """
+        Finish a cacheable response: ``response`` is the freshly rendered one
+        on a miss and None when ``entry`` came from the cache.
+        """
+        if response is None:
+            increment(HITS_KEY)
+            response = Response(entry["data"])
+            response["X-Cache"] = "HIT"
+        else:
+            increment(MISSES_KEY)
+            response["X-Cache"] = "MISS"
+
+        if etag_matches(request, entry["etag"]):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        response["ETag"] = entry["etag"]
+        return response
+
+
+class AsyncCachedResponseMixin(CachedResponseMixin):
+    """CachedResponseMixin for views whose ``get`` is a coroutine."""
+
+    async def get(self, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return await super().get(request, *args, **kwargs)
+
+        key = response_key(request)
+        entry = await cache.aget(key)
+        response = None
+        if entry is None:
+            response = await super().get(request, *args, **kwargs)
+            entry = self.make_entry(response)
+            if entry is None:
+                return response
+            await cache.aset(key, entry, timeout=self.cache_timeout)
+        return self.cached_response(request, entry, response)
@@ -0,0 +1,122 @@
+"""
+The property change log (PropertyChange).
+
+Every property save, delete and import is logged with one row per
+property. A cache stores the log position it was computed at (``head()``)
+and later asks ``changed_since(position)`` which properties changed after
+it, one range scan on ``created_at``, to decide whether its entry is still
+good.
+
+The rows of a transaction are written together once it commits, with one
+insert, and the head position (the time of the latest write) is then
+published in the shared cache, so checking for "no changes" costs no
+query. Neither ids nor timestamps are in commit order across processes: a
+row can become visible just after a later position was published.
+``changed_since()`` therefore re-scans GRACE behind the position it is
+given; seeing a change twice only costs a recheck. A process that dies
+between its commit and the log write loses the change; cached results
+are recomputed after RESULTS_FRESH_SECONDS regardless.
+
+Writing the log also drops the properties' serialized fragments. Rows
+older than RETENTION are removed by the ``prune_property_changes``
+command; nothing reads that far back.
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from . import fragments
+from .models import PropertyChange
+
+HEAD_KEY = "properties:change_head"
+RETENTION = timedelta(days=1)
+# How far behind a position changed_since() looks again: covers the log
+# insert's own commit and clock skew between servers.
+GRACE = timedelta(seconds=5)
+# changed_since() gives up (returns None) past this many changes.
+MAX_CHANGES = 500
+
+local = threading.local()
+
+
+class Batch:
+    """The changes logged in one transaction, written once it commits."""
+
+    def __init__(self):
+        # property id -> deleted; the last write of a property wins.
+        self.changes = {}
+
+    def add(self, ids, deleted):
+        for i in ids:
+            self.changes[i] = deleted
+
+    def is_pending(self):
+        # False once the transaction it was registered in rolled back.
+        callbacks = transaction.get_connection().run_on_commit
+        return any(self.write in callback for callback in callbacks)
+
+    def write(self):
+        if getattr(local, "batch", None) is self:
+            local.batch = None
+        PropertyChange.objects.bulk_create(
+            [
+                PropertyChange(property_id=i, deleted=deleted)
+                for i, deleted in self.changes.items()
+            ]
+        )
+        fragments.invalidate(list(self.changes))
+        publish()
+
+
+def record(property_ids, deleted=False):
+    """Log a write of ``property_ids``, made in the caller's transaction."""
+    ids = list(dict.fromkeys(property_ids))
+    if not ids:
+        return
+    batch = getattr(local, "batch", None)
+    if batch is not None and batch.is_pending():
+        batch.add(ids, deleted)
+        return
+    batch = local.batch = Batch()
+    batch.add(ids, deleted)
+    # Outside a transaction this writes at once.
+    transaction.on_commit(batch.write)
+
+
+def publish():
+    position = time.time()
+    cache.set(HEAD_KEY, position, timeout=None)
+    return position
+
+
+def head():
+    """The position of the latest logged change."""
+    position = cache.get(HEAD_KEY)
+    if position is None:
+        position = publish()
+    return position
+
+
+def changed_since(position, limit=MAX_CHANGES):
+    """
+    Ids of the properties changed after ``position`` (and up to GRACE
+    before it), or None when there are more than ``limit`` changes and the
+    caller should start over.
+    """
+    since = datetime.fromtimestamp(position, tz=dt_timezone.utc) - GRACE
+    ids = list(
+        PropertyChange.objects.filter(created_at__gt=since).values_list(
+            "property_id", flat=True
+        )[: limit + 1]
+    )
+    if len(ids) > limit:
+        return None
+    return set(ids)
+
+
+def prune(older_than=RETENTION):
+    cutoff = timezone.now() - older_than
+    deleted, _ = PropertyChange.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,217 @@
+"""
+Read-only fast path for PropertySerializer.
+
+PropertySerializer's output is described once, below, as an ordered field
+spec of Python expressions over ``obj`` (a Property whose page has been
+preloaded, see properties.serializers.preload_property_page). At import the
+spec is compiled into a single function that builds the row dict in one
+pass, without DRF's per-field get_attribute/to_representation dispatch.
+
+The output must stay identical to PropertySerializer's DRF representation;
+properties.tests.FastSerializerParityTests checks it.
+"""
+from decimal import Decimal
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+
+DEFAULT_AVATAR = "https://example.com/avatar.jpg"
+
+
+def iso_datetime(value, tz):
+    """serializers.DateTimeField().to_representation() for aware datetimes."""
+    if not value:
+        return None
+    text = value.astimezone(tz).isoformat()
+    if text.endswith("+00:00"):
+        text = text[:-6] + "Z"
+    return text
+
+
+def decimal_string(value, places):
+    """serializers.DecimalField(decimal_places=places) output."""
+    if value is None:
+        return None
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value).strip())
+    return "{:f}".format(value.quantize(Decimal(1).scaleb(-places)))
+
+
+def prefetched(obj, name):
+    """Rows of a prefetched relation without cloning a queryset per call."""
+    cache = getattr(obj, "_prefetched_objects_cache", {})
+    if name in cache:
+        return cache[name]
+    return getattr(obj, name).all()
+
+
+def file_url(obj, field, default):
+    """
+    ``getattr(obj, field).url``, or ``default`` when no file is set. Local
+    filesystem URLs are built directly instead of through urljoin(), and
+    the FieldFile wrapper is skipped when the raw name is at hand.
+    """
+    value = obj.__dict__[field] if field in obj.__dict__ else getattr(obj, field)
+    name = getattr(value, "name", value)
+    if not name:
+        return default
+    return storage_url(obj._meta.get_field(field).storage, name)
+
+
+def storage_url(storage, name):
+    if (
+        isinstance(storage, FileSystemStorage)
+        and not name.startswith(("/", "."))
+        and ":" not in name
+    ):
+        return storage.base_url + filepath_to_uri(name)
+    return storage.url(name)
+
+
+def image_set(prop):
+    """
+    The property's photos, primary first, each with its size, blurhash and
+    per-format ``srcset`` strings. Until variants are built ``srcset`` is
+    empty and clients use ``url``, the original.
+    """
+    primary, others = [], []
+    for img in prefetched(prop, "images"):
+        url = file_url(img, "image", "")
+        if url:
+            entry = {
+                "id": img.id,
+                "url": url,
+                "is_primary": img.is_primary,
+                "width": img.width,
+                "height": img.height,
+                "blurhash": img.blurhash,
+                "srcset": srcset(img) if img.variants else {},
+            }
+            (primary if img.is_primary else others).append(entry)
+    return primary + others
+
+
+def srcset(img):
+    storage = img._meta.get_field("image").storage
+    entries = {}
+    for variant in img.variants:
+        url = storage_url(storage, variant["name"])
+        entries.setdefault(variant["format"], []).append(f"{url} {variant['width']}w")
+    return {fmt: ", ".join(urls) for fmt, urls in entries.items()}
+
+
+def owner_summary(user):
+    return {
+        "id": user.id,
+        "name": f"{user.firstname} {user.lastname}",
+        "phone": user.telephone,
+        "email": user.email,
+        "user_type": user.user_type,
+        "avatar": file_url(user, "avatar", DEFAULT_AVATAR),
+        "rating": float(user.rating or 0),
+        "reviews": user.review_count,
+        "whatsapp": getattr(user, "whatsapp", ""),
+        "social_links": {
+            "linkedin": getattr(user, "linkedin", ""),
+            "facebook": getattr(user, "facebook", ""),
+            "instagram": getattr(user, "instagram", ""),
+            "youtube": getattr(user, "youtube", ""),
+            "twitter": getattr(user, "twitter", ""),
+        },
+    }
+
+
+def review_summary(prop):
+    return {
+        "total_reviews": prop.review_count,
+        "average_rating": round(prop.average_rating or 0, 1),
+        "reviews_list": [
+            {
+                "id": i + 1,
+                "user": {
+                    "name": f"{r.user.firstname} {r.user.lastname}",
+                    "avatar": file_url(r.user, "avatar", DEFAULT_AVATAR),
+                },
+                "rating": r.rating,
+                "comment": r.comment,
+                "date": r.created_at,
+            }
+            for i, r in enumerate(prefetched(prop, "reviews"))
+        ],
+    }
+
+
+# Evaluated once per row before the fields.
+PROPERTY_SETUP = (
+    "current = now()",
+    "tz = get_current_timezone()",
+)
+# (output key, expression). Keys are in PropertySerializer.Meta.fields order
+# with the write-only fields left out.
+PROPERTY_FIELDS = (
+    ("id", "obj.id"),
+    ("title", "obj.title"),
+    ("description", "obj.description"),
+    ("price", "float(obj.max_price)"),
+    ("address", "obj.location"),
+    ("location", "obj.location"),
+    ("images", "[file_url(img, 'image', '') for img in prefetched(obj, 'images')]"),
+    ("image_set", "image_set(obj)"),
+    ("bedrooms", "obj.bedrooms"),
+    ("bathrooms", "obj.bathrooms"),
+    ("area", "f'{obj.area_sqft:,} sqft' if obj.area_sqft else None"),
+    ("type", "obj.type"),
+    ("city", "obj.city"),
+    ("state", "obj.state"),
+    ("country", "obj.country"),
+    ("area_sqft", "decimal_string(obj.area_sqft, 2)"),
+    ("category", "obj.category"),
+    ("furnished", "obj.furnished"),
+    ("serviced", "obj.serviced"),
+    ("keyword_tags", "obj.keyword_tags"),
+    ("created_at", "iso_datetime(obj.created_at, tz)"),
+    ("updated_at", "iso_datetime(obj.updated_at, tz)"),
+    ("amenities_display", "[a.name for a in prefetched(obj, 'amenities')]"),
+    ("owner", "owner_summary(obj.owner)"),
+    ("is_boosted", "bool(obj.boosted_until and obj.boosted_until > current)"),
+    ("boosted_until", "iso_datetime(obj.boosted_until, tz)"),
+    ("is_featured", "bool(obj.featured_until and obj.featured_until > current)"),
+    ("featured_until", "iso_datetime(obj.featured_until, tz)"),
+    ("boost_rank", "obj.boost_rank"),
+    ("reviews", "review_summary(obj)"),
+    (
+        "location_details",
+        "{'latitude': obj.latitude, 'longitude': obj.longitude}",
+    ),
+)
+
+
+def compile_row_function(name, fields, namespace, setup=()):
+    """
+    Build ``name(obj)``: run the ``setup`` statements, then return a dict
+    literal of the ``fields`` spec.
+    """
+    body = "".join(f"\n    {statement}" for statement in setup)
+    items = "".join(f"\n        {key!r}: {expression}," for key, expression in fields)
+    source = f"def {name}(obj):{body}\n    return {{{items}\n    }}\n"
+    scope = dict(namespace)
+    exec(compile(source, f"<compiled {name}>", "exec"), scope)
+    return scope[name]
+
+
+property_row = compile_row_function(
+    "property_row",
+    PROPERTY_FIELDS,
+    {
+        "now": timezone.now,
+        "get_current_timezone": timezone.get_current_timezone,
+        "iso_datetime": iso_datetime,
+        "decimal_string": decimal_string,
+        "prefetched": prefetched,
+        "file_url": file_url,
+        "image_set": image_set,
+        "owner_summary": owner_summary,
+        "review_summary": review_summary,
+    },
+    PROPERTY_SETUP,
+)
@@ -0,0 +1,33 @@
+"""
+Per-property cache of serialized representations ("fragments"), so a page
+of known property ids is assembled with one cache read. Entries are
+dropped when the property or its images, reviews or amenity links change
+(see properties.signals and properties.changes); the timeout bounds
+staleness from anything else, such as a promotion running out.
+"""
+from django.core.cache import cache
+from .serializers import CARD_VIEW, FULL_VIEW
+
+FRAGMENT_TIMEOUT = 300
+VIEWS = (CARD_VIEW, FULL_VIEW)
+
+
+def fragment_key(view, property_id):
+    return f"properties:fragment:{view}:{property_id}"
+
+
+def get_many(view, ids):
+    """Cached representations of ``ids`` in ``view``, by id; misses left out."""
+    keys = {fragment_key(view, i): i for i in ids}
+    return {keys[key]: data for key, data in cache.get_many(list(keys)).items()}
+
+
+def set_many(view, data_by_id):
+    cache.set_many(
+        {fragment_key(view, i): data for i, data in data_by_id.items()},
+        timeout=FRAGMENT_TIMEOUT,
+    )
+
+
+def invalidate(ids):
+    cache.delete_many([fragment_key(view, i) for i in ids for view in VIEWS])
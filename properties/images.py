@@ -0,0 +1,251 @@
+"""
+Responsive variants for uploaded property photos.
+
+After a PropertyImage is saved (and the transaction commits), its id goes
+to a small per-process thread pool. The worker opens the original once,
+writes a WebP and a JPEG copy at each of VARIANT_WIDTHS narrower than the
+original, and records the original's size, a blurhash placeholder and the
+variant names on the row.
+
+Processing is idempotent: variant names are derived from the image id and
+the original's name, existing files are overwritten, and an image whose
+``processed_name`` already matches its current file is skipped unless
+forced. The ``process_images`` command (re)builds variants in bulk.
+"""
+import hashlib
+import io
+import logging
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from PIL import Image, ImageOps
+from raininfotech.settings import IMAGE_PROCESSING_ASYNC, IMAGE_PROCESSING_WORKERS
+from . import cache as response_cache
+from . import fragments
+from .models import PropertyImage
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (320, 640, 1024, 1600)
+# Pillow format, file extension, save options.
+VARIANT_FORMATS = {
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+VARIANT_DIR = "properties/variants"
+# Cards on list pages use the variant of this width and format, or the
+# widest one below it.
+THUMBNAIL = (640, "webp")
+BLURHASH_COMPONENTS = (4, 3)
+
+storage = PropertyImage._meta.get_field("image").storage
+
+
+def variant_name(image_id, source_name, width, extension):
+    # A new upload gets new names, so caches never serve the old photo.
+    digest = hashlib.sha1(source_name.encode("utf-8")).hexdigest()[:10]
+    return f"{VARIANT_DIR}/{image_id}/{digest}-{width}.{extension}"
+
+
+def variant_widths(width):
+    """Widths to build: the standard ones below ``width``, else ``width``."""
+    return [w for w in VARIANT_WIDTHS if w < width] or [width]
+
+
+def process_image(image_id, force=False):
+    """Build the variants of one PropertyImage; returns False if skipped."""
+    image = PropertyImage.objects.filter(id=image_id).first()
+    if image is None or not image.image:
+        return False
+    source_name = image.image.name
+    if image.processed_name == source_name and not force:
+        return False
+
+    with storage.open(source_name, "rb") as source:
+        original = Image.open(source)
+        original = ImageOps.exif_transpose(original)
+        original = original.convert("RGB")
+    width, height = original.size
+
+    variants = []
+    for target in variant_widths(width):
+        resized = original
+        if target != width:
+            size = (target, max(1, round(height * target / width)))
+            resized = original.resize(size, Image.Resampling.LANCZOS)
+        for fmt, (pil_format, extension, options) in VARIANT_FORMATS.items():
+            name = variant_name(image_id, source_name, target, extension)
+            save_file(name, resized, pil_format, options)
+            variants.append({"width": target, "format": fmt, "name": name})
+
+    fields = {
+        "width": width,
+        "height": height,
+        "blurhash": blurhash(original),
+        "variants": variants,
+        "thumbnail": thumbnail(variants),
+        "processed_name": source_name,
+    }
+    # update() rather than save(): no post_save, so no reprocessing loop, and
+    # nothing is written if the image was replaced meanwhile.
+    updated = PropertyImage.objects.filter(id=image_id, image=source_name).update(
+        **fields
+    )
+    if not updated:
+        delete_files(variant["name"] for variant in variants)
+        return False
+    current = {variant["name"] for variant in variants}
+    delete_files(v["name"] for v in image.variants if v["name"] not in current)
+    fragments.invalidate([image.property_id])
+    response_cache.bump_version()
+    return True
+
+
+def thumbnail(variants):
+    width, fmt = THUMBNAIL
+    fits = [v for v in variants if v["format"] == fmt and v["width"] <= width]
+    return max(fits, key=lambda v: v["width"])["name"] if fits else ""
+
+
+def save_file(name, image, pil_format, options):
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    if storage.exists(name):
+        storage.delete(name)
+    storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def delete_files(names):
+    for name in names:
+        try:
+            storage.delete(name)
+        except OSError:
+            logger.warning("Could not delete image variant %s", name)
+
+
+BASE83 = (
+    "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    "abcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+)
+
+
+def base83(value, length):
+    return "".join(
+        BASE83[(value // 83 ** (length - i)) % 83] for i in range(1, length + 1)
+    )
+
+
+def srgb_to_linear(value):
+    v = value / 255
+    return v / 12.92 if v <= 0.04045 else ((v + 0.055) / 1.055) ** 2.4
+
+
+def linear_to_srgb(value):
+    v = max(0.0, min(1.0, value))
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def sign_pow(value, exponent):
+    return math.copysign(abs(value) ** exponent, value)
+
+
+def blurhash(image, components=BLURHASH_COMPONENTS, sample_size=32):
+    """
+    Blurhash (https://blurha.sh) of an RGB image, computed on a small
+    downscale; the placeholder is blurry by design.
+    """
+    x_components, y_components = components
+    sample = image.copy()
+    sample.thumbnail((sample_size, sample_size))
+    width, height = sample.size
+    table = [srgb_to_linear(v) for v in range(256)]
+    data = sample.tobytes()
+    pixels = [
+        (table[data[k]], table[data[k + 1]], table[data[k + 2]])
+        for k in range(0, len(data), 3)
+    ]
+
+    factors = []
+    for j in range(y_components):
+        cos_y = [math.cos(math.pi * j * y / height) for y in range(height)]
+        for i in range(x_components):
+            cos_x = [math.cos(math.pi * i * x / width) for x in range(width)]
+            r = g = b = 0.0
+            for y in range(height):
+                row = y * width
+                for x in range(width):
+                    basis = cos_x[x] * cos_y[y]
+                    pr, pg, pb = pixels[row + x]
+                    r += basis * pr
+                    g += basis * pg
+                    b += basis * pb
+            scale = (1 if i == j == 0 else 2) / (width * height)
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = base83((x_components - 1) + (y_components - 1) * 9, 1)
+    if ac:
+        actual_max = max(abs(c) for factor in ac for c in factor)
+        quantised_max = max(0, min(82, int(actual_max * 166 - 0.5)))
+        maximum = (quantised_max + 1) / 166
+        result += base83(quantised_max, 1)
+    else:
+        maximum = 1
+        result += base83(0, 1)
+    r, g, b = (linear_to_srgb(c) for c in dc)
+    result += base83((r << 16) + (g << 8) + b, 4)
+    for factor in ac:
+        qr, qg, qb = (
+            max(0, min(18, int(sign_pow(c / maximum, 0.5) * 9 + 9.5))) for c in factor
+        )
+        result += base83(qr * 19 * 19 + qg * 19 + qb, 2)
+    return result
+
+
+class ImageProcessor:
+    """
+    Runs process_image on a thread pool so uploads return before the
+    variants exist; API responses fall back to the original until then.
+    """
+
+    def __init__(self, workers=2, enabled=True):
+        self.workers = workers
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.executor = None
+        self.pid = None
+
+    def submit(self, image_id, force=False):
+        if not self.enabled:
+            return self.run(image_id, force)
+        return self.get_executor().submit(self.run, image_id, force)
+
+    def run(self, image_id, force=False):
+        try:
+            return process_image(image_id, force=force)
+        except Exception:
+            logger.exception("Error processing property image %s", image_id)
+            return False
+        finally:
+            if self.enabled:
+                close_old_connections()
+
+    def get_executor(self):
+        # Pool threads do not survive fork(); each worker process makes its own.
+        with self.lock:
+            if self.executor is None or self.pid != os.getpid():
+                self.executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="property-images"
+                )
+                self.pid = os.getpid()
+            return self.executor
+
+
+image_processor = ImageProcessor(
+    workers=IMAGE_PROCESSING_WORKERS, enabled=IMAGE_PROCESSING_ASYNC
+)
@@ -0,0 +1,192 @@
+"""
+Bulk property import from CSV or JSON Lines.
+
+Rows are validated with the same PropertySerializer the create endpoint
+uses, then written a batch at a time: the batch's amenity names are
+resolved together (creating the missing ones with one bulk insert), and
+properties and their amenity links go in with bulk_create. Invalid rows
+are reported with their row number and skipped; they do not fail the
+rest of the batch. A file that stops parsing part way (a broken CSV quote,
+bad UTF-8) ends the import: the rows read so far are still written and the
+result carries the error, since earlier batches are already committed.
+
+bulk_create bypasses post_save, so each committed batch sends
+properties.signals.properties_imported instead; the search index and the
+response cache listen to it.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from django.db import connection, transaction
+from rest_framework.exceptions import ValidationError
+from .amenities import amenity_cache
+from .models import Property
+from .serializers import PropertySerializer
+from .signals import properties_imported
+
+CSV = "csv"
+JSONL = "jsonl"
+FORMATS = (CSV, JSONL)
+# Separates the items of list columns (amenities, keyword_tags) in CSV.
+LIST_SEPARATOR = "|"
+LIST_COLUMNS = ("amenities", "keyword_tags")
+DEFAULT_BATCH_SIZE = 500
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    errors: list = field(default_factory=list)
+    # Why reading stopped before the end of the file, if it did.
+    error: str = None
+
+    @property
+    def failed(self):
+        return len(self.errors)
+
+    def add_error(self, row, detail):
+        self.errors.append({"row": row, "errors": detail})
+
+    def as_dict(self, max_errors=None):
+        errors = self.errors if max_errors is None else self.errors[:max_errors]
+        data = {"created": self.created, "failed": self.failed, "errors": errors}
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+def detect_format(filename, declared=None):
+    if declared:
+        return declared
+    if filename and filename.lower().endswith((".jsonl", ".ndjson", ".json")):
+        return JSONL
+    return CSV
+
+
+def read_rows(stream, fmt):
+    """
+    Yield ``(row number, data)`` from a text stream. A line that cannot be
+    parsed yields a ValidationError in place of its data.
+    """
+    if fmt == CSV:
+        for number, row in enumerate(csv.DictReader(stream), start=1):
+            yield number, csv_row(row)
+    elif fmt == JSONL:
+        number = 0
+        for line in stream:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                data = json.loads(line)
+            except ValueError as exc:
+                yield number, ValidationError({"non_field_errors": [str(exc)]})
+                continue
+            if not isinstance(data, dict):
+                data = ValidationError({"non_field_errors": ["Expected an object."]})
+            yield number, data
+    else:
+        raise ValueError(f"Unknown import format {fmt!r}; use one of {FORMATS}.")
+
+
+def csv_row(row):
+    # Empty cells mean "not given" so that field defaults apply.
+    data = {key.strip(): value for key, value in row.items() if key and value != ""}
+    for column in LIST_COLUMNS:
+        if column in data:
+            data[column] = [
+                item.strip()
+                for item in data[column].split(LIST_SEPARATOR)
+                if item.strip()
+            ]
+    return data
+
+
+def text_stream(uploaded):
+    """Text view of an uploaded file, decoding UTF-8 (with or without BOM)."""
+    return io.TextIOWrapper(uploaded, encoding="utf-8-sig", newline="")
+
+
+def import_properties(rows, owner, batch_size=DEFAULT_BATCH_SIZE):
+    """Import ``(row number, data)`` pairs for ``owner``; returns an ImportResult."""
+    result = ImportResult()
+    # One serializer validates every row, as ListSerializer does with its child.
+    serializer = PropertySerializer()
+    batch = []
+    number = 0
+    try:
+        for number, data in rows:
+            if isinstance(data, ValidationError):
+                result.add_error(number, data.detail)
+                continue
+            try:
+                batch.append(serializer.run_validation(data))
+            except ValidationError as exc:
+                result.add_error(number, exc.detail)
+                continue
+            if len(batch) >= batch_size:
+                result.created += write_batch(batch, owner)
+                batch = []
+    except (UnicodeDecodeError, csv.Error) as exc:
+        result.error = f"Stopped reading after row {number}: {exc}"
+    if batch:
+        result.created += write_batch(batch, owner)
+    return result
+
+
+def write_batch(batch, owner):
+    properties, amenity_names = [], []
+    for validated_data in batch:
+        names = validated_data.pop("amenities", [])
+        price = validated_data.pop("price_input", None)
+        if price is not None:
+            validated_data["max_price"] = price
+        prop = Property(owner=owner, **validated_data)
+        prop.set_derived_fields()  # save() is skipped
+        properties.append(prop)
+        amenity_names.append(names)
+
+    with transaction.atomic():
+        # First spelling seen names a new amenity.
+        amenity_ids = amenity_cache.resolve(
+            dict.fromkeys(name for names in amenity_names for name in names)
+        )
+        Property.objects.bulk_create(properties)
+        if not connection.features.can_return_rows_from_bulk_insert:
+            set_inserted_ids(properties, owner)
+        Through = Property.amenities.through
+        Through.objects.bulk_create(
+            [
+                Through(property_id=prop.pk, amenity_id=amenity_id)
+                for prop, names in zip(properties, amenity_names)
+                # Spellings of one amenity share an id; link it once.
+                for amenity_id in dict.fromkeys(
+                    amenity_ids[name] for name in names if name in amenity_ids
+                )
+            ]
+        )
+        transaction.on_commit(
+            lambda: properties_imported.send(sender=Property, instances=properties)
+        )
+    return len(properties)
+
+
+
+def set_inserted_ids(properties, owner):
+    """
+    Read back the ids bulk_create() cannot return on this backend (MySQL).
+    Each row keeps the created_at its insert stamped on it; within one
+    INSERT ids ascend in row order, so rows sharing a stamp pair up by id.
+    """
+    stamps = {prop.created_at for prop in properties}
+    ids = list(
+        Property.objects.filter(owner=owner, created_at__in=stamps)
+        .order_by("created_at", "id")
+        .values_list("id", flat=True)
+    )
+    if len(ids) != len(properties):
+        raise RuntimeError("Could not match imported rows to their ids.")
+    # sorted() is stable: rows sharing a stamp stay in insert order.
+    for prop, pk in zip(sorted(properties, key=lambda p: p.created_at), ids):
+        prop.pk = pk
@@ -0,0 +1,143 @@
+import json
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from properties.models import Amenity, Property, PropertyImage, PropertyReview
+from properties.serializers import PropertySerializer
+from raininfotech.renderers import FastJSONRenderer, orjson
+from users.models import Users
+
+
+class DRFPropertySerializer(PropertySerializer):
+    fast_representation = False
+
+
+class Command(BaseCommand):
+    help = (
+        "Serialize a synthetic, fully preloaded page of properties (no "
+        "database access) with the DRF field machinery and with the compiled "
+        "fast path, and time JSON encoding with the stdlib and orjson."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument("--reviews", type=int, default=3)
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        properties = self.build(rng, options["rows"], options["reviews"])
+        repeat = options["repeat"]
+
+        drf_time, drf_data = self.best(
+            repeat, lambda: DRFPropertySerializer(properties, many=True).data
+        )
+        fast_time, fast_data = self.best(
+            repeat, lambda: PropertySerializer(properties, many=True).data
+        )
+        if fast_data != drf_data:
+            self.stderr.write(self.style.ERROR("Fast path output differs from DRF!"))
+
+        stdlib_time, body = self.best(repeat, lambda: JSONRenderer().render(fast_data))
+        rows = len(properties)
+        self.report("serialize, DRF fields", drf_time, rows)
+        self.report("serialize, compiled", fast_time, rows)
+        self.report("encode, json", stdlib_time, rows)
+        if orjson is not None:
+            orjson_time, _ = self.best(
+                repeat, lambda: FastJSONRenderer().render(fast_data)
+            )
+            self.report("encode, orjson", orjson_time, rows)
+        else:
+            self.stdout.write("encode, orjson: not installed")
+        self.stdout.write(f"payload: {len(body) / 1024:.0f} KiB")
+
+    def best(self, repeat, func):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def report(self, label, seconds, rows):
+        self.stdout.write(
+            f"{label:<24}{seconds * 1000:>9.1f} ms"
+            f"{seconds / rows * 1e6:>9.1f} us/row"
+        )
+
+    def build(self, rng, count, review_count):
+        """Unsaved instances wired up the way preload_property_page leaves them."""
+        now = timezone.now()
+        amenities = [Amenity(id=i, name=name) for i, name in enumerate(
+            ["Pool", "Gym", "Parking", "Security", "Generator"], start=1
+        )]
+        users = [
+            Users(
+                id=i,
+                firstname=f"First{i}",
+                lastname=f"Last{i}",
+                email=f"user{i}@example.com",
+                telephone=f"0800{i:07d}",
+                user_type="owner",
+                rating=4.2,
+                review_count=12,
+            )
+            for i in range(1, 51)
+        ]
+        properties = []
+        for i in range(1, count + 1):
+            prop = Property(
+                id=i,
+                title=f"Property {i}",
+                description="Spacious and bright, close to the marina. " * 4,
+                location=f"{i} Marina Road",
+                city="Lagos",
+                state="Lagos",
+                country="Nigeria",
+                area_sqft=Decimal("1250.00"),
+                bedrooms=rng.randint(1, 5),
+                bathrooms=rng.randint(1, 4),
+                max_price=Decimal(rng.randint(100, 900) * 10000),
+                keyword_tags=["sea view"],
+                created_at=now,
+                updated_at=now,
+                boosted_until=now + timedelta(days=rng.randint(-5, 5)),
+                boost_rank=rng.randint(0, 3),
+                latitude=Decimal("6.524400"),
+                longitude=Decimal("3.379200"),
+                review_count=review_count,
+                average_rating=4.0,
+            )
+            prop.owner = rng.choice(users)
+            images = [
+                PropertyImage(id=i * 10 + n, image=f"properties/{i}-{n}.jpg")
+                for n in range(3)
+            ]
+            reviews = []
+            for n in range(review_count):
+                review = PropertyReview(
+                    id=i * 10 + n, rating=4, comment="Great place", created_at=now
+                )
+                review.user = rng.choice(users)
+                reviews.append(review)
+            prop._prefetched_objects_cache = {
+                "images": self.cached(prop.images, images),
+                "amenities": self.cached(prop.amenities, rng.sample(amenities, 3)),
+                "reviews": self.cached(prop.reviews, reviews),
+            }
+            prop._page_preloaded = True
+            properties.append(prop)
+        return properties
+
+    def cached(self, manager, rows):
+        queryset = manager.get_queryset()
+        queryset._result_cache = rows
+        queryset._prefetch_done = True
+        return queryset
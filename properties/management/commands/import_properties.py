@@ -0,0 +1,60 @@
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from properties import importer
+from users.models import Users
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-import listings for one owner from a CSV (header row, list "
+        "columns separated by '|') or JSON Lines file. Invalid rows are "
+        "reported and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--owner", required=True, help="Owner id or email.")
+        parser.add_argument("--format", choices=importer.FORMATS)
+        parser.add_argument(
+            "--batch-size", type=int, default=importer.DEFAULT_BATCH_SIZE
+        )
+        parser.add_argument("--max-errors", type=int, default=50)
+
+    def handle(self, *args, **options):
+        owner = self.get_owner(options["owner"])
+        fmt = importer.detect_format(options["path"], options["format"])
+        start = time.perf_counter()
+        try:
+            with open(options["path"], encoding="utf-8-sig", newline="") as stream:
+                result = importer.import_properties(
+                    importer.read_rows(stream, fmt),
+                    owner,
+                    batch_size=options["batch_size"],
+                )
+        except OSError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - start
+
+        for error in result.errors[: options["max_errors"]]:
+            self.stderr.write(f"row {error['row']}: {json.dumps(error['errors'])}")
+        if result.failed > options["max_errors"]:
+            self.stderr.write(f"... {result.failed - options['max_errors']} more")
+        rate = result.created / elapsed * 60 if elapsed else 0
+        summary = (
+            f"Imported {result.created} properties, {result.failed} rows "
+            f"failed, in {elapsed:.1f}s ({rate:.0f}/min)."
+        )
+        if result.error:
+            raise CommandError(f"{result.error}\n{summary}")
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    def get_owner(self, value):
+        lookup = {"id": value} if value.isdigit() else {"email": value}
+        try:
+            owner = Users.objects.get(**lookup)
+        except Users.DoesNotExist:
+            raise CommandError(f"No user {value!r}.")
+        if owner.user_type != "owner":
+            raise CommandError(f"{value!r} is not an owner.")
+        return owner
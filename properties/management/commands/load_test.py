@@ -0,0 +1,179 @@
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = [
+    "/api/v1/properties/",
+    "/api/v1/properties/?page_size=50",
+    "/api/v1/search/advanced/?city=Lagos",
+]
+
+CLIENT_ERRORS = (OSError, ValueError, asyncio.TimeoutError, asyncio.IncompleteReadError)
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive one or more running servers with concurrent keep-alive clients "
+        "and report requests/sec and latency percentiles. To compare WSGI "
+        "and ASGI, start e.g. `gunicorn raininfotech.wsgi -w 1 --threads 8 "
+        "-b :8000` and `uvicorn raininfotech.asgi:application --port 8001`, "
+        "then run: load_test --target wsgi=http://127.0.0.1:8000 "
+        "--target asgi=http://127.0.0.1:8001"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target",
+            action="append",
+            required=True,
+            help="NAME=BASE_URL; repeat to compare servers.",
+        )
+        parser.add_argument("--concurrency", type=int, default=200)
+        parser.add_argument("--duration", type=float, default=20.0)
+        parser.add_argument("--warmup", type=float, default=2.0)
+        parser.add_argument("--timeout", type=float, default=30.0)
+        parser.add_argument(
+            "--path",
+            action="append",
+            help="Request path, repeatable; clients cycle through them.",
+        )
+        parser.add_argument(
+            "--search",
+            action="append",
+            default=[],
+            help="Also POST this string to the advanced search, repeatable.",
+        )
+        parser.add_argument("--host", default="localhost", help="Host header.")
+
+    def handle(self, *args, **options):
+        requests = [("GET", path, None) for path in options["path"] or DEFAULT_PATHS]
+        requests += [
+            ("POST", "/api/v1/search/advanced/", json.dumps({"search": text}))
+            for text in options["search"]
+        ]
+
+        results = {}
+        for target in options["target"]:
+            name, sep, base_url = target.partition("=")
+            if not sep:
+                raise CommandError(f"Expected NAME=BASE_URL, got {target!r}")
+            url = urlsplit(base_url)
+            if url.scheme != "http" or not url.hostname:
+                raise CommandError(f"Only http:// targets are supported: {base_url}")
+            self.stdout.write(
+                f"{name}: {options['concurrency']} clients against {base_url}"
+            )
+            results[name] = asyncio.run(
+                run_load(
+                    url.hostname,
+                    url.port or 80,
+                    options["host"],
+                    requests,
+                    options["concurrency"],
+                    options["duration"],
+                    options["warmup"],
+                    options["timeout"],
+                )
+            )
+
+        self.stdout.write(
+            f"{'target':<12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+            f"{'max ms':>10}{'errors':>8}"
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<12}{result['rps']:>10.1f}{result['p50']:>10.1f}"
+                f"{result['p99']:>10.1f}{result['max']:>10.1f}{result['errors']:>8}"
+            )
+
+
+async def run_load(
+    host, port, host_header, requests, concurrency, duration, warmup, timeout
+):
+    latencies = []
+    errors = [0]
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    async def client(offset):
+        reader = writer = None
+        index = offset
+        while time.perf_counter() < stop_at:
+            method, path, body = requests[index % len(requests)]
+            index += 1
+            begin = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(host, port)
+                status, keep_alive = await asyncio.wait_for(
+                    send(reader, writer, method, path, body, host_header), timeout
+                )
+            except CLIENT_ERRORS:
+                status, keep_alive = None, False
+            end = time.perf_counter()
+            if not keep_alive and writer is not None:
+                writer.close()
+                reader = writer = None
+            if begin < measure_from:
+                continue
+            if status is None or status >= 500:
+                errors[0] += 1
+            else:
+                latencies.append(end - begin)
+        if writer is not None:
+            writer.close()
+
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    latencies.sort()
+    if not latencies:
+        return {"rps": 0.0, "p50": 0.0, "p99": 0.0, "max": 0.0, "errors": errors[0]}
+    return {
+        "rps": len(latencies) / duration,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "max": latencies[-1] * 1000,
+        "errors": errors[0],
+    }
+
+
+async def send(reader, writer, method, path, body, host_header):
+    """One HTTP/1.1 exchange; returns (status, connection reusable)."""
+    payload = body.encode("utf-8") if body else b""
+    head = [
+        f"{method} {path} HTTP/1.1",
+        f"Host: {host_header}",
+        "Connection: keep-alive",
+    ]
+    if body:
+        head += ["Content-Type: application/json", f"Content-Length: {len(payload)}"]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + payload)
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise asyncio.IncompleteReadError(b"", None)
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip().lower()
+
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.read()
+        return status, False
+    return status, headers.get("connection") != "close"
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from properties.images import process_image
+from properties.models import PropertyImage
+
+
+class Command(BaseCommand):
+    help = (
+        "Build responsive variants, dimensions and blurhash for property "
+        "images that do not have them yet (all images with --force)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true")
+
+    def handle(self, *args, **options):
+        images = PropertyImage.objects.exclude(image="")
+        ids = list(images.values_list("id", flat=True).order_by("id"))
+        processed = failed = 0
+        for image_id in ids:
+            try:
+                processed += process_image(image_id, force=options["force"])
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"image {image_id}: {exc}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Processed {processed} of {len(ids)} images, {failed} failed."
+            )
+        )
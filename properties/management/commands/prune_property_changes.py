@@ -0,0 +1,16 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from properties.changes import RETENTION, prune
+
+
+class Command(BaseCommand):
+    help = "Delete property change log rows older than --hours (default one day)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours", type=float, default=RETENTION.total_seconds() / 3600
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune(timedelta(hours=options["hours"]))
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} change log rows."))
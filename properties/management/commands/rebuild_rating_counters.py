@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from properties.models import Property, PropertyReview
+from users.models import Users, OwnerReview
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized rating counters on properties and owners."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        properties = self.rebuild(
+            Property, PropertyReview, "property", "average_rating", batch_size
+        )
+        owners = self.rebuild(Users, OwnerReview, "owner", "rating", batch_size)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt rating counters for {properties} properties and {owners} owners."
+            )
+        )
+
+    def rebuild(self, model, review_model, fk, average_field, batch_size):
+        totals = (
+            review_model.objects.values(fk)
+            .annotate(rating_sum=Sum("rating"), review_count=Count("id"))
+            .order_by()
+        )
+        rows = [
+            model(
+                pk=row[fk],
+                rating_sum=row["rating_sum"],
+                review_count=row["review_count"],
+                **{average_field: row["rating_sum"] / row["review_count"]},
+            )
+            for row in totals
+        ]
+
+        with transaction.atomic():
+            model.objects.exclude(review_count=0, rating_sum=0).update(
+                rating_sum=0, review_count=0, **{average_field: 0.0}
+            )
+            model.objects.bulk_update(
+                rows,
+                ["rating_sum", "review_count", average_field],
+                batch_size=batch_size,
+            )
+        return len(rows)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from properties import cache as response_cache
+from properties.promotion import refresh_promotion_ranks
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the promoted-first sort key of listings whose boost or "
+        "feature period has ended. Run it every minute or so; --all also "
+        "repairs rows changed by bulk updates that skipped Property.save()."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", dest="everything")
+
+    def handle(self, *args, **options):
+        updated = refresh_promotion_ranks(everything=options["everything"])
+        if updated:
+            response_cache.bump_version()
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {updated} properties."))
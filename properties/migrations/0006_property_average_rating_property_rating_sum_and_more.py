@@ -0,0 +1,54 @@
+# Generated by Django 5.2 on 2026-10-18 12:26
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_counters(apps, schema_editor):
+    Property = apps.get_model('properties', 'Property')
+    PropertyReview = apps.get_model('properties', 'PropertyReview')
+
+    totals = (
+        PropertyReview.objects.values('property')
+        .annotate(rating_sum=Sum('rating'), review_count=Count('id'))
+        .order_by()
+    )
+    Property.objects.bulk_update(
+        [
+            Property(
+                pk=row['property'],
+                rating_sum=row['rating_sum'],
+                review_count=row['review_count'],
+                average_rating=row['rating_sum'] / row['review_count'],
+            )
+            for row in totals
+        ],
+        ['rating_sum', 'review_count', 'average_rating'],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0005_propertyreview'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='average_rating',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_counters, migrations.RunPython.noop),
+    ]
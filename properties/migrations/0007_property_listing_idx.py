@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 12:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0006_property_average_rating_property_rating_sum_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['-boost_rank', '-created_at', '-id'], name='properties_listing_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2 on 2026-10-18 13:05
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+# Copies of properties.models.clean_amenity_name/amenity_slug as they were
+# when this migration was written; later changes must not alter it.
+def clean_amenity_name(name):
+    return ' '.join(unicodedata.normalize('NFKC', name).split())
+
+
+def amenity_slug(name):
+    return clean_amenity_name(name).casefold()
+
+
+def merge_duplicate_amenities(apps, schema_editor):
+    """
+    Give every amenity its slug and fold amenities that share one into the
+    oldest, moving their property links over.
+    """
+    Amenity = apps.get_model('properties', 'Amenity')
+    Property = apps.get_model('properties', 'Property')
+    Through = Property.amenities.through
+
+    keepers = {}
+    duplicates = []
+    for amenity in Amenity.objects.order_by('id').iterator():
+        slug = amenity_slug(amenity.name)
+        if slug in keepers:
+            duplicates.append((amenity.id, keepers[slug]))
+            continue
+        keepers[slug] = amenity.id
+        Amenity.objects.filter(id=amenity.id).update(
+            name=clean_amenity_name(amenity.name), slug=slug
+        )
+
+    for duplicate_id, keeper_id in duplicates:
+        # Re-point links unless the property already has the keeper, then
+        # drop what is left.
+        Through.objects.filter(amenity_id=duplicate_id).exclude(
+            property_id__in=Through.objects.filter(amenity_id=keeper_id).values(
+                'property_id'
+            )
+        ).update(amenity_id=keeper_id)
+        Through.objects.filter(amenity_id=duplicate_id).delete()
+    Amenity.objects.filter(id__in=[d for d, _ in duplicates]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0009_property_geohash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='amenity',
+            name='slug',
+            field=models.CharField(default='', max_length=100),
+            preserve_default=False,
+        ),
+        migrations.RunPython(merge_duplicate_amenities, migrations.RunPython.noop),
+    ]
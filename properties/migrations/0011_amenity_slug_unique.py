@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0010_amenity_slug'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='amenity',
+            name='slug',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+    ]
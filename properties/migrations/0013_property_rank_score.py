@@ -0,0 +1,63 @@
+# Generated by Django 5.2 on 2026-10-18 13:04
+
+from django.db import migrations, models
+from django.db.models import Case, DateTimeField, F, Q, Value, When
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+# The promotion tiers as of this migration (properties.models).
+FEATURED_TIER = 2000
+BOOSTED_TIER = 1000
+MAX_BOOST_RANK = 999
+
+
+def backfill_rank_score(apps, schema_editor):
+    """Score every row as properties.promotion did when this was written."""
+    Property = apps.get_model('properties', 'Property')
+    now = timezone.now()
+    featured = Q(featured_until__gt=now)
+    boosted = Q(boosted_until__gt=now)
+    boost_rank = Least(Greatest(F('boost_rank'), Value(0)), Value(MAX_BOOST_RANK))
+    Property.objects.update(
+        rank_score=Case(
+            When(featured, then=boost_rank + Value(FEATURED_TIER)),
+            When(boosted, then=boost_rank + Value(BOOSTED_TIER)),
+            default=Value(0),
+        ),
+        promotion_expires_at=Case(
+            When(featured & boosted, then=Least('featured_until', 'boosted_until')),
+            When(featured, then=F('featured_until')),
+            When(boosted, then=F('boosted_until')),
+            default=Value(None),
+            output_field=DateTimeField(),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0012_propertyimage_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='promotion_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='rank_score',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rank_score, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['-rank_score', '-created_at', '-id'], name='properties_promoted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('promotion_expires_at__isnull', False)), fields=['promotion_expires_at'], name='properties_promo_expiry_idx'),
+        ),
+    ]
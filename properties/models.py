@@ -1,16 +1,52 @@
+import unicodedata
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from users.models import Users
+from . import geo
+
+
+def clean_amenity_name(name):
+    """Display form of an amenity name: NFKC, single spaces, trimmed."""
+    return " ".join(unicodedata.normalize("NFKC", name).split())
+
+
+def amenity_slug(name):
+    """Key amenities are unique on: the cleaned name, case-folded."""
+    return clean_amenity_name(name).casefold()
 
 
 class Amenity(models.Model):
     name = models.CharField(max_length=100)
+    # amenity_slug(name); "Swimming pool" and " swimming  Pool" are one amenity.
+    slug = models.CharField(max_length=100, unique=True)
+
+    def save(self, *args, **kwargs):
+        self.name = clean_amenity_name(self.name)
+        self.slug = amenity_slug(self.name)
+        super().save(*args, **kwargs)
 
     class Meta:
         db_table = "amenities"
         app_label = "properties"
 
 
+# Promotion tiers of Property.rank_score; boost_rank orders listings within
+# a tier. properties.promotion computes the same score in SQL.
+FEATURED_TIER = 2000
+BOOSTED_TIER = 1000
+MAX_BOOST_RANK = 999
+
+
+# Columns Property.save() derives from others: derived -> source fields.
+DERIVED_FIELDS = {
+    frozenset({"geohash"}): frozenset({"latitude", "longitude"}),
+    frozenset({"rank_score", "promotion_expires_at"}): frozenset(
+        {"boosted_until", "featured_until", "boost_rank"}
+    ),
+}
+
+
 class Property(models.Model):
     CATEGORY_CHOICES = [
         ("sale", "Sale"),
@@ -64,6 +100,11 @@ class Property(models.Model):
     boosted_until = models.DateTimeField(null=True, blank=True)
     featured_until = models.DateTimeField(null=True, blank=True)
     boost_rank = models.IntegerField(default=0)
+    # Sort key of the "promoted first" ordering and the moment it goes stale
+    # (the next promotion expiry); kept current by save() and by
+    # properties.promotion.refresh_promotion_ranks.
+    rank_score = models.IntegerField(default=0)
+    promotion_expires_at = models.DateTimeField(null=True, blank=True)
 
     latitude = models.DecimalField(
         max_digits=9, decimal_places=6, null=True, blank=True
@@ -71,10 +112,108 @@ class Property(models.Model):
     longitude = models.DecimalField(
         max_digits=9, decimal_places=6, null=True, blank=True
     )
+    # Derived from latitude/longitude on save; used to prefilter map searches.
+    geohash = models.CharField(max_length=12, blank=True, default="")
+
+    # Maintained incrementally from PropertyReview (see properties.signals).
+    rating_sum = models.PositiveIntegerField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
+    average_rating = models.FloatField(default=0.0)
 
     class Meta:
         db_table = "properties"
         app_label = "properties"
+        indexes = [
+            # Keyset pagination order for listings (see properties.pagination).
+            models.Index(
+                fields=["-boost_rank", "-created_at", "-id"],
+                name="properties_listing_idx",
+            ),
+            # Advanced search filter paths (search.views.apply_filters).
+            models.Index(
+                fields=["category", "type", "max_price"],
+                name="properties_cat_type_price_idx",
+            ),
+            models.Index(
+                fields=["category", "type", "bedrooms"],
+                name="properties_cat_type_beds_idx",
+            ),
+            models.Index(
+                fields=["category", "mini_price"],
+                name="properties_cat_min_price_idx",
+            ),
+            models.Index(fields=["city", "state"], name="properties_city_state_idx"),
+            models.Index(fields=["-created_at"], name="properties_created_idx"),
+            # Keyset order of ?sort=promoted (properties.promotion).
+            models.Index(
+                fields=["-rank_score", "-created_at", "-id"],
+                name="properties_promoted_idx",
+            ),
+            models.Index(
+                fields=["promotion_expires_at"],
+                name="properties_promo_expiry_idx",
+                condition=models.Q(promotion_expires_at__isnull=False),
+            ),
+            # Only a small share of listings is ever promoted.
+            models.Index(
+                fields=["boosted_until", "-boost_rank"],
+                name="properties_boosted_idx",
+                condition=models.Q(boosted_until__isnull=False),
+            ),
+            models.Index(
+                fields=["featured_until"],
+                name="properties_featured_idx",
+                condition=models.Q(featured_until__isnull=False),
+            ),
+            # Covers the cell prefilter and the exact distance check.
+            models.Index(
+                fields=["geohash", "latitude", "longitude"],
+                name="properties_geohash_idx",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.set_derived_fields()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            for derived, sources in DERIVED_FIELDS.items():
+                if sources & update_fields:
+                    update_fields |= derived
+            kwargs["update_fields"] = update_fields
+        super().save(*args, **kwargs)
+
+    def set_derived_fields(self):
+        """
+        Recompute the columns in DERIVED_FIELDS. save() calls this; code that
+        writes with bulk_create() must call it itself.
+        """
+        self.geohash = self.compute_geohash()
+        self.rank_score, self.promotion_expires_at = self.compute_promotion()
+
+    def compute_geohash(self):
+        if self.latitude is None or self.longitude is None:
+            return ""
+        return geo.encode(self.latitude, self.longitude)
+
+    def compute_promotion(self, now=None):
+        """(rank_score, promotion_expires_at) as of ``now``."""
+        now = now or timezone.now()
+        featured = self.featured_until is not None and self.featured_until > now
+        boosted = self.boosted_until is not None and self.boosted_until > now
+        if not (featured or boosted):
+            return 0, None
+        tier = FEATURED_TIER if featured else BOOSTED_TIER
+        rank = tier + max(0, min(self.boost_rank or 0, MAX_BOOST_RANK))
+        expiries = [
+            moment
+            for moment, active in (
+                (self.featured_until, featured),
+                (self.boosted_until, boosted),
+            )
+            if active
+        ]
+        return rank, min(expiries)
 
 
 class PropertyImage(models.Model):
@@ -84,6 +223,18 @@ class PropertyImage(models.Model):
     image = models.ImageField(upload_to="properties/")
     is_primary = models.BooleanField(default=False)
 
+    # Filled in by properties.images.process_image, off the request path.
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    blurhash = models.CharField(max_length=64, blank=True, default="")
+    # [{"width": 320, "format": "webp", "name": "properties/variants/..."}, ...]
+    variants = models.JSONField(default=list, blank=True)
+    # The variant list cards show (see properties.serializers.card_values).
+    thumbnail = models.CharField(max_length=255, blank=True, default="")
+    # The image.name the fields above describe; processing is skipped when
+    # it still matches.
+    processed_name = models.CharField(max_length=255, blank=True, default="")
+
     class Meta:
         db_table = "property_images"
         app_label = "properties"
@@ -113,3 +264,27 @@ class PropertyReview(models.Model):
     class Meta:
         unique_together = ("property", "user")  # One review per user per property
         ordering = ["-created_at"]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_rating = instance.__dict__.get("rating")
+        return instance
+
+
+class PropertyChange(models.Model):
+    """
+    Append-only log of property writes, written after each commit. Caches
+    that keep derived data (see properties.changes) ask which properties
+    changed after a position in time instead of dropping everything on any
+    write. Neither id nor created_at is in commit order across processes.
+    """
+
+    # Not a foreign key: deletions are logged too.
+    property_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = "property_changes"
+        app_label = "properties"
@@ -0,0 +1,191 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a fixed, unique ordering. The cursor carries the
+    sort key of the last row of the page and the next page is selected with
+    a WHERE on that key instead of an OFFSET, so deep pages cost the same as
+    the first one.
+
+    Views may set ``keyset_ordering`` to override the default ordering; the
+    last field must be unique (normally ``id``) to keep the order stable.
+
+    When a sort key is computed rather than stored (a search score), the
+    view also sets ``keyset_generation`` to what it was computed under. The
+    cursor carries it, and a cursor from another generation has its
+    position passed through the view's ``refresh_position(position)`` so
+    the page continues after the same row under the current keys.
+    """
+
+    ordering = ("-boost_rank", "-created_at", "-id")
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+    stale_cursor_message = "Cursor has expired"
+    generation = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Same as paginate_queryset(), fetching the page with the async ORM."""
+        queryset = self.get_page_queryset(queryset, request, view)
+        return self.set_page([row async for row in queryset])
+
+    def paginate_rows(self, rows, request, view=None, complete=True):
+        """
+        paginate_queryset() over sort-key tuples already in keyset order
+        (the id last), such as a cached result list. Returns None when the
+        cursor's row is not in ``rows``, or the page runs past the end of
+        rows that are not ``complete``, so the caller can use the queryset.
+        """
+        self.request = request
+        self.ordering = tuple(getattr(view, "keyset_ordering", None) or self.ordering)
+        self.generation = getattr(view, "keyset_generation", None)
+        self.page_size = self.get_page_size(request)
+
+        position = self.decode_cursor(request)
+        start = 0
+        if position is not None:
+            ids = [row[-1] for row in rows]
+            if position[-1] not in ids:
+                return None
+            start = ids.index(position[-1]) + 1
+        end = start + self.page_size + 1
+        if end > len(rows) and not complete:
+            return None
+        names = [field.lstrip("-") for field in self.ordering]
+        page = rows[start:end]
+        return self.set_page([dict(zip(names, row)) for row in page])
+
+    def get_page_queryset(self, queryset, request, view):
+        # One extra row tells whether there is a next page.
+        self.request = request
+        self.ordering = tuple(getattr(view, "keyset_ordering", None) or self.ordering)
+        self.generation = getattr(view, "keyset_generation", None)
+        self.page_size = self.get_page_size(request)
+
+        position = self.decode_cursor(request)
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            position = self.clean_position(position, queryset)
+            if self.cursor_generation != self.generation:
+                position = self.refresh_position(position, view)
+            queryset = queryset.filter(self.get_keyset_filter(position))
+        return queryset[: self.page_size + 1]
+
+    def refresh_position(self, position, view):
+        refresh = getattr(view, "refresh_position", None)
+        if refresh is None:
+            raise NotFound(self.stale_cursor_message)
+        return refresh(position)
+
+    def set_page(self, rows):
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_keyset_filter(self, position):
+        # (a, b, c) comes after (x, y, z) when
+        # a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z),
+        # with the comparison flipped for descending fields.
+        query = Q()
+        equal = {}
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            query |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        return query
+
+    def get_position(self, row):
+        names = [field.lstrip("-") for field in self.ordering]
+        if isinstance(row, dict):
+            return [row[name] for name in names]
+        return [getattr(row, name) for name in names]
+
+    def encode_cursor(self, position):
+        values = [v.isoformat() if isinstance(v, datetime) else v for v in position]
+        if self.generation is not None:
+            values.append(self.generation)
+        encoded = json.dumps(values, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(encoded).decode("ascii")
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        expected = len(self.ordering) + (self.generation is not None)
+        if (
+            not isinstance(position, list)
+            or len(position) != expected
+            or not all(isinstance(v, (str, int, float)) for v in position)
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        self.cursor_generation = None if self.generation is None else position.pop()
+        return position
+
+    def clean_position(self, position, queryset):
+        """
+        The cursor's values converted by the fields (or annotations) they
+        sort on, so a tampered cursor is a 404 rather than a database error.
+        """
+        annotations = queryset.query.annotations
+        cleaned = []
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip("-")
+            if name in annotations:
+                model_field = annotations[name].output_field
+            else:
+                model_field = queryset.model._meta.get_field(name)
+            try:
+                cleaned.append(model_field.to_python(value))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        return cleaned
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        url = self.request.build_absolute_uri()
+        cursor = self.encode_cursor(self.get_position(self.page[-1]))
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
@@ -0,0 +1,66 @@
+"""
+"Promoted first" ordering for listings and search (``?sort=promoted``).
+
+Property.rank_score ranks active featured listings above active boosted
+ones above the rest, by boost_rank within a tier; ties fall back to
+recency. The score is stored and indexed together with created_at and id,
+so the ordering is a plain index scan. It is computed in the query from
+``now`` (rank_score_expression) whenever it is refreshed, and in Python by
+Property.save(). promotion_expires_at records when a row's score next goes
+stale; refresh_promotion_ranks recomputes exactly those rows and runs from
+the ``refresh_promotion_ranks`` command on a schedule.
+"""
+from django.db.models import Case, DateTimeField, F, Q, Value, When
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+from .models import BOOSTED_TIER, FEATURED_TIER, MAX_BOOST_RANK, Property
+
+SORT_PARAM = "sort"
+PROMOTED = "promoted"
+PROMOTED_ORDERING = ("-rank_score", "-created_at", "-id")
+
+
+def wants_promoted(request):
+    return request.query_params.get(SORT_PARAM) == PROMOTED
+
+
+def promoted_ordering(ordering):
+    """``ordering`` with active promotions first; boost_rank is in the score."""
+    return ("-rank_score", *(field for field in ordering if field != "-boost_rank"))
+
+
+def rank_score_expression(now):
+    boost_rank = Least(Greatest(F("boost_rank"), Value(0)), Value(MAX_BOOST_RANK))
+    return Case(
+        When(featured_until__gt=now, then=boost_rank + Value(FEATURED_TIER)),
+        When(boosted_until__gt=now, then=boost_rank + Value(BOOSTED_TIER)),
+        default=Value(0),
+    )
+
+
+def promotion_expiry_expression(now):
+    featured = Q(featured_until__gt=now)
+    boosted = Q(boosted_until__gt=now)
+    return Case(
+        When(featured & boosted, then=Least("featured_until", "boosted_until")),
+        When(featured, then=F("featured_until")),
+        When(boosted, then=F("boosted_until")),
+        default=Value(None),
+        output_field=DateTimeField(),
+    )
+
+
+def refresh_promotion_ranks(now=None, everything=False, queryset=None):
+    """
+    Recompute rank_score for rows whose promotion has expired since their
+    last refresh (every row with ``everything``, e.g. after bulk updates
+    that bypassed save()), in one UPDATE. Returns the number of rows.
+    """
+    now = now or timezone.now()
+    queryset = Property.objects.all() if queryset is None else queryset
+    if not everything:
+        queryset = queryset.filter(promotion_expires_at__lte=now)
+    return queryset.update(
+        rank_score=rank_score_expression(now),
+        promotion_expires_at=promotion_expiry_expression(now),
+    )
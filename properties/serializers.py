@@ -1,8 +1,24 @@
+from django.db import transaction
 from django.utils import timezone
-from django.db.models import Avg, Count
+from django.db.models import (
+    CharField,
+    OuterRef,
+    Prefetch,
+    Subquery,
+    Value,
+    prefetch_related_objects,
+)
+from django.db.models.functions import Coalesce, NullIf
+from django.db.models.manager import BaseManager
 from rest_framework import serializers
-from .models import PropertyImage, Property, Amenity, Favorite, PropertyReview
-from users.models import OwnerReview
+from .amenities import amenity_cache
+from .fast_serializers import (
+    image_set,
+    owner_summary,
+    property_row,
+    review_summary,
+)
+from .models import PropertyImage, Property, Favorite, PropertyReview
 
 
 class PropertyImageSerializer(serializers.ModelSerializer):
@@ -11,12 +27,46 @@ class PropertyImageSerializer(serializers.ModelSerializer):
         fields = ["id", "image", "is_primary"]
 
 
+def preload_property_page(properties):
+    """
+    Load everything PropertySerializer reads for a page of properties in a
+    fixed number of queries: owners, images, amenities and reviews (with their
+    authors). Rating stats come from the denormalized counter columns.
+    """
+    if not properties:
+        return properties
+
+    prefetch_related_objects(
+        properties,
+        "owner",
+        "images",
+        "amenities",
+        Prefetch(
+            "reviews",
+            queryset=PropertyReview.objects.select_related("user").order_by(
+                "-created_at"
+            ),
+        ),
+    )
+    for p in properties:
+        p._page_preloaded = True
+    return properties
+
+
+class PropertyListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, BaseManager) else data
+        properties = preload_property_page(list(iterable))
+        return super().to_representation(properties)
+
+
 class PropertySerializer(serializers.ModelSerializer):
     price_input = serializers.FloatField(write_only=True, required=False)
     amenities = serializers.ListField(
         child=serializers.CharField(), write_only=True, required=False
     )
     images = serializers.SerializerMethodField()
+    image_set = serializers.SerializerMethodField()
     amenities_display = serializers.SerializerMethodField()
     owner = serializers.SerializerMethodField()
     is_boosted = serializers.SerializerMethodField()
@@ -38,6 +88,7 @@ class PropertySerializer(serializers.ModelSerializer):
             "address",
             "location",
             "images",
+            "image_set",
             "bedrooms",
             "bathrooms",
             "area",
@@ -64,66 +115,34 @@ class PropertySerializer(serializers.ModelSerializer):
             "location_details",
         ]
         read_only_fields = ["id", "created_at", "updated_at", "owner"]
+        list_serializer_class = PropertyListSerializer
+
+    # Reads go through the compiled row function in
+    # properties.fast_serializers; the get_* methods below document the
+    # same contract and are what DRF uses when the fast path is off.
+    fast_representation = True
+
+    def to_representation(self, instance):
+        if not getattr(instance, "_page_preloaded", False):
+            preload_property_page([instance])
+        if self.fast_representation:
+            return property_row(instance)
+        return super().to_representation(instance)
 
     def get_images(self, obj):
         return [img.image.url if img.image else "" for img in obj.images.all()]
 
+    def get_image_set(self, obj):
+        return image_set(obj)
+
     def get_amenities_display(self, obj):
         return [a.name for a in obj.amenities.all()]
 
     def get_owner(self, obj):
-        u = obj.owner
-        review_stats = OwnerReview.objects.filter(owner=u).aggregate(
-            avg_rating=Avg("rating"), total_reviews=Count("id")
-        )
-        return {
-            "id": u.id,
-            "name": f"{u.firstname} {u.lastname}",
-            "phone": u.telephone,
-            "email": u.email,
-            "user_type": u.user_type,
-            "avatar": (
-                u.avatar.url
-                if hasattr(u, "avatar") and u.avatar
-                else "https://example.com/avatar.jpg"
-            ),
-            "rating": float(review_stats["avg_rating"] or 0),
-            "reviews": review_stats["total_reviews"],
-            "whatsapp": getattr(u, "whatsapp", ""),
-            "social_links": {
-                "linkedin": getattr(u, "linkedin", ""),
-                "facebook": getattr(u, "facebook", ""),
-                "instagram": getattr(u, "instagram", ""),
-                "youtube": getattr(u, "youtube", ""),
-                "twitter": getattr(u, "twitter", ""),
-            },
-        }
+        return owner_summary(obj.owner)
 
     def get_reviews(self, obj):
-        reviews = PropertyReview.objects.filter(property=obj).order_by("-created_at")
-        return {
-            "total_reviews": reviews.count(),
-            "average_rating": round(
-                reviews.aggregate(avg=Avg("rating"))["avg"] or 0, 1
-            ),
-            "reviews_list": [
-                {
-                    "id": i + 1,
-                    "user": {
-                        "name": f"{r.user.firstname} {r.user.lastname}",
-                        "avatar": (
-                            r.user.avatar.url
-                            if r.user.avatar
-                            else "https://example.com/avatar.jpg"
-                        ),
-                    },
-                    "rating": r.rating,
-                    "comment": r.comment,
-                    "date": r.created_at,
-                }
-                for i, r in enumerate(reviews)
-            ],
-        }
+        return review_summary(obj)
 
     def get_address(self, obj):
         return obj.location
@@ -153,9 +172,10 @@ class PropertySerializer(serializers.ModelSerializer):
             validated_data["max_price"] = price
 
         property_instance = Property.objects.create(**validated_data)
-        for name in amenities_data:
-            amenity, _ = Amenity.objects.get_or_create(name=name)
-            property_instance.amenities.add(amenity)
+        if amenities_data:
+            property_instance.amenities.add(
+                *amenity_cache.resolve(amenities_data).values()
+            )
         return property_instance
 
     def update(self, instance, validated_data):
@@ -164,17 +184,134 @@ class PropertySerializer(serializers.ModelSerializer):
         if price is not None:
             validated_data["max_price"] = price
 
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
+        changed = [
+            attr
+            for attr, value in validated_data.items()
+            if getattr(instance, attr) != value
+        ]
+        for attr in changed:
+            setattr(instance, attr, validated_data[attr])
+
+        if not changed and amenities_data is None:
+            return instance
+
+        amenities_changed = False
+        with transaction.atomic():
+            if amenities_data is not None:
+                wanted = set(amenity_cache.resolve(amenities_data).values())
+                current = self.current_amenity_ids(instance)
+                # One DELETE for dropped links and one INSERT for new ones.
+                if current - wanted:
+                    instance.amenities.remove(*(current - wanted))
+                if wanted - current:
+                    instance.amenities.add(*(wanted - current))
+                amenities_changed = current != wanted
+
+            # Write only the columns the request changed; updated_at still moves.
+            if changed or amenities_changed:
+                instance.save(update_fields=[*changed, "updated_at"])
+        return instance
+
+    def current_amenity_ids(self, instance):
+        cache = getattr(instance, "_prefetched_objects_cache", {})
+        if "amenities" in cache:
+            return {amenity.id for amenity in cache["amenities"]}
+        return set(instance.amenities.values_list("id", flat=True))
+
+
+# Compact "card" representation used by list endpoints by default; clients
+# ask for the full PropertySerializer payload with ?view=full.
+CARD_VIEW = "card"
+FULL_VIEW = "full"
+CARD_FIELDS = (
+    "id",
+    "title",
+    "max_price",
+    "city",
+    "bedrooms",
+    "boosted_until",
+    "featured_until",
+    "average_rating",
+)
+image_storage = PropertyImage._meta.get_field("image").storage
+
+
+def wants_cards(request):
+    return request.query_params.get("view", CARD_VIEW) != FULL_VIEW
+
+
+def card_values(queryset, prefix="", extra=()):
+    """
+    ``values()`` projection of ``queryset`` with the columns a card needs,
+    the primary image's thumbnail path, or the original's until it has one
+    (``card_image``), and any ``extra`` fields (such as the keyset
+    pagination fields). ``prefix`` reaches the property through a relation,
+    e.g. ``"property__"``.
+    """
+    image = (
+        PropertyImage.objects.filter(property=OuterRef(f"{prefix}id"))
+        .order_by("-is_primary", "id")
+        .annotate(
+            card=Coalesce(
+                NullIf("thumbnail", Value("")), "image", output_field=CharField()
+            )
+        )
+        .values("card")[:1]
+    )
+    names = dict.fromkeys(
+        [*(prefix + name for name in CARD_FIELDS), *extra]
+    )
+    return (
+        queryset.prefetch_related(None)
+        .annotate(card_image=Subquery(image))
+        .values(*names, "card_image")
+    )
 
-        if amenities_data is not None:
-            instance.amenities.clear()
-            for name in amenities_data:
-                amenity, _ = Amenity.objects.get_or_create(name=name)
-                instance.amenities.add(amenity)
 
-        return instance
+def property_card(row, prefix="", now=None):
+    now = now or timezone.now()
+    image = row["card_image"]
+    boosted_until = row[f"{prefix}boosted_until"]
+    featured_until = row[f"{prefix}featured_until"]
+    return {
+        "id": row[f"{prefix}id"],
+        "title": row[f"{prefix}title"],
+        "price": float(row[f"{prefix}max_price"] or 0),
+        "image": image_storage.url(image) if image else None,
+        "city": row[f"{prefix}city"],
+        "bedrooms": row[f"{prefix}bedrooms"],
+        "is_boosted": bool(boosted_until and boosted_until > now),
+        "is_featured": bool(featured_until and featured_until > now),
+        "average_rating": round(float(row[f"{prefix}average_rating"] or 0), 1),
+    }
+
+
+class PropertyCardSerializer(serializers.BaseSerializer):
+    """Read-only card for a card_values() row; no model instances involved."""
+
+    def to_representation(self, row):
+        return property_card(row)
+
+
+class FavoriteCardSerializer(serializers.BaseSerializer):
+    """Favorite with a property card, from card_values(..., prefix="property__")."""
+
+    datetime_field = serializers.DateTimeField()
+
+    def to_representation(self, row):
+        return {
+            "id": row["id"],
+            "property": property_card(row, "property__"),
+            "created_at": self.datetime_field.to_representation(row["created_at"]),
+        }
+
+
+class FavoriteListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, BaseManager) else data
+        favorites = list(iterable)
+        preload_property_page([f.property for f in favorites])
+        return super().to_representation(favorites)
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
@@ -183,6 +320,7 @@ class FavoriteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Favorite
         fields = ["id", "property", "created_at"]
+        list_serializer_class = FavoriteListSerializer
 
 
 class PropertyReviewSerializer(serializers.ModelSerializer):
@@ -0,0 +1,119 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import Signal, receiver
+from raininfotech.helper import apply_rating_delta
+from . import cache as response_cache
+from . import changes, fragments
+from .amenities import amenity_cache
+from .images import delete_files, image_processor
+from .models import Amenity, Property, PropertyImage, PropertyReview
+
+# Sent once per committed properties.importer batch with the new Property
+# ``instances``; bulk_create does not send post_save.
+properties_imported = Signal()
+
+# m2m_changed actions after which the links have changed.
+M2M_WRITES = ("post_add", "post_remove", "post_clear")
+
+
+@receiver(post_save, sender=PropertyReview)
+def property_review_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_loaded_rating", None)
+    if created:
+        apply_rating_delta(
+            Property, instance.property_id, instance.rating, 1, "average_rating"
+        )
+    elif previous is not None and previous != instance.rating:
+        apply_rating_delta(
+            Property,
+            instance.property_id,
+            instance.rating - previous,
+            0,
+            "average_rating",
+        )
+    instance._loaded_rating = instance.rating
+
+
+@receiver(post_delete, sender=PropertyReview)
+def property_review_deleted(sender, instance, **kwargs):
+    apply_rating_delta(
+        Property, instance.property_id, -instance.rating, -1, "average_rating"
+    )
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_delete, sender=PropertyImage)
+@receiver(post_save, sender=PropertyReview)
+@receiver(post_delete, sender=PropertyReview)
+@receiver(post_save, sender=Amenity)
+@receiver(post_delete, sender=Amenity)
+@receiver(m2m_changed, sender=Property.amenities.through)
+@receiver(properties_imported, sender=Property)
+def invalidate_cached_responses(sender, **kwargs):
+    # After the commit: a read between the bump and the commit would cache
+    # the old rows under the new version.
+    if kwargs.get("action", "post_add") not in M2M_WRITES:
+        return
+    transaction.on_commit(response_cache.bump_version)
+
+
+@receiver(post_save, sender=Amenity)
+@receiver(post_delete, sender=Amenity)
+def invalidate_amenity_cache(sender, **kwargs):
+    transaction.on_commit(amenity_cache.invalidate)
+
+
+@receiver(post_save, sender=PropertyImage)
+def process_property_image(sender, instance, raw=False, **kwargs):
+    if raw or not instance.image or instance.image.name == instance.processed_name:
+        return
+    image_id = instance.pk
+    transaction.on_commit(lambda: image_processor.submit(image_id))
+
+
+@receiver(post_delete, sender=PropertyImage)
+def delete_property_image_variants(sender, instance, **kwargs):
+    names = [variant["name"] for variant in instance.variants]
+    if names:
+        transaction.on_commit(lambda: delete_files(names))
+
+
+@receiver(post_save, sender=Property)
+def log_property_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        changes.record([instance.pk])
+
+
+@receiver(post_delete, sender=Property)
+def log_property_deleted(sender, instance, **kwargs):
+    changes.record([instance.pk], deleted=True)
+
+
+@receiver(properties_imported, sender=Property)
+def log_imported_properties(sender, instances, **kwargs):
+    changes.record(prop.pk for prop in instances)
+
+
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_delete, sender=PropertyImage)
+@receiver(post_save, sender=PropertyReview)
+@receiver(post_delete, sender=PropertyReview)
+def invalidate_property_fragments(sender, instance, raw=False, **kwargs):
+    # Only the property's representation changes, not what matches a search.
+    property_id = instance.property_id
+    if not raw:
+        transaction.on_commit(lambda: fragments.invalidate([property_id]))
+
+
+@receiver(m2m_changed, sender=Property.amenities.through)
+def invalidate_amenity_link_fragments(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if not action.startswith("post_"):
+        return
+    # From the amenity side pk_set holds property ids (None after a clear).
+    ids = list(pk_set or ()) if reverse else [instance.pk]
+    if ids:
+        transaction.on_commit(lambda: fragments.invalidate(ids))
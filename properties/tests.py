@@ -1,3 +1,683 @@
-from django.test import TestCase
+import base64
+import csv
+import json
+import re
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from PIL import Image
+
+from raininfotech.renderers import FastJSONRenderer
+from search.models import SearchDocument
+
+from users.models import Users, OwnerReview
+from . import cache as response_cache
+from . import changes, images, importer
+from .amenities import amenity_cache
+from .models import (
+    FEATURED_TIER,
+    Amenity,
+    Property,
+    PropertyChange,
+    PropertyImage,
+    PropertyReview,
+)
+from .pagination import KeysetPagination
+from .promotion import refresh_promotion_ranks
+from .serializers import PropertySerializer
+
+
+IMPORT_ROW = {
+    "title": "Loft",
+    "description": "Bright",
+    "location": "1 Broad St",
+    "city": "Lagos",
+    "state": "Lagos",
+    "country": "Nigeria",
+    "area_sqft": 900,
+    "price": 500000,
+}
+
+
+def make_user(index, user_type="buyer"):
+    return Users(
+        firstname=f"First{index}",
+        lastname=f"Last{index}",
+        email=f"user{index}@example.com",
+        telephone=f"90000{index:05d}",
+        user_type=user_type,
+        password="!",
+    )
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class PropertyDataTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        users = Users.objects.bulk_create(
+            [make_user(i, "owner" if i < 5 else "buyer") for i in range(15)]
+        )
+        owners, reviewers = users[:5], users[5:]
+        amenities = Amenity.objects.bulk_create(
+            [
+                Amenity(name=name, slug=name.lower())
+                for name in ("Pool", "Gym", "Parking")
+            ]
+        )
+
+        properties = Property.objects.bulk_create(
+            [
+                Property(
+                    title=f"Property {i}",
+                    description="Spacious and bright",
+                    location=f"{i} Marina Road",
+                    city="Lagos",
+                    state="Lagos",
+                    country="Nigeria",
+                    area_sqft=1200,
+                    bedrooms=i % 5,
+                    max_price=1000000 + i,
+                    owner=owners[i % len(owners)],
+                )
+                for i in range(100)
+            ]
+        )
+
+        Through = Property.amenities.through
+        Through.objects.bulk_create(
+            [
+                Through(property_id=p.id, amenity_id=a.id)
+                for p in properties
+                for a in amenities
+            ]
+        )
+        PropertyImage.objects.bulk_create(
+            [
+                PropertyImage(property=p, image=f"properties/{p.id}.jpg", is_primary=True)
+                for p in properties
+            ]
+        )
+        PropertyReview.objects.bulk_create(
+            [
+                PropertyReview(property=p, user=r, rating=1 + (p.id + r.id) % 5)
+                for p in properties
+                for r in reviewers[:3]
+            ]
+        )
+        OwnerReview.objects.bulk_create(
+            [
+                OwnerReview(owner=o, reviewer=r, rating=4)
+                for o in owners
+                for r in reviewers
+            ]
+        )
+        # bulk_create skips the review signals, so rebuild the counters.
+        call_command("rebuild_rating_counters", stdout=StringIO())
+
+
+class PropertyListQueryBudgetTests(PropertyDataTestCase):
+    def test_list_query_count_is_independent_of_page_size(self):
+        # properties, images, amenities, owners, reviews + authors
+        with self.assertNumQueries(5):
+            response = self.client.get(
+                reverse("property-list"), {"page_size": 100, "view": "full"}
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 100)
+        first = response.data["results"][0]
+        self.assertEqual(first["reviews"]["total_reviews"], 3)
+        self.assertEqual(len(first["amenities_display"]), 3)
+        self.assertEqual(first["owner"]["reviews"], 10)
+
+    def test_card_list_is_a_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("property-list"), {"page_size": 100})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 100)
+        card = response.data["results"][0]
+        self.assertEqual(
+            set(card),
+            {
+                "id",
+                "title",
+                "price",
+                "image",
+                "city",
+                "bedrooms",
+                "is_boosted",
+                "is_featured",
+                "average_rating",
+            },
+        )
+        self.assertEqual(card["image"], f"/media/properties/{card['id']}.jpg")
+        self.assertEqual(card["city"], "Lagos")
+
+
+class DRFPropertySerializer(PropertySerializer):
+    fast_representation = False
+
+
+class FastSerializerParityTests(PropertyDataTestCase):
+    def test_fast_path_matches_drf_representation(self):
+        now = timezone.now()
+        first_ten = Property.objects.order_by("id").values_list("id", flat=True)[:10]
+        Property.objects.filter(id__in=list(first_ten)).update(
+            boosted_until=now + timedelta(days=1),
+            featured_until=now - timedelta(days=1),
+            bathrooms=None,
+            latitude=Decimal("6.524400"),
+            longitude=Decimal("3.379200"),
+            keyword_tags=["sea view", "gated"],
+            area_sqft=Decimal("1234.5"),
+        )
+        properties = Property.objects.order_by("id")
+
+        fast = PropertySerializer(properties, many=True).data
+        drf = DRFPropertySerializer(properties, many=True).data
+
+        self.assertEqual(len(fast), 100)
+        for fast_row, drf_row in zip(fast, drf):
+            self.assertEqual(list(fast_row), list(drf_row))
+            self.assertEqual(fast_row, drf_row)
+        self.assertEqual(JSONRenderer().render(fast), JSONRenderer().render(drf))
+        self.assertEqual(
+            json.loads(FastJSONRenderer().render(fast)),
+            json.loads(JSONRenderer().render(drf)),
+        )
+
+
+class PropertyImportTests(PropertyDataTestCase):
+    def setUp(self):
+        # The vocabulary cache outlives the rolled-back data of earlier tests.
+        amenity_cache.invalidate()
+
+    def test_import_creates_rows_and_reports_errors(self):
+        owner = Users.objects.filter(user_type="owner").first()
+        client = APIClient()
+        client.force_authenticate(owner)
+        upload = SimpleUploadedFile(
+            "listings.csv",
+            b"title,description,location,city,state,country,area_sqft,price,amenities\n"
+            b"Loft,Bright,1 Broad St,Lagos,Lagos,Nigeria,900,500000,Pool|Sauna\n"
+            b",Missing title,2 Broad St,Lagos,Lagos,Nigeria,900,500000,\n"
+            b"Studio,Small,3 Broad St,Abuja,FCT,Nigeria,400,250000,sauna| GYM|Gym\n",
+        )
+
+        # Savepoint, amenity lookup, insert and re-read, properties, links, release.
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(7):
+                response = client.post(reverse("property-import"), {"file": upload})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual([e["row"] for e in response.data["errors"]], [2])
+        self.assertEqual(set(response.data["errors"][0]["errors"]), {"title"})
+        studio = Property.objects.get(title="Studio")
+        self.assertEqual(studio.owner, owner)
+        self.assertEqual(
+            sorted(studio.amenities.values_list("name", flat=True)), ["Gym", "Sauna"]
+        )
+        self.assertEqual(Amenity.objects.filter(name="Sauna").count(), 1)
+        self.assertTrue(SearchDocument.objects.filter(property=studio).exists())
+
+    def test_imported_rows_get_derived_fields(self):
+        owner = Users.objects.filter(user_type="owner").first()
+        client = APIClient()
+        client.force_authenticate(owner)
+        until = (timezone.now() + timedelta(days=3)).isoformat()
+        rows = (
+            "title,description,location,city,state,country,area_sqft,price,"
+            "featured_until,boost_rank\n"
+            f"Loft,Bright,1 Broad St,Lagos,Lagos,Nigeria,900,500000,{until},7\n"
+        )
+        upload = SimpleUploadedFile("listings.csv", rows.encode())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(reverse("property-import"), {"file": upload})
+
+        self.assertEqual(response.status_code, 201, response.data)
+        loft = Property.objects.get(title="Loft")
+        self.assertEqual(loft.rank_score, FEATURED_TIER + 7)
+        self.assertEqual(loft.promotion_expires_at, loft.featured_until)
+
+
+    def test_ids_are_read_back_when_inserts_return_nothing(self):
+        owner = Users.objects.filter(user_type="owner").first()
+        rows = [
+            (i, {**IMPORT_ROW, "title": f"Loft {i}", "amenities": ["Pool"]})
+            for i in range(1, 4)
+        ]
+        features = type(connection.features)
+        with patch.object(features, "can_return_rows_from_bulk_insert", False):
+            result = importer.import_properties(rows, owner)
+
+        self.assertEqual(result.created, 3)
+        lofts = Property.objects.filter(title__startswith="Loft ").order_by("id")
+        self.assertEqual(
+            [list(loft.amenities.values_list("name", flat=True)) for loft in lofts],
+            [["Pool"]] * 3,
+        )
+
+    def test_a_file_that_stops_parsing_reports_what_was_imported(self):
+        owner = Users.objects.filter(user_type="owner").first()
+        client = APIClient()
+        client.force_authenticate(owner)
+        header = ",".join(IMPORT_ROW) + "\n"
+        line = ",".join(str(value) for value in IMPORT_ROW.values()) + "\n"
+        # Decoding fails on a later read, after the first rows were parsed.
+        body = (header + line * 200).encode() + b"Loft,\xff\xfe\n"
+        upload = SimpleUploadedFile("listings.csv", body)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(reverse("property-import"), {"file": upload})
+
+        self.assertEqual(response.status_code, 400)
+        created = response.data["created"]
+        self.assertGreater(created, 0)
+        self.assertIn(f"Stopped reading after row {created}:", response.data["error"])
+        self.assertEqual(Property.objects.filter(title="Loft").count(), created)
+
+    def test_earlier_batches_are_counted_when_reading_fails(self):
+        owner = Users.objects.filter(user_type="owner").first()
+
+        def rows():
+            yield 1, dict(IMPORT_ROW)
+            yield 2, dict(IMPORT_ROW)
+            raise csv.Error("unexpected end of data")
+
+        result = importer.import_properties(rows(), owner, batch_size=1)
+        self.assertEqual((result.created, result.failed), (2, 0))
+        self.assertEqual(
+            result.as_dict()["error"],
+            "Stopped reading after row 2: unexpected end of data",
+        )
+
+
+class PropertyImageProcessingTests(PropertyDataTestCase):
+    def test_variants_are_built_once(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        buffer = BytesIO()
+        Image.new("RGB", (800, 600), (30, 120, 200)).save(buffer, "JPEG")
+        storage = FileSystemStorage(location=media_root, base_url="/media/")
+        with patch.object(images, "storage", storage), patch.object(
+            PropertyImage._meta.get_field("image"), "storage", storage
+        ):
+            image = PropertyImage.objects.filter(is_primary=True).first()
+            image.image = storage.save("properties/photo.jpg", buffer)
+            PropertyImage.objects.filter(id=image.id).update(image=image.image)
+
+            self.assertTrue(images.process_image(image.id))
+            self.assertFalse(images.process_image(image.id))
+
+            image.refresh_from_db()
+            self.assertEqual((image.width, image.height), (800, 600))
+            self.assertEqual(len(image.blurhash), 28)
+            self.assertEqual(
+                sorted((v["format"], v["width"]) for v in image.variants),
+                [("jpeg", 320), ("jpeg", 640), ("webp", 320), ("webp", 640)],
+            )
+            self.assertTrue(image.thumbnail.endswith("-640.webp"))
+            self.assertTrue(all(storage.exists(v["name"]) for v in image.variants))
+
+            card = self.client.get(reverse("property-list"), {"page_size": 100})
+            cards = {row["id"]: row for row in card.data["results"]}
+            self.assertEqual(
+                cards[image.property_id]["image"], f"/media/{image.thumbnail}"
+            )
+
+
+class PromotedOrderingTests(PropertyDataTestCase):
+    def test_active_promotions_lead_and_expire(self):
+        now = timezone.now()
+        first, second, third = Property.objects.order_by("id")[:3]
+        first.boosted_until = now + timedelta(days=1)
+        first.save(update_fields=["boosted_until"])
+        second.featured_until = now + timedelta(hours=1)
+        second.save(update_fields=["featured_until"])
+        # Expired promotions and rows written with update() rank like the rest.
+        Property.objects.filter(id=third.id).update(
+            boosted_until=now - timedelta(days=1), boost_rank=99
+        )
+
+        response = self.client.get(reverse("property-list"), {"sort": "promoted"})
+        ids = [row["id"] for row in response.data["results"]]
+        self.assertEqual(ids[:2], [second.id, first.id])
+        self.assertNotIn(third.id, ids[:3])
+
+        self.assertEqual(refresh_promotion_ranks(now=now + timedelta(hours=2)), 1)
+        second.refresh_from_db()
+        self.assertEqual((second.rank_score, second.promotion_expires_at), (0, None))
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = make_user(1, "owner")
+        owner.save()
+        Property.objects.bulk_create(
+            [
+                Property(
+                    title=f"Property {i}",
+                    description="Quiet street",
+                    location=f"{i} Allen Avenue",
+                    city="Ikeja",
+                    state="Lagos",
+                    country="Nigeria",
+                    area_sqft=900,
+                    bedrooms=2,
+                    max_price=500000,
+                    owner=owner,
+                )
+                for i in range(20)
+            ]
+        )
+        # Every row ties on boost_rank and created_at; only id orders them.
+        Property.objects.update(created_at=timezone.now())
+
+    def setUp(self):
+        cache.clear()
+
+    def list_page(self, **params):
+        response = self.client.get(reverse("property-list"), params)
+        self.assertEqual(response.status_code, 200)
+        next_link = response.data["next"]
+        cursor = next_link and parse_qs(urlsplit(next_link).query)["cursor"][0]
+        return [row["id"] for row in response.data["results"]], cursor
+
+    def test_pages_are_stable_when_sort_keys_tie(self):
+        for view in ("card", "full"):
+            ids, cursor = self.list_page(page_size=7, view=view)
+            while cursor:
+                page, cursor = self.list_page(page_size=7, view=view, cursor=cursor)
+                ids += page
+            self.assertEqual(
+                ids, list(Property.objects.order_by("-id").values_list("id", flat=True))
+            )
+
+    def test_cursor_round_trip(self):
+        paginator = KeysetPagination()
+        created_at = timezone.now()
+        cursor = paginator.encode_cursor([3, created_at, 42])
+        request = Request(APIRequestFactory().get("/", {"cursor": cursor}))
+        position = paginator.decode_cursor(request)
+        self.assertEqual(
+            paginator.clean_position(position, Property.objects.all()),
+            [3, created_at, 42],
+        )
+
+    def test_malformed_cursors_are_not_found(self):
+        paginator = KeysetPagination()
+        cursors = [
+            "not a cursor",
+            paginator.encode_cursor([0, 1]),
+            base64.urlsafe_b64encode(b'{"boost_rank": 0}').decode(),
+            paginator.encode_cursor(["high", "2026-01-01T00:00:00+00:00", 1]),
+            paginator.encode_cursor([0, "yesterday", 1]),
+            paginator.encode_cursor([0, "2026-01-01T00:00:00+00:00", [1]]),
+            paginator.encode_cursor([0, "2026-01-01T00:00:00+00:00", None]),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse("property-list"), {"cursor": cursor})
+                self.assertEqual(response.status_code, 404)
+
+
+class ReviewCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner, *cls.reviewers = Users.objects.bulk_create(
+            [make_user(i, "owner" if i == 0 else "buyer") for i in range(3)]
+        )
+        cls.prop = Property.objects.create(
+            title="Reviewed flat",
+            description="Sea view",
+            location="1 Ozumba Mbadiwe",
+            city="Lagos",
+            state="Lagos",
+            country="Nigeria",
+            area_sqft=800,
+            max_price=2000000,
+            owner=owner,
+        )
+
+    def assertCounters(self, rating_sum, review_count, average_rating):
+        self.prop.refresh_from_db()
+        self.assertEqual(
+            (self.prop.rating_sum, self.prop.review_count, self.prop.average_rating),
+            (rating_sum, review_count, average_rating),
+        )
+
+    def test_counters_follow_review_writes(self):
+        first = PropertyReview.objects.create(
+            property=self.prop, user=self.reviewers[0], rating=4
+        )
+        self.assertCounters(4, 1, 4.0)
+        second = PropertyReview.objects.create(
+            property=self.prop, user=self.reviewers[1], rating=1
+        )
+        self.assertCounters(5, 2, 2.5)
+
+        first.rating = 5
+        first.save()
+        self.assertCounters(6, 2, 3.0)
+        # A loaded review knows its old rating; saving it unchanged is a no-op.
+        second = PropertyReview.objects.get(pk=second.pk)
+        second.save()
+        self.assertCounters(6, 2, 3.0)
+        second.rating = 3
+        second.save()
+        self.assertCounters(8, 2, 4.0)
+
+        first.delete()
+        self.assertCounters(3, 1, 3.0)
+        second.delete()
+        self.assertCounters(0, 0, 0.0)
+
+    def test_rebuild_matches_the_signals(self):
+        for reviewer, rating in zip(self.reviewers, (2, 5)):
+            PropertyReview.objects.create(
+                property=self.prop, user=reviewer, rating=rating
+            )
+        Property.objects.filter(pk=self.prop.pk).update(
+            rating_sum=0, review_count=0, average_rating=0
+        )
+        call_command("rebuild_rating_counters", stdout=StringIO())
+        self.assertCounters(7, 2, 3.5)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class ResponseCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = make_user(1, "owner")
+        owner.save()
+        cls.prop = Property.objects.create(
+            title="Cached flat",
+            description="Near the bridge",
+            location="2 Bourdillon Road",
+            city="Ikoyi",
+            state="Lagos",
+            country="Nigeria",
+            area_sqft=1000,
+            max_price=3000000,
+            owner=owner,
+        )
+        cls.gym = Amenity.objects.create(name="Gym")
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("property-detail", args=[self.prop.id])
+
+    def test_reads_before_the_commit_are_not_served_after_it(self):
+        first = self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.prop.title = "Renamed flat"
+                self.prop.save()
+            # A read before the commit caches under the version it started at.
+            self.client.get(self.url)
+
+        after = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(after.status_code, 200)
+        self.assertEqual(after["X-Cache"], "MISS")
+        self.assertEqual(after.data["title"], "Renamed flat")
+
+    def test_one_bump_per_amenity_write(self):
+        with patch.object(response_cache, "bump_version") as bump_version:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.prop.amenities.add(self.gym)
+                bump_version.assert_not_called()
+            self.assertEqual(bump_version.call_count, 1)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.prop.amenities.remove(self.gym)
+            self.assertEqual(bump_version.call_count, 2)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class PropertyPatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user(1, "owner")
+        cls.owner.save()
+        cls.prop = Property.objects.create(
+            title="Two bedroom flat",
+            description="Close to the market",
+            location="4 Herbert Macaulay Way",
+            city="Yaba",
+            state="Lagos",
+            country="Nigeria",
+            area_sqft=750,
+            bedrooms=2,
+            max_price=900000,
+            owner=cls.owner,
+        )
+        cls.prop.amenities.add(Amenity.objects.create(name="Gym"))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def patch(self, data):
+        """The columns each UPDATE of the property row set."""
+        url = reverse("property-detail", args=[self.prop.id])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(url, data, format="json")
+        self.assertEqual(response.status_code, 200)
+        return [
+            set(re.findall(r'"(\w+)" = ', sql.split(" WHERE ")[0]))
+            for sql in (query["sql"] for query in queries)
+            if sql.startswith('UPDATE "properties" SET')
+        ]
+
+    def test_unchanged_patch_writes_nothing(self):
+        updated_at = self.prop.updated_at
+        updates = self.patch(
+            {"title": "Two bedroom flat", "bedrooms": 2, "amenities": ["gym"]}
+        )
+        self.assertEqual(updates, [])
+        self.prop.refresh_from_db()
+        self.assertEqual(self.prop.updated_at, updated_at)
+
+    def test_patch_writes_only_the_changed_field(self):
+        self.assertEqual(self.patch({"bedrooms": 3}), [{"bedrooms", "updated_at"}])
+        self.prop.refresh_from_db()
+        self.assertEqual(self.prop.bedrooms, 3)
+
+    def test_patch_writes_the_fields_derived_from_it(self):
+        self.assertEqual(
+            self.patch({"boost_rank": 7}),
+            [{"boost_rank", "updated_at", "rank_score", "promotion_expires_at"}],
+        )
+
+
+class PropertyChangeLogTests(PropertyDataTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def log_writes(self, callbacks):
+        return [
+            callback
+            for callback in callbacks
+            if isinstance(getattr(callback, "__self__", None), changes.Batch)
+        ]
+
+    def test_one_write_per_transaction_after_commit(self):
+        props = list(Property.objects.order_by("id")[:3])
+        ids = [prop.id for prop in props]
+        before = PropertyChange.objects.count()
+        with self.captureOnCommitCallbacks() as callbacks:
+            for prop in props:
+                prop.save(update_fields=["boost_rank"])
+            props[0].delete()
+        writes = self.log_writes(callbacks)
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(PropertyChange.objects.count(), before)
+
+        with self.assertNumQueries(1):
+            writes[0]()
+        logged = PropertyChange.objects.order_by("id")[before:]
+        self.assertEqual(
+            {(c.property_id, c.deleted) for c in logged},
+            {(ids[0], True), (ids[1], False), (ids[2], False)},
+        )
+        self.assertGreaterEqual(changes.head(), logged.last().created_at.timestamp())
+
+    def test_changes_committed_behind_the_position_are_seen(self):
+        position = changes.head()
+        prop = Property.objects.first()
+        # Logged by a transaction that started before the position was read.
+        PropertyChange.objects.create(property_id=prop.id)
+        PropertyChange.objects.update(
+            created_at=timezone.now() - changes.GRACE / 2
+        )
+        self.assertEqual(changes.changed_since(position), {prop.id})
+        self.assertEqual(changes.changed_since(position + 60), set())
+
+    def test_rolled_back_writes_are_not_logged(self):
+        props = list(Property.objects.order_by("id")[:2])
+        with self.captureOnCommitCallbacks() as callbacks:
+            try:
+                with transaction.atomic():
+                    props[0].save()
+                    raise ValueError
+            except ValueError:
+                pass
+            props[1].save()
+        writes = self.log_writes(callbacks)
+        self.assertEqual(len(writes), 1)
+        before = PropertyChange.objects.count()
+        writes[0]()
+        self.assertEqual(
+            list(PropertyChange.objects.values_list("property_id", flat=True)[before:]),
+            [props[1].id],
+        )
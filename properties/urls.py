@@ -1,7 +1,13 @@
 from django.urls import path
+from raininfotech.settings import ASYNC_VIEWS
 from .views import (
+    AsyncPropertyCompareView,
+    AsyncPropertyListCreateView,
+    AsyncPropertyRetrieveUpdateView,
     PropertyListCreateView,
     PropertyRetrieveUpdateView,
+    PropertyImageUploadView,
+    PropertyImportView,
     PropertyDeleteView,
     AddRemoveFavoriteView,
     UserFavoritesListView,
@@ -9,12 +15,20 @@ from .views import (
     PropertyReviewCreateView,
     PropertyReviewListView,
     PropertyTypeListView,
+    ResponseCacheStatsView,
 )
 
+if ASYNC_VIEWS:
+    PropertyListCreateView = AsyncPropertyListCreateView
+    PropertyRetrieveUpdateView = AsyncPropertyRetrieveUpdateView
+    PropertyCompareView = AsyncPropertyCompareView
+
 urlpatterns = [
     path("properties/", PropertyListCreateView.as_view(), name="property-list"),
     path("properties/create/", PropertyListCreateView.as_view(), name="property-create"),
+    path("properties/import/", PropertyImportView.as_view(), name="property-import"),
     path("properties/<int:id>/", PropertyRetrieveUpdateView.as_view(), name="property-detail"),
+    path("properties/<int:id>/images/", PropertyImageUploadView.as_view(), name="property-image-upload"),
     path("properties/<int:id>/delete/", PropertyDeleteView.as_view(), name="property-delete"),
     path("properties/<int:id>/favorite/", AddRemoveFavoriteView.as_view(), name="add-remove-favorite"),
     path("users/favorites/", UserFavoritesListView.as_view(), name="user-favorites"),
@@ -22,4 +36,5 @@ urlpatterns = [
     path("properties/<int:property_id>/reviews/", PropertyReviewListView.as_view(), name="property-review-list"),
     path("properties/<int:property_id>/reviews/add/", PropertyReviewCreateView.as_view(), name="property-review-create"),
     path("properties/types/", PropertyTypeListView.as_view(), name="property-types"),
+    path("properties/cache/stats/", ResponseCacheStatsView.as_view(), name="property-cache-stats"),
 ]
@@ -1,20 +1,65 @@
-from django.db.models import Avg
+from django.db import transaction
+from django.shortcuts import get_object_or_404
 from rest_framework import generics, filters, status, permissions
+from rest_framework.parsers import MultiPartParser
+from properties import importer
+from properties.cache import (
+    AsyncCachedResponseMixin,
+    CachedResponseMixin,
+    stats as response_cache_stats,
+)
+from properties.pagination import KeysetPagination
 from properties.permissions import ReadOnlyOrAuthenticated
+from properties.promotion import PROMOTED_ORDERING, wants_promoted
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from .models import Property, Favorite, PropertyReview
-from .serializers import FavoriteSerializer, PropertySerializer, PropertyReviewSerializer
+from .serializers import (
+    FavoriteCardSerializer,
+    FavoriteSerializer,
+    PropertyCardSerializer,
+    PropertyImageSerializer,
+    PropertySerializer,
+    PropertyReviewSerializer,
+    card_values,
+    wants_cards,
+)
 from rest_framework.exceptions import PermissionDenied
+from raininfotech.async_views import (
+    AsyncAPIViewMixin,
+    AsyncListModelMixin,
+    AsyncRetrieveModelMixin,
+    serialize,
+)
 
 
-class PropertyListCreateView(generics.ListCreateAPIView):
+class PropertyListCreateView(CachedResponseMixin, generics.ListCreateAPIView):
     queryset = Property.objects.all().prefetch_related("images", "amenities")
     serializer_class = PropertySerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = KeysetPagination
+    filter_backends = [filters.SearchFilter]
     search_fields = ["title", "city", "state"]
-    ordering_fields = ["price", "created_at"]
+
+    @property
+    def keyset_ordering(self):
+        return PROMOTED_ORDERING if wants_promoted(self.request) else None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.lists_cards():
+            ordering = self.keyset_ordering or KeysetPagination.ordering
+            keyset = [field.lstrip("-") for field in ordering]
+            return card_values(queryset, extra=keyset)
+        return queryset
+
+    def get_serializer_class(self):
+        if self.lists_cards():
+            return PropertyCardSerializer
+        return PropertySerializer
+
+    def lists_cards(self):
+        return self.request.method == "GET" and wants_cards(self.request)
 
     def get_permissions(self):
         if self.request.method == "POST":
@@ -32,13 +77,93 @@ class PropertyListCreateView(generics.ListCreateAPIView):
         serializer.save(owner=user)
 
 
-class PropertyRetrieveUpdateView(generics.RetrieveUpdateAPIView):
+class PropertyImportView(APIView):
+    """
+    Bulk-create the authenticated owner's listings from an uploaded CSV or
+    JSON Lines ``file``. Responds with the created count and per-row errors.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser]
+    max_reported_errors = 1000
+
+    def post(self, request):
+        if request.user.user_type != "owner":
+            raise PermissionDenied(
+                "Only users with 'owner' user_type can create properties."
+            )
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response(
+                {"error": "Upload the listings as 'file'."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        fmt = importer.detect_format(upload.name, request.data.get("format"))
+        if fmt not in importer.FORMATS:
+            return Response(
+                {"error": f"Unsupported format; use one of {importer.FORMATS}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        result = importer.import_properties(
+            importer.read_rows(importer.text_stream(upload), fmt), request.user
+        )
+        # A file that stopped parsing still reports what was created from it.
+        if result.error:
+            code = status.HTTP_400_BAD_REQUEST
+        elif result.created:
+            code = status.HTTP_201_CREATED
+        elif result.failed:
+            code = status.HTTP_400_BAD_REQUEST
+        else:
+            code = status.HTTP_200_OK
+        return Response(result.as_dict(self.max_reported_errors), status=code)
+
+
+class PropertyRetrieveUpdateView(CachedResponseMixin, generics.RetrieveUpdateAPIView):
     queryset = Property.objects.all().prefetch_related("images", "amenities")
     serializer_class = PropertySerializer
     permission_classes = [ReadOnlyOrAuthenticated]
     lookup_field = "id"
 
 
+class AsyncPropertyListCreateView(
+    AsyncAPIViewMixin,
+    AsyncCachedResponseMixin,
+    AsyncListModelMixin,
+    PropertyListCreateView,
+):
+    """PropertyListCreateView with an async GET, used under ASGI."""
+
+
+class AsyncPropertyRetrieveUpdateView(
+    AsyncAPIViewMixin,
+    AsyncCachedResponseMixin,
+    AsyncRetrieveModelMixin,
+    PropertyRetrieveUpdateView,
+):
+    """PropertyRetrieveUpdateView with an async GET, used under ASGI."""
+
+
+class PropertyImageUploadView(generics.CreateAPIView):
+    """
+    Add a photo to one of the owner's properties. Responsive variants are
+    built in the background (see properties.images).
+    """
+
+    serializer_class = PropertyImageSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def perform_create(self, serializer):
+        prop = get_object_or_404(Property, id=self.kwargs["id"])
+        if prop.owner_id != self.request.user.id:
+            raise PermissionDenied("You can only add photos to your own properties.")
+        with transaction.atomic():
+            if serializer.validated_data.get("is_primary"):
+                prop.images.filter(is_primary=True).update(is_primary=False)
+            serializer.save(property=prop)
+
+
 class PropertyDeleteView(generics.DestroyAPIView):
     queryset = Property.objects.all()
     serializer_class = PropertySerializer
@@ -81,9 +206,15 @@ class UserFavoritesListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Favorite.objects.filter(user=self.request.user).select_related(
-            "property"
-        )
+        favorites = Favorite.objects.filter(user=self.request.user)
+        if wants_cards(self.request):
+            return card_values(favorites, "property__", extra=("id", "created_at"))
+        return favorites.select_related("property")
+
+    def get_serializer_class(self):
+        if wants_cards(self.request):
+            return FavoriteCardSerializer
+        return FavoriteSerializer
 
 
 class PropertyCompareView(APIView):
@@ -103,6 +234,22 @@ class PropertyCompareView(APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class AsyncPropertyCompareView(AsyncAPIViewMixin, PropertyCompareView):
+    """PropertyCompareView with an async POST, used under ASGI."""
+
+    async def post(self, request):
+        ids = request.data.get("property_ids", [])
+        if not ids or not isinstance(ids, list):
+            return Response(
+                {"error": "A list of property IDs is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        properties = [p async for p in Property.objects.filter(id__in=ids)]
+        data = await serialize(PropertySerializer, properties, many=True)
+        return Response(data, status=status.HTTP_200_OK)
+
+
 class PropertyReviewCreateView(generics.CreateAPIView):
     queryset = PropertyReview.objects.all()
     serializer_class = PropertyReviewSerializer
@@ -116,11 +263,16 @@ class PropertyReviewListView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, property_id):
-        reviews = PropertyReview.objects.filter(property_id=property_id).order_by(
-            "-created_at"
+        reviews = (
+            PropertyReview.objects.filter(property_id=property_id)
+            .select_related("user")
+            .order_by("-created_at")
         )
-        total_reviews = reviews.count()
-        avg_rating = reviews.aggregate(avg=Avg("rating"))["avg"] or 0.0
+        stats = Property.objects.filter(id=property_id).values(
+            "review_count", "average_rating"
+        ).first() or {"review_count": 0, "average_rating": 0.0}
+        total_reviews = stats["review_count"]
+        avg_rating = stats["average_rating"] or 0.0
 
         serializer = PropertyReviewSerializer(reviews, many=True)
 
@@ -155,3 +307,10 @@ class PropertyTypeListView(APIView):
     def get(self, request):
         types = [{"value": key, "label": label} for key, label in Property.TYPE_CHOICES]
         return Response(types, status=status.HTTP_200_OK)
+
+
+class ResponseCacheStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(response_cache_stats(), status=status.HTTP_200_OK)
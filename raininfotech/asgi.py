@@ -0,0 +1,8 @@
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'raininfotech.settings')
+# Route the read-heavy endpoints to their async views (see ASYNC_VIEWS).
+os.environ.setdefault('ASYNC_VIEWS', '1')
+
+application = get_asgi_application()
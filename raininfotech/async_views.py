@@ -0,0 +1,88 @@
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.shortcuts import aget_object_or_404
+from django.utils.functional import classproperty
+from rest_framework.response import Response
+
+
+class AsyncAPIViewMixin:
+    """
+    Lets an APIView declare ``async def`` handlers.
+
+    Authentication, permission and throttling checks, and any handler left
+    synchronous (typically the write methods), run through sync_to_async;
+    async handlers run on the event loop. Under ASGI this keeps slow
+    clients and database waits from tying up a worker thread. Under WSGI
+    Django still works, wrapping the view in async_to_sync.
+    """
+
+    @classproperty
+    def view_is_async(cls):
+        return True
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(
+                    self, request.method.lower(), self.http_method_not_allowed
+                )
+            else:
+                handler = self.http_method_not_allowed
+            if not iscoroutinefunction(handler):
+                handler = sync_to_async(handler)
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+class AsyncListModelMixin:
+    """Async ``get`` for list views; the paginator must support apaginate_queryset."""
+
+    async def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+        data = await serialize(self.get_serializer, page, many=True)
+        return self.get_paginated_response(data)
+
+
+class AsyncRetrieveModelMixin:
+    """Async ``get`` for detail views, looked up with the async ORM."""
+
+    async def get(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        data = await serialize(self.get_serializer, instance)
+        return Response(data)
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filters = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            obj = await aget_object_or_404(queryset, **filters)
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+
+async def serialize(serializer_class, instance, **kwargs):
+    """
+    Serialize off the event loop: serializers may still prefetch related
+    rows, and the sync ORM is not allowed on the loop.
+    """
+
+    def run():
+        return serializer_class(instance, **kwargs).data
+
+    return await sync_to_async(run)()
@@ -0,0 +1,284 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import PyLibMCCache, PyMemcacheCache
+from django.core.cache.backends.redis import RedisCache
+from django.core.checks import Error, Tags, register
+from django.core.files import locks
+
+# Marks a key known to be absent from the shared tier (negative caching).
+_MISSING = object()
+# Returned by the local store when it holds nothing for a key.
+_ABSENT = object()
+
+# Values of these types are immutable and kept as-is in the local tier;
+# anything else is stored pickled so callers never share a mutable object.
+_IMMUTABLE_TYPES = (bool, int, float, str, bytes, type(None))
+
+SEQUENCE_KEY = "twotier:invalidation_seq"
+INVALIDATION_PREFIX = "twotier:invalidation:"
+INVALIDATION_TIMEOUT = 300
+CLEAR_ALL = "*"
+# Shared tiers whose incr() is atomic. The invalidation sequence needs it:
+# two writers given the same number overwrite each other's entry.
+ATOMIC_INCR_BACKENDS = (RedisCache, PyMemcacheCache, PyLibMCCache, LocMemCache)
+# FileBasedCache.incr() reads then writes; this file in its directory is
+# locked around it instead.
+SEQUENCE_LOCK_FILE = "twotier-sequence.lock"
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class _Pickled:
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+
+class LocalStore:
+    """Bounded LRU with per-entry expiry, shared by every thread of a process."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.sequence = None
+        self.synced_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return _ABSENT
+            self.entries.move_to_end(key)
+            self.hits += 1
+            value = item[1]
+        if isinstance(value, _Pickled):
+            return pickle.loads(value.data)
+        return value
+
+    def set(self, key, value, ttl):
+        if ttl is not None and ttl <= 0:
+            self.delete(key)
+            return
+        if value is not _MISSING and not isinstance(value, _IMMUTABLE_TYPES):
+            value = _Pickled(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class TwoTierCache(BaseCache):
+    """
+    A bounded in-process LRU in front of a shared cache alias (Redis in
+    production, anything Django supports otherwise).
+
+    Reads are served from the process-local tier when possible, including
+    short-lived negative entries for keys the shared tier does not have.
+    Every write is published to an invalidation log in the shared tier
+    (a sequence counter plus one key per change); each process replays the
+    log at most every SYNC_INTERVAL seconds and drops the keys other
+    processes changed, so cross-process staleness is bounded by that
+    interval.
+
+    The shared tier must increment atomically (ATOMIC_INCR_BACKENDS, or the
+    file cache, which is locked); the raininfotech.E001 check enforces it.
+
+    LOCATION names the shared cache alias. OPTIONS: LOCAL_MAX_ENTRIES,
+    LOCAL_TIMEOUT, NEGATIVE_TIMEOUT, SYNC_INTERVAL, MAX_REPLAY.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._shared_alias = location
+        self.local_timeout = options.get("LOCAL_TIMEOUT", 5)
+        self.negative_timeout = options.get("NEGATIVE_TIMEOUT", 5)
+        self.sync_interval = options.get("SYNC_INTERVAL", 1)
+        self.max_replay = options.get("MAX_REPLAY", 500)
+        with _stores_lock:
+            self._local = _stores.setdefault(
+                location, LocalStore(options.get("LOCAL_MAX_ENTRIES", 10000))
+            )
+
+    @property
+    def _shared(self):
+        return caches[self._shared_alias]
+
+    def _local_ttl(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            return self.local_timeout
+        return min(timeout - time.time(), self.local_timeout)
+
+    # Local keys use make_key() only; the shared tier validates keys itself.
+
+    def get(self, key, default=None, version=None):
+        self._sync()
+        local_key = self.make_key(key, version=version)
+        value = self._local.get(local_key)
+        if value is _ABSENT:
+            value = self._shared.get(key, _MISSING, version=version)
+            ttl = self.negative_timeout if value is _MISSING else self.local_timeout
+            self._local.set(local_key, value, ttl)
+        return default if value is _MISSING else value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_key(key, version=version)
+        self._shared.set(key, value, timeout=self._shared_timeout(timeout), version=version)
+        self._local.set(local_key, value, self._local_ttl(timeout))
+        self._publish(local_key)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_key(key, version=version)
+        added = self._shared.add(
+            key, value, timeout=self._shared_timeout(timeout), version=version
+        )
+        if added:
+            self._local.set(local_key, value, self._local_ttl(timeout))
+            self._publish(local_key)
+        else:
+            # The key exists after all; forget a negative entry for it.
+            self._local.delete(local_key)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_key(key, version=version)
+        self._local.delete(local_key)
+        return self._shared.touch(key, timeout=self._shared_timeout(timeout), version=version)
+
+    def delete(self, key, version=None):
+        local_key = self.make_key(key, version=version)
+        deleted = self._shared.delete(key, version=version)
+        self._local.delete(local_key)
+        self._publish(local_key)
+        return deleted
+
+    def incr(self, key, delta=1, version=None):
+        local_key = self.make_key(key, version=version)
+        value = self._shared.incr(key, delta, version=version)
+        self._local.delete(local_key)
+        self._publish(local_key)
+        return value
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def clear(self):
+        self._shared.clear()
+        self._local.clear()
+        self._publish(CLEAR_ALL)
+
+    def _shared_timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _publish(self, local_key):
+        shared = self._shared
+        sequence = self._next_sequence(shared)
+        shared.set(
+            f"{INVALIDATION_PREFIX}{sequence}", local_key, timeout=INVALIDATION_TIMEOUT
+        )
+        store = self._local
+        with store.lock:
+            # Our own change is already applied locally.
+            if store.sequence == sequence - 1:
+                store.sequence = sequence
+
+    def _next_sequence(self, shared):
+        if not isinstance(shared, FileBasedCache):
+            return self._incr_sequence(shared)
+        os.makedirs(shared._dir, exist_ok=True)
+        with open(os.path.join(shared._dir, SEQUENCE_LOCK_FILE), "ab") as lock:
+            locks.lock(lock, locks.LOCK_EX)
+            try:
+                return self._incr_sequence(shared)
+            finally:
+                locks.unlock(lock)
+
+    def _incr_sequence(self, shared):
+        try:
+            return shared.incr(SEQUENCE_KEY)
+        except ValueError:
+            shared.add(SEQUENCE_KEY, 0, timeout=None)
+            return shared.incr(SEQUENCE_KEY)
+
+    def _sync(self):
+        store = self._local
+        now = time.monotonic()
+        if now - store.synced_at < self.sync_interval:
+            return
+        store.synced_at = now
+
+        head = self._shared.get(SEQUENCE_KEY)
+        with store.lock:
+            seen = store.sequence
+            store.sequence = head
+        if head == seen:
+            return
+        if head is None or seen is None or head < seen or head - seen > self.max_replay:
+            store.clear()
+            return
+
+        keys = [f"{INVALIDATION_PREFIX}{n}" for n in range(seen + 1, head + 1)]
+        changed = self._shared.get_many(keys)
+        if len(changed) < len(keys) or CLEAR_ALL in changed.values():
+            store.clear()
+            return
+        for local_key in changed.values():
+            store.delete(local_key)
+
+    def stats(self):
+        store = self._local
+        return {
+            "local_hits": store.hits,
+            "local_misses": store.misses,
+            "local_entries": len(store.entries),
+            "sequence": store.sequence,
+        }
+
+
+@register(Tags.caches)
+def check_shared_tiers(app_configs, **kwargs):
+    errors = []
+    for alias in settings.CACHES:
+        cache = caches[alias]
+        if not isinstance(cache, TwoTierCache):
+            continue
+        shared = cache._shared
+        if not isinstance(shared, (*ATOMIC_INCR_BACKENDS, FileBasedCache)):
+            errors.append(
+                Error(
+                    f"The shared tier of the {alias!r} cache, "
+                    f"{type(shared).__name__}, does not increment atomically, "
+                    "so invalidations between processes can be lost.",
+                    hint="Use Redis or memcached as the shared tier.",
+                    obj=alias,
+                    id="raininfotech.E001",
+                )
+            )
+    return errors
@@ -1,9 +1,13 @@
 import re
+import uuid
 import jwt
 from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Cast
 from datetime import datetime, timedelta, timezone
 from raininfotech import settings
-from users.models import UserTokenLog
+from users.token_log import token_logs
 
 
 def email_validation(email):
@@ -16,6 +20,7 @@ def email_validation(email):
 def create_token(user):
     access_payload = {
         "sub": str(user.id),
+        "jti": uuid.uuid4().hex,
         "type": "access",
         "iat": datetime.now(timezone.utc),
         "exp": datetime.now(timezone.utc) + timedelta(minutes=15),  # Short-lived access token
@@ -23,6 +28,7 @@ def create_token(user):
 
     refresh_payload = {
         "sub": str(user.id),
+        "jti": uuid.uuid4().hex,
         "type": "refresh",
         "iat": datetime.now(timezone.utc),
         "exp": datetime.now(timezone.utc) + timedelta(days=settings.JWT_EXPIRY_DAY),  # Long-lived refresh token
@@ -45,16 +51,9 @@ def encodeJwt(payload):
 
 
 def user_token_log(user_id, token, is_block=0):
-    try:
-        # Create a log entry for the token
-        user_log = UserTokenLog.objects.create(
-            user_id=user_id,
-            user_token=token,
-            is_block=is_block,
-        )
-        user_log.save()
-    except Exception as e:
-        print(f"Error logging token: {e}")
+    # Buffered; the row is written by the token log writer within
+    # TOKEN_LOG_FLUSH_SECONDS.
+    token_logs.log(user_id, token, is_block)
 
 
 def decodeJwt(encoded, verify=True):
@@ -76,3 +75,28 @@ def decodeJwt(encoded, verify=True):
 
 def cache_set(key, value, expiry=300):
     cache.set(key, value, timeout=expiry)
+
+
+def apply_rating_delta(model, pk, rating_delta, count_delta, average_field):
+    """
+    Adjust the denormalized rating_sum/review_count columns of a single row
+    with F() expressions and refresh its average from the new totals.
+    """
+    with transaction.atomic():
+        rows = model.objects.filter(pk=pk)
+        rows.update(
+            rating_sum=F("rating_sum") + rating_delta,
+            review_count=F("review_count") + count_delta,
+        )
+        rows.update(
+            **{
+                average_field: Case(
+                    When(
+                        review_count__gt=0,
+                        then=Cast("rating_sum", FloatField()) / F("review_count"),
+                    ),
+                    default=Value(0.0),
+                    output_field=FloatField(),
+                )
+            }
+        )
@@ -0,0 +1,43 @@
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pinned in requirements.txt; falls back to the stdlib encoder
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed.
+
+    Datetimes, Decimals, lazy strings and anything else orjson does not
+    handle natively are passed to DRF's JSONEncoder.default(), so values
+    come out the same as with the stdlib path. Indented output, for example
+    from the browsable API, still goes through json.dumps.
+    """
+
+    options = (
+        orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS if orjson else 0
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=JSONEncoder().default, option=self.options)
+        # Same strict-javascript-subset escaping as JSONRenderer.
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+class NDJSONRenderer(FastJSONRenderer):
+    """
+    Lets views accept ``application/x-ndjson``. Views stream their rows
+    themselves; ordinary responses (errors, say) still render as JSON.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
@@ -98,6 +98,10 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "raininfotech.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
 }
 
 LOGGING = {
@@ -116,11 +120,33 @@ LOGGING = {
     },
 }
 
+# "default" keeps a small in-process LRU in front of the "shared" cache; see
+# raininfotech/cache.py. Set REDIS_URL to share it between processes and hosts,
+# otherwise the file cache below is the shared tier. The shared tier must
+# increment atomically (check raininfotech.E001): Redis, memcached, or the
+# file cache, whose increments are locked.
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
-        "LOCATION": BASE_DIR / "django_cache",  # ✅ absolute path
-    }
+        "BACKEND": "raininfotech.cache.TwoTierCache",
+        "LOCATION": "shared",
+        "OPTIONS": {
+            "LOCAL_MAX_ENTRIES": int(ENV.get("CACHE_LOCAL_MAX_ENTRIES", 10000)),
+            "LOCAL_TIMEOUT": int(ENV.get("CACHE_LOCAL_TIMEOUT", 5)),
+            "NEGATIVE_TIMEOUT": int(ENV.get("CACHE_NEGATIVE_TIMEOUT", 5)),
+            "SYNC_INTERVAL": float(ENV.get("CACHE_SYNC_INTERVAL", 1)),
+        },
+    },
+    "shared": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": ENV["REDIS_URL"],
+        }
+        if ENV.get("REDIS_URL")
+        else {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": BASE_DIR / "django_cache",  # ✅ absolute path
+        }
+    ),
 }
 
 
@@ -128,6 +154,38 @@ REDIS_BLACKLIST_EXPIRY_SECONDS = int(
     ENV.get("REDIS_BLACKLIST_EXPIRY_SECONDS", 60 * 60 * 24 * 7)
 )  # 7 days
 
+# How often each process tops up its in-memory revoked-jti filter.
+JWT_REVOCATION_SYNC_SECONDS = int(ENV.get("JWT_REVOCATION_SYNC_SECONDS", 5))
+
+# Upper bound on how long a process may authenticate from a cached user row.
+AUTH_USER_CACHE_SECONDS = int(ENV.get("AUTH_USER_CACHE_SECONDS", 30))
+
+# Token log rows are buffered and bulk-inserted; see users/token_log.py.
+TOKEN_LOG_ASYNC = ENV.get("TOKEN_LOG_ASYNC", "1") == "1"
+TOKEN_LOG_BATCH_SIZE = int(ENV.get("TOKEN_LOG_BATCH_SIZE", 200))
+TOKEN_LOG_FLUSH_SECONDS = float(ENV.get("TOKEN_LOG_FLUSH_SECONDS", 1))
+TOKEN_LOG_QUEUE_SIZE = int(ENV.get("TOKEN_LOG_QUEUE_SIZE", 10000))
+# Monthly token log buckets older than this are pruned by prune_token_logs.
+TOKEN_LOG_RETENTION_DAYS = int(ENV.get("TOKEN_LOG_RETENTION_DAYS", 90))
+
+# Serve the property listing, detail, compare and search endpoints with their
+# async views. raininfotech/asgi.py turns this on; WSGI keeps the sync views.
+ASYNC_VIEWS = ENV.get("ASYNC_VIEWS", "0") == "1"
+
+# Property image variants are built by a per-process thread pool after the
+# upload commits (see properties/images.py), or inline when this is off.
+IMAGE_PROCESSING_ASYNC = ENV.get("IMAGE_PROCESSING_ASYNC", "1") == "1"
+IMAGE_PROCESSING_WORKERS = int(ENV.get("IMAGE_PROCESSING_WORKERS", 2))
+
+# Each process rebuilds its in-memory search suggestions (search/suggest.py)
+# this often, to pick up properties written by other processes.
+SUGGEST_REFRESH_SECONDS = int(ENV.get("SUGGEST_REFRESH_SECONDS", 300))
+
+# Stale search result lists are recomputed on a small per-process thread
+# pool while the old ids are served (see search/results.py), or inline when
+# this is off.
+SEARCH_REVALIDATE_ASYNC = ENV.get("SEARCH_REVALIDATE_ASYNC", "1") == "1"
+
 TIME_ZONE = "Asia/Kolkata"
 JWT_EXPIRY_DAY = int(ENV.get("JWT_EXPIRY_DAY", 20))
 
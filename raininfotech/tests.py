@@ -0,0 +1,109 @@
+import shutil
+import tempfile
+import threading
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from raininfotech.cache import (
+    INVALIDATION_PREFIX,
+    SEQUENCE_KEY,
+    LocalStore,
+    TwoTierCache,
+    check_shared_tiers,
+)
+
+LOCMEM = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+TWO_TIER = {"BACKEND": "raininfotech.cache.TwoTierCache", "LOCATION": "shared"}
+
+
+def process_cache(sync_interval=0):
+    """A TwoTierCache with a local tier of its own, like another process's."""
+    cache = TwoTierCache("shared", {"OPTIONS": {"SYNC_INTERVAL": sync_interval}})
+    cache._local = LocalStore(100)
+    return cache
+
+
+@override_settings(CACHES={"default": LOCMEM, "shared": LOCMEM})
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        caches["shared"].clear()
+
+    def test_writes_invalidate_other_processes(self):
+        first, second = process_cache(), process_cache()
+        first.set("key", 1)
+        self.assertEqual(second.get("key"), 1)
+
+        first.set("key", 2)
+        self.assertEqual(second.get("key"), 2)
+        first.incr("key")
+        self.assertEqual(second.get("key"), 3)
+        first.delete("key")
+        self.assertIsNone(second.get("key"))
+
+        second.get("other")  # Cached as absent.
+        first.set("other", "value")
+        self.assertEqual(second.get("other"), "value")
+
+    def test_local_tier_is_served_until_the_next_sync(self):
+        first, second = process_cache(), process_cache(sync_interval=60)
+        first.set("key", 1)
+        self.assertEqual(second.get("key"), 1)
+        first.set("key", 2)
+        self.assertEqual(second.get("key"), 1)
+        self.assertEqual(second.stats()["local_hits"], 1)
+
+    def test_failed_add_drops_the_negative_entry(self):
+        writer, reader = process_cache(), process_cache(sync_interval=60)
+        self.assertIsNone(reader.get("key"))
+        writer.set("key", 1)
+
+        self.assertFalse(reader.add("key", 2))
+        self.assertEqual(reader.get("key"), 1)
+
+    def test_check_accepts_atomic_shared_tiers(self):
+        self.assertEqual(check_shared_tiers(None), [])
+
+    def test_check_rejects_a_database_shared_tier(self):
+        database = {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "cache_table",
+        }
+        with self.settings(CACHES={"default": TWO_TIER, "shared": database}):
+            errors = check_shared_tiers(None)
+        self.assertEqual([error.id for error in errors], ["raininfotech.E001"])
+
+
+class FileSharedTierTests(SimpleTestCase):
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        shared = {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": location,
+            "OPTIONS": {"MAX_ENTRIES": 1000},
+        }
+        settings = self.settings(CACHES={"default": TWO_TIER, "shared": shared})
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_concurrent_writes_get_distinct_sequence_numbers(self):
+        cache = process_cache()
+        threads = [
+            threading.Thread(
+                target=lambda n=n: [cache.set(f"key-{n}-{i}", i) for i in range(25)]
+            )
+            for n in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        shared = caches["shared"]
+        self.assertEqual(shared.get(SEQUENCE_KEY), 200)
+        published = shared.get_many(
+            [f"{INVALIDATION_PREFIX}{n}" for n in range(1, 201)]
+        )
+        self.assertEqual(len(set(published.values())), 200)
+        self.assertEqual(check_shared_tiers(None), [])
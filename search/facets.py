@@ -0,0 +1,150 @@
+"""
+Facet counts for the advanced search (``facets=``).
+
+Every requested facet value becomes one conditional COUNT, so all counts
+for the current filter set come back from a single aggregate query. The
+result is cached under the normalized filters and the property
+response-cache version, so any property change invalidates it.
+"""
+import hashlib
+import json
+from django.core.cache import cache
+from django.db.models import Count, Q
+from rest_framework.exceptions import ValidationError
+from properties import cache as response_cache
+from properties.models import Property
+
+FACETS_PARAM = "facets"
+ALL_FACETS = ("all", "1", "true")
+FACET_TIMEOUT = 300
+
+# Query parameters that AdvancedPropertySearchView.apply_filters reads.
+FILTER_PARAMS = (
+    "location",
+    "city",
+    "state",
+    "category",
+    "type",
+    "bedrooms",
+    "mini_price",
+    "max_price",
+    "furnished",
+    "serviced",
+    "keyword",
+    "near",
+    "radius_km",
+    "bbox",
+)
+BOOLEAN_PARAMS = ("furnished", "serviced")
+
+BEDROOM_BUCKETS = (
+    ("0", Q(bedrooms__lte=0)),
+    ("1", Q(bedrooms=1)),
+    ("2", Q(bedrooms=2)),
+    ("3", Q(bedrooms=3)),
+    ("4", Q(bedrooms=4)),
+    ("5+", Q(bedrooms__gte=5)),
+)
+# Bands of max_price.
+PRICE_BANDS = (
+    ("0-1000000", Q(max_price__lt=1_000_000)),
+    ("1000000-5000000", Q(max_price__gte=1_000_000, max_price__lt=5_000_000)),
+    ("5000000-20000000", Q(max_price__gte=5_000_000, max_price__lt=20_000_000)),
+    ("20000000-100000000", Q(max_price__gte=20_000_000, max_price__lt=100_000_000)),
+    ("100000000+", Q(max_price__gte=100_000_000)),
+)
+FACETS = {
+    "category": [(v, Q(category=v)) for v, _ in Property.CATEGORY_CHOICES],
+    "type": [(v, Q(type=v)) for v, _ in Property.TYPE_CHOICES],
+    "bedrooms": list(BEDROOM_BUCKETS),
+    "price": list(PRICE_BANDS),
+    "furnished": [("true", Q(furnished=True)), ("false", Q(furnished=False))],
+    "serviced": [("true", Q(serviced=True)), ("false", Q(serviced=False))],
+}
+
+
+def requested_facets(params):
+    """Facet names asked for with ``facets=all`` or ``facets=a,b``; () if none."""
+    value = params.get(FACETS_PARAM, "").strip().lower()
+    if not value:
+        return ()
+    if value in ALL_FACETS:
+        return tuple(FACETS)
+    names = tuple(dict.fromkeys(name.strip() for name in value.split(",")))
+    unknown = [name for name in names if name not in FACETS]
+    if unknown:
+        raise ValidationError(
+            {FACETS_PARAM: f"Unknown facets {unknown}; choose from {list(FACETS)}."}
+        )
+    return names
+
+
+def normalize_filters(params):
+    """
+    The filters in ``params`` in a canonical form: trimmed, booleans
+    lowercased, empty ones dropped. The search applies exactly these values
+    and caches under them, so "Lagos " and "Lagos" are one search.
+    """
+    filters = {}
+    for name in FILTER_PARAMS:
+        value = params.get(name)
+        if value is None:
+            continue
+        value = value.strip()
+        if name in BOOLEAN_PARAMS:
+            value = value.lower()
+        if value:
+            filters[name] = value
+    return filters
+
+
+def facet_columns(names):
+    return [
+        (name, value, condition)
+        for name in names
+        for value, condition in FACETS[name]
+    ]
+
+
+def facet_aggregates(names):
+    return {
+        f"facet_{i}": Count("id", filter=condition)
+        for i, (_, _, condition) in enumerate(facet_columns(names))
+    }
+
+
+def group_counts(names, row):
+    counts = {name: {} for name in names}
+    for i, (name, value, _) in enumerate(facet_columns(names)):
+        counts[name][value] = row[f"facet_{i}"]
+    return counts
+
+
+def cache_key(filters, names):
+    payload = json.dumps([filters, names], sort_keys=True)
+    digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+    return f"search:facets:{response_cache.get_version()}:{digest}"
+
+
+def facet_counts(queryset, filters, names):
+    """
+    Counts of each value of the ``names`` facets among ``queryset``, the
+    search for the normalize_filters() ``filters``.
+    """
+    key = cache_key(filters, names)
+    counts = cache.get(key)
+    if counts is None:
+        row = queryset.order_by().aggregate(**facet_aggregates(names))
+        counts = group_counts(names, row)
+        cache.set(key, counts, timeout=FACET_TIMEOUT)
+    return counts
+
+
+async def afacet_counts(queryset, filters, names):
+    key = cache_key(filters, names)
+    counts = await cache.aget(key)
+    if counts is None:
+        row = await queryset.order_by().aaggregate(**facet_aggregates(names))
+        counts = group_counts(names, row)
+        await cache.aset(key, counts, timeout=FACET_TIMEOUT)
+    return counts
@@ -0,0 +1,249 @@
+import math
+import re
+import time
+import unicodedata
+from collections import Counter
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast
+from .models import SearchDocument, SearchPosting
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+MAX_TERM_LENGTH = 64
+
+# Occurrences in heavier fields count for more when ranking.
+FIELD_WEIGHTS = {
+    "title": 3,
+    "location": 2,
+    "city": 2,
+    "state": 2,
+    "keyword_tags": 2,
+    "description": 1,
+}
+
+# BM25 parameters.
+K1 = 1.2
+B = 0.75
+
+CORPUS_STATS_KEY = "search:corpus_stats:v2"
+CORPUS_STATS_TIMEOUT = 300
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return text.casefold()
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(normalize(text)) if len(t) <= MAX_TERM_LENGTH]
+
+
+def document_terms(prop):
+    """Return a Counter of field-weighted term frequencies for a property."""
+    terms = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        value = getattr(prop, field, None) or ""
+        if isinstance(value, (list, tuple)):
+            value = " ".join(str(v) for v in value)
+        for term in tokenize(value):
+            terms[term] += weight
+    return terms
+
+
+def impact(frequency, length, average_length):
+    """The BM25 score of one occurrence count in a document, before IDF."""
+    norm = K1 * (1 - B + B * length / average_length)
+    return frequency * (K1 + 1) / (frequency + norm)
+
+
+def impact_expression(average_length):
+    """impact() over the columns of SearchPosting, for bulk updates."""
+    tf = Cast("frequency", FloatField())
+    length = Cast("document_length", FloatField())
+    return tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / average_length))
+
+
+def build_postings(prop, average_length):
+    terms = document_terms(prop)
+    length = sum(terms.values())
+    document = SearchDocument(property_id=prop.pk, length=length)
+    postings = [
+        SearchPosting(
+            term=term,
+            property_id=prop.pk,
+            frequency=frequency,
+            document_length=length,
+            impact=impact(frequency, length, average_length),
+        )
+        for term, frequency in terms.items()
+    ]
+    return document, postings
+
+
+def index_property(prop):
+    index_properties([prop])
+
+
+def index_properties(properties, batch_size=1000):
+    """(Re)index properties, replacing any postings they already have."""
+    properties = list(properties)
+    if not properties:
+        return
+    stats = corpus_stats()
+    average_length = stats["average_length"]
+    if not stats["documents"]:
+        # The first documents set the average themselves.
+        lengths = [sum(document_terms(prop).values()) for prop in properties]
+        average_length = sum(lengths) / len(lengths) or 1.0
+    documents, postings = [], []
+    for prop in properties:
+        document, prop_postings = build_postings(prop, average_length)
+        documents.append(document)
+        postings.extend(prop_postings)
+
+    ids = [p.pk for p in properties]
+    with transaction.atomic():
+        SearchPosting.objects.filter(property_id__in=ids).delete()
+        SearchDocument.objects.filter(property_id__in=ids).delete()
+        SearchDocument.objects.bulk_create(documents, batch_size=batch_size)
+        SearchPosting.objects.bulk_create(postings, batch_size=batch_size)
+
+
+def refresh_impacts():
+    """
+    Recompute every posting's impact against the current average document
+    length. Impacts use the average of when a property was indexed, so
+    run this (rebuild_search_index does) once the corpus has grown or
+    changed a lot.
+    """
+    cache.delete(CORPUS_STATS_KEY)
+    average_length = corpus_stats()["average_length"]
+    SearchPosting.objects.update(impact=impact_expression(average_length))
+
+
+def corpus_stats():
+    stats = cache.get(CORPUS_STATS_KEY)
+    if stats is None:
+        stats = SearchDocument.objects.aggregate(
+            documents=Count("property_id"), average_length=Avg("length")
+        )
+        stats["average_length"] = stats["average_length"] or 1.0
+        # Names the document frequencies cached with these stats.
+        stats["generation"] = time.time()
+        cache.set(CORPUS_STATS_KEY, stats, timeout=CORPUS_STATS_TIMEOUT)
+    return stats
+
+
+def document_frequencies(terms):
+    """
+    Postings per term, cached with the corpus stats: counting the postings
+    of a common term costs as much as ranking them.
+    """
+    prefix = f"search:df:{corpus_stats()['generation']}:"
+    cached = cache.get_many([prefix + term for term in terms])
+    frequencies = {
+        term: cached[prefix + term] for term in terms if prefix + term in cached
+    }
+    missing = [term for term in terms if term not in frequencies]
+    if missing:
+        counted = dict(
+            SearchPosting.objects.filter(term__in=missing)
+            .values_list("term")
+            .annotate(df=Count("id"))
+            .order_by()
+        )
+        fresh = {term: counted.get(term, 0) for term in missing}
+        cache.set_many(
+            {prefix + term: df for term, df in fresh.items()},
+            timeout=CORPUS_STATS_TIMEOUT,
+        )
+        frequencies.update(fresh)
+    return frequencies
+
+
+def inverse_document_frequencies(terms):
+    total = corpus_stats()["documents"]
+    return {
+        term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+        for term, df in document_frequencies(terms).items()
+        if df
+    }
+
+
+def rank(terms, prefix="search_postings__"):
+    """
+    Return a BM25 score aggregate over the postings relation for use in
+    ``annotate()`` on a Property queryset that has been filtered with
+    ``match(terms)``. Pass ``prefix=""`` to annotate postings directly.
+    """
+    idf = inverse_document_frequencies(terms)
+    if not idf:
+        return Value(0.0, output_field=FloatField())
+
+    weight = Case(
+        *[When(**{f"{prefix}term": term}, then=Value(v)) for term, v in idf.items()],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    return Sum(
+        weight * F(f"{prefix}impact"),
+        filter=Q(**{f"{prefix}term__in": list(idf)}),
+        default=0.0,
+        output_field=FloatField(),
+    )
+
+
+def match(terms, prefix="search_postings__"):
+    """Q matching properties that contain any of the terms."""
+    return Q(**{f"{prefix}term__in": list(terms)})
+
+
+def match_all(queryset, terms, prefix="search_postings__"):
+    """
+    Narrow a grouped queryset filtered with ``match(terms)`` to the rows
+    that contain every term: postings are unique per term and property,
+    so that is a count of the matched postings.
+    """
+    return queryset.alias(matched_terms=Count(f"{prefix}id")).filter(
+        matched_terms=len(set(terms))
+    )
+
+
+def ranking(terms, require_all=False):
+    """
+    Rows of ``{"property_id", "search_rank"}`` for every property matching
+    any of the terms (all of them with ``require_all``), grouped straight
+    off the postings table.
+    """
+    rows = (
+        SearchPosting.objects.filter(term__in=list(terms))
+        .values("property_id")
+        .annotate(search_rank=rank(terms, prefix=""))
+    )
+    return match_all(rows, terms, prefix="") if require_all else rows
+
+
+def top_ranked(terms, limit, require_all=False):
+    """
+    The first ``limit`` ``(search_rank, property_id)`` rows of
+    ``ranking(terms, require_all)``, best first. A single term's rank is
+    its IDF times the posting's impact, so its rows are read in order off
+    search_postings_impact_idx instead of scoring every posting; several
+    terms are scored in full.
+    """
+    terms = list(dict.fromkeys(terms))
+    ordering = ("-search_rank", "-property_id")
+    if len(terms) != 1:
+        rows = ranking(terms, require_all).order_by(*ordering)
+        return list(rows.values_list("search_rank", "property_id")[:limit])
+    idf = inverse_document_frequencies(terms)
+    if not idf:
+        return []
+    rows = (
+        SearchPosting.objects.filter(term=terms[0])
+        .order_by("-impact", "-property_id")
+        .annotate(search_rank=Value(idf[terms[0]]) * F("impact"))
+    )
+    return list(rows.values_list("search_rank", "property_id")[:limit])
@@ -0,0 +1,138 @@
+import random
+import statistics
+import time
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from properties.models import Property
+from search import index
+from users.models import Users
+
+CITIES = ["Lagos", "Abuja", "Ibadan", "Kano", "Enugu", "Port Harcourt", "Benin", "Jos"]
+AREAS = ["Lekki", "Ikoyi", "Yaba", "Surulere", "Wuse", "Maitama", "Gwarinpa", "Ajah"]
+WORDS = [
+    "spacious", "modern", "luxury", "cozy", "serviced", "furnished", "duplex",
+    "penthouse", "waterfront", "garden", "terrace", "studio", "family", "quiet",
+    "estate", "gated", "pool", "gym", "parking", "balcony", "ensuite", "bright",
+]
+# Syllables for rare, street-level names so both common and selective terms
+# are exercised.
+SYLLABLES = ["ko", "la", "mi", "de", "ba", "yo", "ri", "tu", "se", "na", "fe", "go"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic catalogue inside a rolled-back transaction and time "
+        "ranked index searches against the legacy icontains scan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=100000)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        with transaction.atomic():
+            self.seed(rng, options["count"], options["batch_size"])
+            common = WORDS + [c.lower() for c in CITIES + AREAS]
+            # One term is read in rank order off its postings; several are
+            # scored over every posting they have (see index.top_ranked).
+            workloads = {
+                "one common term": [
+                    [rng.choice(common)] for _ in range(options["queries"])
+                ],
+                "common terms": [
+                    rng.sample(common, rng.randint(2, 3))
+                    for _ in range(options["queries"])
+                ],
+                "selective terms": [
+                    [self.street(rng)] for _ in range(options["queries"])
+                ],
+            }
+            results = []
+            for name, queries in workloads.items():
+                indexed = [self.time(self.index_page, q) for q in queries]
+                legacy = [self.time(self.legacy_page, q) for q in queries[:20]]
+                results.append((f"index, {name}", indexed))
+                results.append((f"legacy, {name}", legacy))
+            transaction.set_rollback(True)
+        cache.delete(index.CORPUS_STATS_KEY)
+
+        for label, timings in results:
+            self.report(label, timings)
+
+    def seed(self, rng, count, batch_size):
+        owner = Users.objects.create(
+            firstname="Bench",
+            lastname="Mark",
+            email="search-benchmark@example.com",
+            telephone="0000000000",
+            user_type="owner",
+            password="!",
+        )
+        for start in range(0, count, batch_size):
+            batch = []
+            for _ in range(min(batch_size, count - start)):
+                city, area = rng.choice(CITIES), rng.choice(AREAS)
+                words = rng.sample(WORDS, 6)
+                batch.append(
+                    Property(
+                        title=f"{words[0].title()} {words[1]} home in {area}",
+                        description=" ".join(words * 4),
+                        location=f"{rng.randint(1, 200)} {self.street(rng)} Street, {area}",
+                        city=city,
+                        state=city,
+                        country="Nigeria",
+                        area_sqft=rng.randint(400, 5000),
+                        bedrooms=rng.randint(0, 6),
+                        keyword_tags=words[2:4],
+                        owner=owner,
+                    )
+                )
+            index.index_properties(
+                Property.objects.bulk_create(batch), batch_size=batch_size
+            )
+            self.stdout.write(f"Seeded {start + len(batch)} properties")
+        cache.delete(index.CORPUS_STATS_KEY)
+
+    def street(self, rng):
+        return "".join(rng.choice(SYLLABLES) for _ in range(4))
+
+    def index_page(self, words):
+        terms = [t for w in words for t in index.tokenize(w)]
+        return index.top_ranked(terms, 20)
+
+    def legacy_page(self, words):
+        query = Q()
+        for token in words:
+            query |= (
+                Q(title__icontains=token)
+                | Q(description__icontains=token)
+                | Q(location__icontains=token)
+                | Q(city__icontains=token)
+                | Q(state__icontains=token)
+                | Q(keyword_tags__icontains=token)
+            )
+        qs = (
+            Property.objects.filter(query)
+            .distinct()
+            .order_by("-boost_rank", "-created_at", "-id")
+        )
+        return list(qs.values_list("id", flat=True)[:20])
+
+    def time(self, fn, words):
+        start = time.perf_counter()
+        fn(words)
+        return (time.perf_counter() - start) * 1000
+
+    def report(self, label, timings):
+        timings = sorted(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) > 1 else timings[0]
+        self.stdout.write(
+            f"{label}: n={len(timings)} "
+            f"p50={statistics.median(timings):.2f}ms p95={p95:.2f}ms "
+            f"max={timings[-1]:.2f}ms"
+        )
@@ -0,0 +1,161 @@
+import json
+import random
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from properties.models import Property
+from search.facets import normalize_filters
+from search.views import AdvancedPropertySearchView
+from users.models import Users
+
+# Filter combinations served by the advanced search that are expected to be
+# answered from an index. Substring filters (location, keyword) always scan
+# and are deliberately left out.
+FILTER_COMBINATIONS = [
+    {"category": "sale", "type": "flat_apartment"},
+    {"category": "rent", "type": "detached_house", "max_price": "500000"},
+    {"category": "sale", "type": "terrace", "bedrooms": "3"},
+    {"category": "short_let", "mini_price": "4000000"},
+    {"category": "rent", "type": "flat_apartment", "furnished": "true", "serviced": "true"},
+    {"category": "sale", "type": "land", "mini_price": "100000", "max_price": "900000"},
+    {"city": "Abuja"},
+    {"city": "Lagos", "state": "Lagos", "category": "rent"},
+]
+
+CITIES = ["Lagos", "Abuja", "Ibadan", "Kano", "Enugu", "Port Harcourt", "Benin", "Jos"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN over the advanced search filter combinations and the "
+        "listing/promotion queries and fail if any of them falls back to a "
+        "sequential scan of the properties table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=20000,
+            help="Number of synthetic properties to seed inside a rolled-back "
+            "transaction (0 checks the existing data).",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options["seed"]:
+                self.seed(options["seed"])
+            self.analyze()
+            failures = self.check_plans()
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(
+                "Sequential scans found:\n"
+                + "\n".join(f"  {label}\n{plan}" for label, plan in failures)
+            )
+        self.stdout.write(self.style.SUCCESS("All checked queries use an index."))
+
+    def queries(self):
+        view = AdvancedPropertySearchView()
+        for params in FILTER_COMBINATIONS:
+            filters = normalize_filters(params)
+            yield str(params), view.apply_filters(Property.objects.all(), filters)
+
+        yield "listing page", Property.objects.order_by(
+            "-boost_rank", "-created_at", "-id"
+        )[:20]
+        yield "latest listings", Property.objects.order_by("-created_at")[:20]
+        now = timezone.now()
+        yield "active boosts", Property.objects.filter(boosted_until__gt=now)
+        yield "active features", Property.objects.filter(featured_until__gt=now)
+
+    def check_plans(self):
+        failures = []
+        for label, qs in self.queries():
+            plan = self.explain(qs)
+            if self.is_sequential_scan(plan):
+                failures.append((label, plan))
+            self.stdout.write(f"{label}\n{plan}\n")
+        return failures
+
+    def explain(self, qs):
+        if connection.vendor == "mysql":
+            return qs.explain(format="json")
+        return qs.explain()
+
+    def is_sequential_scan(self, plan):
+        table = Property._meta.db_table
+        if connection.vendor == "postgresql":
+            return f"Seq Scan on {table}" in plan
+        if connection.vendor == "sqlite":
+            return any(
+                line.strip().endswith(f"SCAN {table}") for line in plan.splitlines()
+            )
+        if connection.vendor == "mysql":
+            return self.mysql_full_scan(json.loads(plan), table)
+        return False
+
+    def mysql_full_scan(self, node, table):
+        if isinstance(node, dict):
+            if node.get("table_name") == table and node.get("access_type") == "ALL":
+                return True
+            return any(self.mysql_full_scan(v, table) for v in node.values())
+        if isinstance(node, list):
+            return any(self.mysql_full_scan(v, table) for v in node)
+        return False
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(f"ANALYZE {Property._meta.db_table}")
+            elif connection.vendor == "sqlite":
+                cursor.execute("ANALYZE")
+            elif connection.vendor == "mysql":
+                cursor.execute(f"ANALYZE TABLE {Property._meta.db_table}")
+
+    def seed(self, count):
+        rng = random.Random(7)
+        owner = Users.objects.create(
+            firstname="Plan",
+            lastname="Check",
+            email="query-plan-check@example.com",
+            telephone="0000000001",
+            user_type="owner",
+            password="!",
+        )
+        categories = [c for c, _ in Property.CATEGORY_CHOICES]
+        types = [t for t, _ in Property.TYPE_CHOICES]
+        now = timezone.now()
+        batch = []
+        for i in range(count):
+            city = rng.choice(CITIES)
+            price = rng.randint(50, 10000) * 1000
+            promoted = rng.random() < 0.02
+            prop = Property(
+                title=f"Listing {i}",
+                description="Synthetic listing",
+                location=f"{i} Main Road",
+                city=city,
+                state=city,
+                country="Nigeria",
+                area_sqft=rng.randint(400, 5000),
+                category=rng.choice(categories),
+                type=rng.choice(types),
+                bedrooms=rng.randint(0, 6),
+                mini_price=price,
+                max_price=price + rng.randint(0, 500) * 1000,
+                furnished=rng.random() < 0.3,
+                serviced=rng.random() < 0.2,
+                boosted_until=now + timedelta(days=7) if promoted else None,
+                featured_until=now + timedelta(days=3) if promoted else None,
+                boost_rank=rng.randint(1, 10) if promoted else 0,
+                owner=owner,
+            )
+            prop.set_derived_fields()
+            batch.append(prop)
+            if len(batch) >= 5000:
+                Property.objects.bulk_create(batch)
+                batch = []
+        Property.objects.bulk_create(batch)
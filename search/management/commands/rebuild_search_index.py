@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from properties.models import Property
+from search import index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the free-text search index for every property."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        batch, total = [], 0
+        for prop in Property.objects.iterator(chunk_size=batch_size):
+            batch.append(prop)
+            if len(batch) >= batch_size:
+                index.index_properties(batch, batch_size=batch_size)
+                total += len(batch)
+                batch = []
+        index.index_properties(batch, batch_size=batch_size)
+        total += len(batch)
+        index.refresh_impacts()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} properties."))
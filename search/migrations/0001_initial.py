@@ -0,0 +1,73 @@
+# Generated by Django 5.2 on 2026-10-18 12:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from search.index import document_terms
+
+
+def index_existing_properties(apps, schema_editor):
+    Property = apps.get_model('properties', 'Property')
+    SearchDocument = apps.get_model('search', 'SearchDocument')
+    SearchPosting = apps.get_model('search', 'SearchPosting')
+
+    documents, postings = [], []
+
+    def flush():
+        SearchDocument.objects.bulk_create(documents, batch_size=1000)
+        SearchPosting.objects.bulk_create(postings, batch_size=1000)
+        documents.clear()
+        postings.clear()
+
+    for prop in Property.objects.iterator(chunk_size=1000):
+        terms = document_terms(prop)
+        length = sum(terms.values())
+        documents.append(SearchDocument(property_id=prop.pk, length=length))
+        postings.extend(
+            SearchPosting(
+                term=term,
+                property_id=prop.pk,
+                frequency=frequency,
+                document_length=length,
+            )
+            for term, frequency in terms.items()
+        )
+        if len(documents) >= 1000:
+            flush()
+    flush()
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('properties', '0007_property_listing_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('property', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='properties.property')),
+                ('length', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'search_documents',
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('frequency', models.PositiveIntegerField()),
+                ('document_length', models.PositiveIntegerField()),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='properties.property')),
+            ],
+            options={
+                'db_table': 'search_postings',
+                'unique_together': {('term', 'property')},
+            },
+        ),
+        migrations.RunPython(index_existing_properties, migrations.RunPython.noop),
+    ]
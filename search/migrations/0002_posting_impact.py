@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-18 13:31
+
+from django.db import migrations, models
+from django.db.models import Avg, FloatField
+from django.db.models.functions import Cast
+
+# search.index.K1 and B when this migration was written.
+K1 = 1.2
+B = 0.75
+
+
+def fill_impacts(apps, schema_editor):
+    SearchDocument = apps.get_model('search', 'SearchDocument')
+    SearchPosting = apps.get_model('search', 'SearchPosting')
+    average_length = (
+        SearchDocument.objects.aggregate(average=Avg('length'))['average'] or 1.0
+    )
+    tf = Cast('frequency', FloatField())
+    length = Cast('document_length', FloatField())
+    SearchPosting.objects.update(
+        impact=tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / average_length))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0014_propertychange'),
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchposting',
+            name='impact',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddIndex(
+            model_name='searchposting',
+            index=models.Index(fields=['term', '-impact', '-property'], name='search_postings_impact_idx'),
+        ),
+        migrations.RunPython(fill_impacts, migrations.RunPython.noop),
+    ]
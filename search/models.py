@@ -1,3 +1,39 @@
 from django.db import models
+from properties.models import Property
 
-# Create your models here.
+
+class SearchDocument(models.Model):
+    property = models.OneToOneField(
+        Property,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_document",
+    )
+    length = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = "search_documents"
+
+
+class SearchPosting(models.Model):
+    term = models.CharField(max_length=64)
+    property = models.ForeignKey(
+        Property, on_delete=models.CASCADE, related_name="search_postings"
+    )
+    # Field-weighted number of occurrences of the term in the property.
+    frequency = models.PositiveIntegerField()
+    # Copied from SearchDocument so impacts can be recomputed without a join.
+    document_length = models.PositiveIntegerField()
+    # BM25 score of the term in the property before IDF (search.index.impact).
+    impact = models.FloatField(default=0.0)
+
+    class Meta:
+        db_table = "search_postings"
+        unique_together = ("term", "property")
+        indexes = [
+            # A term's postings, best first, for search.index.top_ranked.
+            models.Index(
+                fields=["term", "-impact", "-property"],
+                name="search_postings_impact_idx",
+            ),
+        ]
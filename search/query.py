@@ -0,0 +1,249 @@
+"""
+Parser for the free-text search box (``POST /search/advanced/``).
+
+A query such as ``"3bhk flat lagos under 5m -furnished"`` is read left to
+right with one compiled pattern into a QueryPlan: bedroom counts and
+ranges, price bounds ("under 5m", "1m-5m", "from 2.5 million"), property
+type and category synonyms, furnished/serviced flags, and the remaining
+words, which are matched through the inverted index. Different kinds of
+condition are combined with AND; several values of one kind ("flat or
+house", "2bhk 3bhk") with OR. ``-word``, ``not word``, ``no word`` and
+``without word`` negate the next condition; a hyphen inside a word
+("semi-detached") does not.
+
+Plans depend only on the normalized query string and are cached per
+process, so a repeated query is not parsed again.
+"""
+import re
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from django.db.models import Q
+from .index import tokenize
+from .models import SearchPosting
+
+PLAN_CACHE_SIZE = 2048
+# Bare numbers up to this are bedroom counts, larger ones prices.
+MAX_BARE_BEDROOMS = 10
+
+AMOUNT = (
+    r"(?:₦\s*|ngn\s*|n(?=\d))?\d+(?:[.,]\d+)*"
+    r"(?:\s*(?:k|m|mn|million|b|bn|billion))?"
+)
+BEDROOMS = r"(?:bhk|bed|beds|bedroom|bedrooms|br)\b"
+QUERY_RE = re.compile(
+    rf"""
+    # A hyphen negates only at the start of a word, not inside "semi-detached".
+    (?P<negated>(?:(?<=\s)|^)-(?=\S)|\b(?:not|no|without|excluding)\s+)?
+    (?:
+        (?P<beds_from>\d+)\s*(?:-|to)\s*(?P<beds_to>\d+)\s*{BEDROOMS}
+      | (?P<beds>\d+)\s*(?P<beds_plus>\+)?\s*{BEDROOMS}
+      | (?:between\s+|from\s+)?(?P<low>{AMOUNT})\s*(?:-|to|and)\s*(?P<high>{AMOUNT})\b
+      | (?:under|below|less\s+than|max|maximum|up\s*to|<=?)\s*(?P<below>{AMOUNT})\b
+      | (?:over|above|more\s+than|min|minimum|from|at\s+least|>=?)
+          \s*(?P<above>{AMOUNT})\b
+      | (?P<amount>{AMOUNT})\b
+      | (?P<phrase>short[\s_-]*lets?|rent[\s_-]*to[\s_-]*own|joint\s+venture
+          |office\s+space|monthly\s+rent)\b
+      | (?P<word>[^\W_]+)
+    )
+    """,
+    re.VERBOSE,
+)
+AMOUNT_RE = re.compile(r"(\d+(?:[.,]\d+)*)\s*([a-z]*)$")
+MULTIPLIERS = {
+    "": 1,
+    "k": 1_000,
+    "m": 1_000_000,
+    "mn": 1_000_000,
+    "million": 1_000_000,
+    "b": 1_000_000_000,
+    "bn": 1_000_000_000,
+    "billion": 1_000_000_000,
+}
+
+# Words and phrases that set a field; the rest are search terms.
+SYNONYMS = {
+    "flat": ("type", "flat_apartment"),
+    "flats": ("type", "flat_apartment"),
+    "apartment": ("type", "flat_apartment"),
+    "apartments": ("type", "flat_apartment"),
+    "terrace": ("type", "terrace"),
+    "terraced": ("type", "terrace"),
+    "house": ("type", "detached_house"),
+    "houses": ("type", "detached_house"),
+    "villa": ("type", "detached_house"),
+    "detached": ("type", "detached_house"),
+    "land": ("type", "land"),
+    "plot": ("type", "land"),
+    "plots": ("type", "land"),
+    "office": ("type", "office_space"),
+    "offices": ("type", "office_space"),
+    "workspace": ("type", "office_space"),
+    "office space": ("type", "office_space"),
+    "hotel": ("type", "hotel"),
+    "warehouse": ("type", "warehouse"),
+    "shop": ("type", "shop"),
+    "shops": ("type", "shop"),
+    "store": ("type", "shop"),
+    "commercial": ("type", "commercial_property"),
+    "sale": ("category", "sale"),
+    "buy": ("category", "sale"),
+    "rent": ("category", "rent"),
+    "rental": ("category", "rent"),
+    "lease": ("category", "rent"),
+    "shortlet": ("category", "short_let"),
+    "short let": ("category", "short_let"),
+    "jv": ("category", "jv"),
+    "joint venture": ("category", "jv"),
+    "rent to own": ("category", "rent_to_own"),
+    "monthly rent": ("category", "monthly_rent"),
+    "furnished": ("furnished", True),
+    "unfurnished": ("furnished", False),
+    "serviced": ("serviced", True),
+    "unserviced": ("serviced", False),
+    "nonserviced": ("serviced", False),
+}
+# Words that carry no condition under AND semantics.
+STOPWORDS = frozenset(
+    "a an and or the in at of for with near to by property properties "
+    "bed beds bedroom bedrooms bhk".split()
+)
+
+
+@dataclass(frozen=True)
+class QueryPlan:
+    """A parsed search: field conditions plus index terms, combined with AND."""
+
+    include: tuple = ()
+    exclude: tuple = ()
+    bedrooms: tuple = (None, None)
+    price: tuple = (None, None)
+    prices: tuple = ()
+    terms: tuple = ()
+    excluded_terms: tuple = ()
+
+    def filters(self):
+        """Q for every condition except the positive terms."""
+        query = Q()
+        for field, values in self.include:
+            query &= Q(**{f"{field}__in": values})
+        for field, values in self.exclude:
+            query &= ~Q(**{f"{field}__in": values})
+        ranges = (("bedrooms", self.bedrooms), ("max_price", self.price))
+        for field, (low, high) in ranges:
+            if low is not None:
+                query &= Q(**{f"{field}__gte": low})
+            if high is not None:
+                query &= Q(**{f"{field}__lte": high})
+        for price in self.prices:
+            # The listing's price range covers the amount.
+            query &= Q(mini_price__lte=price, max_price__gte=price)
+        if self.excluded_terms:
+            postings = SearchPosting.objects.filter(term__in=self.excluded_terms)
+            query &= ~Q(id__in=postings.values("property_id"))
+        return query
+
+    def is_empty(self):
+        return self == QueryPlan()
+
+
+def normalize_query(text):
+    return " ".join(str(text).lower().split())
+
+
+def parse_query(text):
+    return compile_query(normalize_query(text))
+
+
+def parse_amount(text):
+    """The value of an AMOUNT match; InvalidOperation for "1.2.3m" and the like."""
+    match = AMOUNT_RE.search(text.replace(",", ""))
+    number, suffix = match.groups()
+    return Decimal(number) * MULTIPLIERS.get(suffix, 1)
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def compile_query(query):
+    """The QueryPlan for an already normalized query string."""
+    include, exclude = {}, {}
+    bedrooms, price = [None, None], [None, None]
+    prices, terms, excluded_terms = [], [], []
+
+    def bound(bounds, low=None, high=None):
+        # Repeated bounds narrow the range.
+        if low is not None:
+            bounds[0] = low if bounds[0] is None else max(bounds[0], low)
+        if high is not None:
+            bounds[1] = high if bounds[1] is None else min(bounds[1], high)
+
+    for match in QUERY_RE.finditer(query):
+        groups = match.groupdict()
+        negated = bool(groups["negated"])
+        try:
+            amounts = {
+                name: parse_amount(groups[name])
+                for name in ("low", "high", "below", "above", "amount")
+                if groups[name]
+            }
+        except InvalidOperation:
+            # Not a number after all; search for its digits as words.
+            text = match.group(0)[len(groups["negated"] or "") :]
+            (excluded_terms if negated else terms).extend(tokenize(text))
+            continue
+        if groups["beds_from"]:
+            low, high = sorted((int(groups["beds_from"]), int(groups["beds_to"])))
+            bound(bedrooms, low, high)
+        elif groups["beds"]:
+            count = int(groups["beds"])
+            if groups["beds_plus"]:
+                bound(bedrooms, low=count)
+            else:
+                target = exclude if negated else include
+                target.setdefault("bedrooms", set()).add(count)
+        elif groups["low"]:
+            low, high = sorted((amounts["low"], amounts["high"]))
+            if high <= MAX_BARE_BEDROOMS and groups["high"].isdigit():
+                bound(bedrooms, int(low), int(high))
+            else:
+                bound(price, low, high)
+        elif groups["below"] or groups["above"]:
+            below = bool(groups["below"])
+            amount = amounts.get("below", amounts.get("above"))
+            # "not under 5m" is "over 5m", and the other way round.
+            if below != negated:
+                bound(price, high=amount)
+            else:
+                bound(price, low=amount)
+        elif groups["amount"]:
+            amount = amounts["amount"]
+            if amount <= MAX_BARE_BEDROOMS and groups["amount"].isdigit():
+                target = exclude if negated else include
+                target.setdefault("bedrooms", set()).add(int(amount))
+            elif not negated:
+                prices.append(amount)
+        else:
+            word = " ".join(re.split(r"[\s_-]+", groups["phrase"] or groups["word"]))
+            synonym = SYNONYMS.get(word) or SYNONYMS.get(word.rstrip("s"))
+            if synonym:
+                field, value = synonym
+                target = exclude if negated else include
+                target.setdefault(field, set()).add(value)
+            elif word not in STOPWORDS:
+                (excluded_terms if negated else terms).extend(tokenize(word))
+
+    return QueryPlan(
+        include=freeze(include),
+        exclude=freeze(exclude),
+        bedrooms=tuple(bedrooms),
+        price=tuple(price),
+        prices=tuple(prices),
+        terms=tuple(dict.fromkeys(terms)),
+        excluded_terms=tuple(dict.fromkeys(excluded_terms)),
+    )
+
+
+def freeze(conditions):
+    return tuple(
+        (field, tuple(sorted(values))) for field, values in sorted(conditions.items())
+    )
@@ -0,0 +1,124 @@
+"""
+Cache of advanced search results as ordered property ids.
+
+An entry holds the keyset sort key of up to MAX_RESULTS matching rows
+(the property id last), not rendered JSON. Pages are sliced from it and
+assembled from per-property fragments (properties.fragments), so one
+entry serves every page size, cursor and representation.
+
+Entries are invalidated through the property change log
+(properties.changes). An entry records the log position it was computed
+at. When the log has moved on, the properties changed since are checked
+against it. If none of them is in the entry or matches the search now,
+the entry is still right and only its position moves. Otherwise, or once
+the entry is RESULTS_FRESH_SECONDS old (BM25 weights and promotion tiers
+drift without property writes), the stale ids are served while one
+background recomputation replaces them (stale-while-revalidate). Only a
+miss waits for the database.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.cache import cache
+from django.db import close_old_connections
+from properties import changes
+from raininfotech.settings import SEARCH_REVALIDATE_ASYNC
+
+logger = logging.getLogger(__name__)
+
+RESULTS_FRESH_SECONDS = 60
+RESULTS_TIMEOUT = 900
+MAX_RESULTS = 1000
+# How long one process may hold the right to recompute an entry.
+REVALIDATE_LOCK_TIMEOUT = 30
+
+HIT = "HIT"
+STALE = "STALE"
+MISS = "MISS"
+
+
+def results_key(signature):
+    payload = json.dumps(signature, sort_keys=True, default=str)
+    digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+    return f"search:results:{digest}"
+
+
+class ResultCache:
+    def __init__(self, workers=2, revalidate_async=True):
+        self.workers = workers
+        self.revalidate_async = revalidate_async
+        self.lock = threading.Lock()
+        self.executor = None
+        self.pid = None
+
+    def get(self, key, compute, matches):
+        """
+        The entry for ``key`` and HIT, STALE or MISS. ``compute()`` returns
+        the ordered sort-key rows of the search; ``matches(ids)`` tells
+        whether any of the property ``ids`` is in its results now.
+        """
+        entry = cache.get(key)
+        if entry is None:
+            return self.refresh(key, compute), MISS
+        head = changes.head()
+        if entry["position"] < head:
+            changed = changes.changed_since(entry["position"])
+            if changed is None or changed & entry["ids"] or matches(changed):
+                self.revalidate(key, compute)
+                return entry, STALE
+            entry = {**entry, "position": head}
+            cache.set(key, entry, timeout=RESULTS_TIMEOUT)
+        if time.time() - entry["computed_at"] > RESULTS_FRESH_SECONDS:
+            self.revalidate(key, compute)
+            return entry, STALE
+        return entry, HIT
+
+    def refresh(self, key, compute):
+        # Read the position first: changes made while computing are re-checked.
+        position = changes.head()
+        rows = compute()
+        entry = {
+            "rows": rows[:MAX_RESULTS],
+            "ids": {row[-1] for row in rows[:MAX_RESULTS]},
+            "complete": len(rows) <= MAX_RESULTS,
+            "position": position,
+            "computed_at": time.time(),
+        }
+        cache.set(key, entry, timeout=RESULTS_TIMEOUT)
+        return entry
+
+    def revalidate(self, key, compute):
+        lock_key = f"{key}:revalidating"
+        if not cache.add(lock_key, True, timeout=REVALIDATE_LOCK_TIMEOUT):
+            return
+        if self.revalidate_async:
+            self.get_executor().submit(self.run, key, compute, lock_key)
+        else:
+            self.run(key, compute, lock_key)
+
+    def run(self, key, compute, lock_key):
+        try:
+            self.refresh(key, compute)
+        except Exception:
+            logger.exception("Error recomputing search results %s", key)
+        finally:
+            cache.delete(lock_key)
+            if self.revalidate_async:
+                close_old_connections()
+
+    def get_executor(self):
+        # Pool threads do not survive fork(); each worker process makes its own.
+        with self.lock:
+            if self.executor is None or self.pid != os.getpid():
+                self.executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="search-results"
+                )
+                self.pid = os.getpid()
+            return self.executor
+
+
+result_cache = ResultCache(revalidate_async=SEARCH_REVALIDATE_ASYNC)
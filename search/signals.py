@@ -0,0 +1,44 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from properties.models import Property
+from properties.signals import properties_imported
+from . import index
+from .suggest import FIELDS as SUGGEST_FIELDS, suggestions
+
+
+# Saves that write none of these (promotions, rating counters) leave the
+# postings and suggestions as they are.
+INDEXED_FIELDS = frozenset(index.FIELD_WEIGHTS) | frozenset(SUGGEST_FIELDS)
+
+
+def suggestion_values(instance):
+    return {field: getattr(instance, field) for field in SUGGEST_FIELDS}
+
+
+@receiver(post_save, sender=Property)
+def property_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Postings and documents are removed with the property by CASCADE.
+    if raw or (update_fields is not None and not INDEXED_FIELDS & update_fields):
+        return
+    index.index_property(instance)
+    values = suggestion_values(instance)
+    transaction.on_commit(lambda: suggestions.update(instance.pk, values))
+
+
+@receiver(post_delete, sender=Property)
+def property_deleted(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: suggestions.update(pk, None))
+
+
+@receiver(properties_imported, sender=Property)
+def index_imported_properties(sender, instances, **kwargs):
+    index.index_properties(instances)
+    updates = [(instance.pk, suggestion_values(instance)) for instance in instances]
+
+    def update_suggestions():
+        for pk, values in updates:
+            suggestions.update(pk, values)
+
+    transaction.on_commit(update_suggestions)
@@ -0,0 +1,353 @@
+"""
+Typo-tolerant autocomplete for the search box (``/search/suggest/``).
+
+Suggestions are the distinct city, state, location and keyword tag values
+of the catalogue, weighted by how many properties use them. Each process
+keeps them in memory as a sorted array of normalized keys, so a prefix is
+a bisect range and the most popular keys of a large range are memoized
+per prefix. When the exact prefix has too few completions, keys whose
+prefix is within a small edit distance of the query (same first letter)
+are found by walking the sorted keys the way one would walk a trie,
+reusing the edit-distance rows of the shared prefix and skipping every
+key below a prefix that can no longer match.
+
+The index is loaded on first use with one query and then kept in step
+with this process's own writes (see search.signals). Writes made by other
+processes are picked up by a rebuild in a background thread once the
+index is SUGGEST_REFRESH_SECONDS old; the old index keeps serving until
+the new one is ready.
+"""
+import bisect
+import heapq
+import logging
+import threading
+import time
+from collections import Counter
+from django.db import close_old_connections
+from properties.models import Property
+from raininfotech.settings import SUGGEST_REFRESH_SECONDS
+from .index import normalize
+
+logger = logging.getLogger(__name__)
+
+# Property field -> the advanced search parameter a suggestion fills in.
+FIELDS = {
+    "city": "city",
+    "state": "state",
+    "location": "location",
+    "keyword_tags": "keyword",
+}
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+MAX_QUERY_LENGTH = 100
+# Prefix ranges wider than this have their top MAX_LIMIT keys memoized.
+MEMO_RANGE = 64
+# Queries shorter than this only get exact prefix matches.
+FUZZY_MIN_LENGTH = 3
+# Leading characters a fuzzy match must share with the query.
+FUZZY_PREFIX_LENGTH = 1
+LAST_KEY = chr(0x10FFFF)
+
+
+def suggestion_key(text):
+    # ASCII text, most of the catalogue, only needs lowercasing.
+    text = text.lower() if text.isascii() else normalize(text)
+    return " ".join(text.split())
+
+
+def max_edits(query):
+    if len(query) < FUZZY_MIN_LENGTH:
+        return 0
+    return 1 if len(query) < 7 else 2
+
+
+def next_row(query, char, row, previous_row, previous_char):
+    """
+    The edit-distance row after appending ``char`` to a prefix whose row is
+    ``row`` (optimal string alignment, so a swap of two letters is one edit).
+    """
+    new = [row[0] + 1]
+    for i in range(1, len(query) + 1):
+        cost = query[i - 1] != char
+        value = min(new[i - 1] + 1, row[i] + 1, row[i - 1] + cost)
+        if (
+            previous_row is not None
+            and i > 1
+            and query[i - 1] == previous_char
+            and query[i - 2] == char
+        ):
+            value = min(value, previous_row[i - 2] + 1)
+        new.append(value)
+    return new
+
+
+def prefix_distance(query, key):
+    """Fewest edits turning ``query`` into some prefix of ``key``."""
+    row = list(range(len(query) + 1))
+    previous_row = previous_char = None
+    best = row[-1]
+    for char in key:
+        new = next_row(query, char, row, previous_row, previous_char)
+        row, previous_row, previous_char = new, row, char
+        best = min(best, row[-1])
+        if min(row) >= best:
+            break
+    return best
+
+
+class Term:
+    __slots__ = ("text", "count", "fields")
+
+    def __init__(self, text):
+        self.text = text
+        self.count = 0
+        self.fields = Counter()
+
+
+class SuggestionIndex:
+    """Suggestion terms of one catalogue snapshot, updated in place."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.keys = []
+        self.terms = {}
+        self.documents = {}
+        self.memo = {}
+
+    @classmethod
+    def build(cls, rows):
+        """Index ``(id, city, state, location, keyword_tags)`` rows."""
+        index = cls()
+        terms = index.terms
+        # City, state and tag values repeat across the catalogue.
+        seen = {}
+        for pk, *values in rows:
+            pairs = property_terms(dict(zip(FIELDS, values)), seen)
+            index.documents[pk] = frozenset((key, field) for key, _, field in pairs)
+            for key, text, field in pairs:
+                term = terms.get(key)
+                if term is None:
+                    term = terms[key] = Term(text)
+                term.fields[field] += 1
+            for key in {key for key, _, _ in pairs}:
+                terms[key].count += 1
+        index.keys = sorted(terms)
+        return index
+
+    def update(self, pk, pairs):
+        """Make property ``pk`` contribute ``pairs`` (none to remove it)."""
+        new = frozenset((key, field) for key, _, field in pairs)
+        texts = {key: text for key, text, _ in pairs}
+        with self.lock:
+            old = self.documents.pop(pk, frozenset())
+            if new:
+                self.documents[pk] = new
+            if old == new:
+                return
+            old_keys = {key for key, _ in old}
+            new_keys = {key for key, _ in new}
+            for key, field in old - new:
+                self.terms[key].fields[field] -= 1
+            for key in old_keys - new_keys:
+                self.change_count(key, -1)
+            for key, field in new - old:
+                term = self.terms.get(key)
+                if term is None:
+                    term = self.terms[key] = Term(texts[key])
+                    bisect.insort(self.keys, key)
+                term.fields[field] += 1
+            for key in new_keys - old_keys:
+                self.change_count(key, 1)
+
+    def change_count(self, key, delta):
+        term = self.terms[key]
+        term.count += delta
+        if term.count <= 0:
+            del self.terms[key]
+            del self.keys[bisect.bisect_left(self.keys, key)]
+        for end in range(len(key) + 1):
+            self.memo.pop(key[:end], None)
+
+    def prefix_range(self, prefix):
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + LAST_KEY, lo)
+        return lo, hi
+
+    def popular(self, prefix):
+        """The MAX_LIMIT most used keys starting with ``prefix``."""
+        top = self.memo.get(prefix)
+        if top is not None:
+            return top
+        lo, hi = self.prefix_range(prefix)
+        terms = self.terms
+        top = heapq.nsmallest(
+            MAX_LIMIT, self.keys[lo:hi], key=lambda key: (-terms[key].count, key)
+        )
+        if hi - lo > MEMO_RANGE:
+            self.memo[prefix] = top
+        return top
+
+    def fuzzy_prefixes(self, query, edits):
+        """
+        Yield the shortest prefixes of indexed keys that are within ``edits``
+        of ``query``, visiting each distinct prefix at most once.
+        """
+        keys = self.keys
+        start = query[:FUZZY_PREFIX_LENGTH]
+        i, end = self.prefix_range(start)
+        # rows[d] is the edit-distance row of path[:d].
+        rows = [list(range(len(query) + 1))]
+        for depth, char in enumerate(start):
+            previous = (rows[-2], start[depth - 1]) if depth else (None, None)
+            rows.append(next_row(query, char, rows[-1], *previous))
+        path = start
+        while i < end:
+            key = keys[i]
+            shared = len(start)
+            limit = min(len(path), len(key))
+            while shared < limit and path[shared] == key[shared]:
+                shared += 1
+            del rows[shared + 1:]
+            path = key[:shared]
+            skip_to = None
+            for depth in range(shared, len(key)):
+                previous = (rows[-2], key[depth - 1]) if depth else (None, None)
+                row = next_row(query, key[depth], rows[-1], *previous)
+                rows.append(row)
+                path = key[: depth + 1]
+                if row[-1] <= edits:
+                    yield path
+                    skip_to = path
+                    break
+                if min(row) > edits:
+                    skip_to = path
+                    break
+            if skip_to is None:
+                i += 1
+            else:
+                i = self.prefix_range(skip_to)[1]
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Up to ``limit`` ``(key, Term, distance)``, closest then most used."""
+        query = suggestion_key(query)[:MAX_QUERY_LENGTH]
+        if not query:
+            return []
+        with self.lock:
+            found = {key: 0 for key in self.popular(query)[:limit]}
+            edits = max_edits(query)
+            if len(found) < limit and edits:
+                fuzzy = {}
+                for prefix in self.fuzzy_prefixes(query, edits):
+                    for key in self.popular(prefix):
+                        if key not in found and key not in fuzzy:
+                            fuzzy[key] = prefix_distance(query, key)
+                best = heapq.nsmallest(
+                    limit - len(found),
+                    fuzzy,
+                    key=lambda key: (fuzzy[key], -self.terms[key].count, key),
+                )
+                found.update((key, fuzzy[key]) for key in best)
+            return [(key, self.terms[key], distance) for key, distance in found.items()]
+
+
+def property_terms(values, seen=None):
+    """
+    ``(key, display text, search parameter)`` for one property's values;
+    ``seen`` memoizes the key and display text of each raw value.
+    """
+    seen = {} if seen is None else seen
+    pairs = {}
+    for field, param in FIELDS.items():
+        value = values.get(field) or ""
+        items = value if isinstance(value, (list, tuple)) else [value]
+        for item in items:
+            item = str(item)
+            cleaned = seen.get(item)
+            if cleaned is None:
+                text = " ".join(item.split())
+                cleaned = seen[item] = (suggestion_key(text)[:MAX_QUERY_LENGTH], text)
+            key, text = cleaned
+            if key:
+                pairs.setdefault((key, param), text)
+    return [(key, text, param) for (key, param), text in pairs.items()]
+
+
+def suggestion_rows():
+    return Property.objects.values_list("id", *FIELDS).iterator(chunk_size=2000)
+
+
+class Suggestions:
+    """The per-process SuggestionIndex, loaded on first use and refreshed."""
+
+    def __init__(self, refresh_seconds=SUGGEST_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.lock = threading.Lock()
+        self.index = None
+        self.built_at = 0.0
+        self.rebuilding = False
+        # Updates made while a rebuild runs, replayed onto the new index.
+        self.pending = {}
+
+    def current(self):
+        index = self.index
+        if index is None:
+            with self.lock:
+                if self.index is None:
+                    self.install(SuggestionIndex.build(suggestion_rows()))
+                return self.index
+        if time.monotonic() - self.built_at > self.refresh_seconds:
+            self.start_rebuild()
+        return index
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        return self.current().search(query, limit)
+
+    def update(self, pk, values):
+        """Apply a saved property's values (None when deleted), if loaded."""
+        pairs = property_terms(values) if values is not None else []
+        with self.lock:
+            if self.rebuilding:
+                self.pending[pk] = pairs
+            index = self.index
+        if index is not None:
+            index.update(pk, pairs)
+
+    def install(self, index):
+        self.index = index
+        self.built_at = time.monotonic()
+
+    def start_rebuild(self):
+        with self.lock:
+            if self.rebuilding:
+                return
+            self.rebuilding = True
+        threading.Thread(
+            target=self.rebuild, name="search-suggest", daemon=True
+        ).start()
+
+    def rebuild(self):
+        try:
+            index = SuggestionIndex.build(suggestion_rows())
+        except Exception:
+            logger.exception("Error rebuilding search suggestions")
+            index = None
+        finally:
+            close_old_connections()
+        with self.lock:
+            if index is not None:
+                for pk, pairs in self.pending.items():
+                    index.update(pk, pairs)
+                self.install(index)
+            else:
+                # Try again after another refresh interval.
+                self.built_at = time.monotonic()
+            self.pending = {}
+            self.rebuilding = False
+
+    def reset(self):
+        with self.lock:
+            self.index = None
+            self.pending = {}
+
+
+suggestions = Suggestions()
@@ -1,3 +1,469 @@
-from django.test import TestCase
+import json
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from properties.models import Property
+from properties.signals import properties_imported
+from search import index
+from search.query import QueryPlan, parse_query
+from search.results import result_cache
+from search.suggest import suggestions
+from search.views import AdvancedPropertySearchView
+from users.models import Users
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def make_owner():
+    return Users.objects.create(
+        firstname="Owner",
+        lastname="One",
+        email="owner@example.com",
+        telephone="9000000001",
+        user_type="owner",
+        password="!",
+    )
+
+
+def make_property(owner, title, **fields):
+    return Property(
+        title=title,
+        description=fields.pop("description", ""),
+        location=fields.pop("location", "1 Marina Road"),
+        city=fields.pop("city", "Lagos"),
+        state=fields.pop("state", "Lagos"),
+        country="Nigeria",
+        area_sqft=900,
+        owner=owner,
+        **fields,
+    )
+
+
+class QueryParserTests(SimpleTestCase):
+    def test_hyphen_inside_a_word_does_not_negate(self):
+        plan = parse_query("well-furnished flat")
+        self.assertEqual(plan.exclude, ())
+        self.assertEqual(
+            plan.include, (("furnished", (True,)), ("type", ("flat_apartment",)))
+        )
+        self.assertEqual(plan.terms, ("well",))
+
+        plan = parse_query("semi-detached duplex")
+        self.assertEqual(plan.exclude, ())
+        self.assertEqual(plan.include, (("type", ("detached_house",)),))
+
+        plan = parse_query("self-contained")
+        self.assertEqual((plan.terms, plan.excluded_terms), (("self", "contained"), ()))
+
+    def test_leading_hyphen_negates(self):
+        self.assertEqual(parse_query("-furnished").exclude, (("furnished", (True,)),))
+        plan = parse_query("lagos -pool")
+        self.assertEqual((plan.terms, plan.excluded_terms), (("lagos",), ("pool",)))
+
+    def test_conditions_and_plan_cache(self):
+        plan = parse_query("2-3 bedrooms 1m-5m shortlet")
+        self.assertEqual(plan.bedrooms, (2, 3))
+        self.assertEqual(plan.price, (1_000_000, 5_000_000))
+        self.assertEqual(plan.include, (("category", ("short_let",)),))
+        self.assertIs(parse_query("2BHK  Lagos"), parse_query("2bhk lagos"))
+        self.assertTrue(parse_query("in the").is_empty())
+        self.assertEqual(parse_query("in the"), QueryPlan())
+
+    def test_malformed_numbers_are_search_terms(self):
+        plan = parse_query("1.2.3m lagos")
+        self.assertEqual((plan.price, plan.prices), ((None, None), ()))
+        self.assertEqual(plan.terms, ("1", "2", "3m", "lagos"))
+        self.assertEqual(parse_query("under 1.234.567").price, (None, None))
+        self.assertEqual(parse_query("-1.2.3").excluded_terms, ("1", "2", "3"))
+
+
+@override_settings(CACHES=LOCMEM)
+class SearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = make_owner()
+        titles = [
+            "Duplex in Lekki",
+            "Lekki duplex duplex",
+            "Quiet flat",
+            "Garden duplex with a long description of the garden",
+            "Lekki studio",
+        ]
+        properties = Property.objects.bulk_create(
+            [make_property(owner, title) for title in titles]
+        )
+        index.index_properties(properties)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_top_ranked_matches_ranking(self):
+        for terms in (["duplex"], ["lekki"], ["duplex", "lekki"], ["missing"]):
+            for require_all in (False, True):
+                with self.subTest(terms=terms, require_all=require_all):
+                    ranked = index.ranking(terms, require_all).order_by(
+                        "-search_rank", "-property_id"
+                    )
+                    self.assertEqual(
+                        index.top_ranked(terms, 3, require_all),
+                        list(ranked.values_list("search_rank", "property_id")[:3]),
+                    )
+
+    def test_one_term_is_read_in_rank_order(self):
+        index.top_ranked(["duplex"], 2)  # Caches the corpus statistics.
+        with self.assertNumQueries(1):
+            rows = index.top_ranked(["duplex"], 2)
+        found = Property.objects.in_bulk([pk for _, pk in rows])
+        self.assertEqual(found[rows[0][1]].title, "Lekki duplex duplex")
+
+    def test_saves_of_unindexed_fields_keep_the_postings(self):
+        prop = Property.objects.get(title="Quiet flat")
+        with patch.object(index, "index_property") as index_property:
+            prop.save(update_fields=["boost_rank"])
+            index_property.assert_not_called()
+            prop.save(update_fields=["title", "boost_rank"])
+            index_property.assert_called_once_with(prop)
+            prop.save()
+            self.assertEqual(index_property.call_count, 2)
+
+
+@override_settings(CACHES=LOCMEM)
+class AdvancedSearchQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = make_owner()
+        flat = {"bedrooms": 3, "max_price": 900_000}
+        kano = {"location": "5 Zoo Road", "city": "Kano", "state": "Kano"}
+        rows = [
+            ("Marina flat", flat),
+            ("Furnished Marina flat", {**flat, "furnished": True}),
+            ("Pricey Marina flat", {**flat, "max_price": 2_000_000}),
+            ("Marina duplex", {**flat, "type": "detached_house"}),
+            ("Small Marina flat", {**flat, "bedrooms": 2}),
+            ("Zoo flat", {**flat, **kano}),
+        ]
+        index.index_properties(
+            Property.objects.bulk_create(
+                [make_property(owner, title, **fields) for title, fields in rows]
+            )
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def titles(self, search):
+        response = self.client.post(
+            reverse("advanced-property-search"),
+            {"search": search},
+            content_type="application/json",
+        )
+        return sorted(row["title"] for row in response.data["results"])
+
+    def test_every_condition_must_hold(self):
+        self.assertEqual(len(self.titles("Lagos Marina")), 5)
+        self.assertEqual(self.titles("lagos kano"), [])
+        self.assertEqual(self.titles("2bhk lagos"), ["Small Marina flat"])
+        self.assertEqual(
+            self.titles("3 bedroom flat in lagos under 1,000,000 -furnished"),
+            ["Marina flat"],
+        )
+        self.assertEqual(self.titles("flat kano"), ["Zoo flat"])
+
+
+@override_settings(CACHES=LOCMEM)
+class SearchFacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = make_owner()
+        Property.objects.bulk_create(
+            [
+                make_property(
+                    owner, "Furnished flat", bedrooms=2, max_price=8e5, furnished=True
+                ),
+                make_property(owner, "Family flat", bedrooms=3, max_price=25e5),
+                make_property(
+                    owner, "Rental flat", category="rent", bedrooms=3, max_price=4e6
+                ),
+                make_property(
+                    owner, "Mansion", type="detached_house", bedrooms=6, max_price=15e7
+                ),
+                make_property(
+                    owner, "Capital flat", city="Abuja", state="FCT", max_price=3e6
+                ),
+            ]
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_facets_come_from_one_cached_query(self):
+        url = reverse("advanced-property-search")
+        params = {"facets": "all", "city": "Lagos", "furnished": "false"}
+        # The result ids and the page's cards, then one aggregate for every
+        # facet.
+        with self.assertNumQueries(3):
+            response = self.client.get(url, params)
+        facets = response.data["facets"]
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertEqual(
+            (facets["category"]["sale"], facets["category"]["rent"]), (2, 1)
+        )
+        self.assertEqual(
+            (facets["type"]["flat_apartment"], facets["type"]["detached_house"]),
+            (2, 1),
+        )
+        self.assertEqual(
+            facets["bedrooms"], {"0": 0, "1": 0, "2": 0, "3": 2, "4": 0, "5+": 1}
+        )
+        self.assertEqual(
+            facets["price"],
+            {
+                "0-1000000": 0,
+                "1000000-5000000": 2,
+                "5000000-20000000": 0,
+                "20000000-100000000": 0,
+                "100000000+": 1,
+            },
+        )
+        self.assertEqual(facets["furnished"], {"true": 0, "false": 3})
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(url, {**params, "furnished": "FALSE"})
+        self.assertEqual(cached.data["facets"], facets)
+
+    def test_filters_are_applied_as_normalized(self):
+        url = reverse("advanced-property-search")
+        # Exact filters are trimmed before they filter, not only in cache keys.
+        padded = self.client.get(url, {"facets": "category", "city": " Lagos "})
+        self.assertEqual(padded.data["facets"]["category"]["sale"], 3)
+        self.assertEqual(len(padded.data["results"]), 4)
+
+        plain = self.client.get(url, {"facets": "category", "city": "Lagos"})
+        self.assertEqual(plain.data["results"], padded.data["results"])
+        self.assertEqual(plain.data["facets"], padded.data["facets"])
+
+
+@override_settings(CACHES=LOCMEM)
+class SearchSuggestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        Property.objects.bulk_create(
+            [make_property(cls.owner, f"Flat {i}") for i in range(3)]
+            + [make_property(cls.owner, "Zoo flat", city="Kano", state="Kano")]
+        )
+
+    def setUp(self):
+        suggestions.reset()
+
+    def suggest(self, q, **params):
+        return self.client.get(reverse("property-suggest"), {"q": q, **params})
+
+    def test_prefix_and_typo(self):
+        first = self.suggest("LAG").data["suggestions"][0]
+        self.assertEqual(first["text"], "Lagos")
+        self.assertEqual(first["params"], ["city", "state"])
+        self.assertEqual((first["count"], first["distance"]), (3, 0))
+
+        typo = self.suggest("lagso").data["suggestions"]
+        self.assertEqual((typo[0]["text"], typo[0]["distance"]), ("Lagos", 1))
+        self.assertEqual(self.suggest("la", limit=99).status_code, 400)
+
+    def test_incremental_update(self):
+        self.suggest("lag")  # Builds the in-memory index.
+        with self.captureOnCommitCallbacks(execute=True):
+            prop = make_property(self.owner, "New", city="Ibadan", state="Oyo")
+            prop.save()
+        # Served from memory, and already includes the new property.
+        with self.assertNumQueries(0):
+            response = self.suggest("ibad")
+        self.assertEqual([s["text"] for s in response.data["suggestions"]], ["Ibadan"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            prop.delete()
+        self.assertEqual(self.suggest("ibad").data["suggestions"], [])
+
+
+    def test_imports_update_suggestions_on_commit(self):
+        self.suggest("lag")
+
+        def import_property(title):
+            prop = make_property(self.owner, title, city="Ibadan", state="Oyo")
+            Property.objects.bulk_create([prop])
+            properties_imported.send(sender=Property, instances=[prop])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(DatabaseError):
+                with transaction.atomic():
+                    import_property("Rolled back")
+                    raise DatabaseError("a later batch failed")
+        self.assertEqual(self.suggest("ibad").data["suggestions"], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            import_property("Imported")
+        response = self.suggest("ibad")
+        self.assertEqual([s["text"] for s in response.data["suggestions"]], ["Ibadan"])
+
+
+@override_settings(CACHES=LOCMEM)
+class SearchStreamingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = make_owner()
+        Property.objects.bulk_create(
+            [make_property(owner, f"Flat {i}", bedrooms=i % 4) for i in range(7)]
+        )
+
+    def test_stream_matches_paginated_results(self):
+        url = reverse("advanced-property-search")
+        paged = self.client.get(url, {"page_size": 100, "view": "full"})
+        with patch.object(AdvancedPropertySearchView, "stream_chunk_size", 3):
+            streamed = self.client.get(url, {"stream": 1, "view": "full"})
+            lines = self.client.get(url, HTTP_ACCEPT="application/x-ndjson")
+
+        self.assertEqual(streamed["Content-Type"], "application/json")
+        document = json.loads(b"".join(streamed.streaming_content))
+        self.assertEqual(len(document["results"]), 7)
+        self.assertEqual(document["results"], json.loads(paged.content)["results"])
+
+        self.assertEqual(lines["Content-Type"], "application/x-ndjson")
+        body = b"".join(lines.streaming_content)
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(
+            [row["id"] for row in rows], [row["id"] for row in document["results"]]
+        )
+
+
+@override_settings(CACHES=LOCMEM)
+class SearchResultCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        Property.objects.bulk_create(
+            [make_property(cls.owner, f"Flat {i}") for i in range(25)]
+        )
+
+    def setUp(self):
+        cache.clear()
+        patcher = patch.object(result_cache, "revalidate_async", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def search(self, **params):
+        url = reverse("advanced-property-search")
+        return self.client.get(url, {"city": "Lagos", "page_size": 10, **params})
+
+    def ids(self, response):
+        return [row["id"] for row in response.data["results"]]
+
+    def test_ids_are_cached_and_paged(self):
+        first = self.search()
+        self.assertEqual(first["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            again = self.search()
+        self.assertEqual((again["X-Cache"], again.data), ("HIT", first.data))
+
+        cursor = parse_qs(urlsplit(first.data["next"]).query)["cursor"][0]
+        second = self.search(cursor=cursor)
+        with patch.object(AdvancedPropertySearchView, "cached_page", return_value=None):
+            uncached = self.search(cursor=cursor)
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(
+            self.ids(second),
+            list(Property.objects.order_by("-id").values_list("id", flat=True)[10:20]),
+        )
+        self.assertEqual(second.data, uncached.data)
+
+    def test_entries_are_revalidated_from_the_change_log(self):
+        first = self.search()
+        # A change that cannot affect the search only moves the entry on.
+        with self.captureOnCommitCallbacks(execute=True):
+            make_property(self.owner, "Elsewhere", city="Abuja", state="FCT").save()
+        self.assertEqual(self.search()["X-Cache"], "HIT")
+
+        top, second = (Property.objects.get(id=i) for i in self.ids(first)[:2])
+        with self.captureOnCommitCallbacks(execute=True):
+            top.title = "Renamed"
+            top.save()
+            second.delete()
+        stale = self.search()
+        self.assertEqual(stale["X-Cache"], "STALE")
+        self.assertEqual(stale.data["results"][0]["title"], "Renamed")
+        fresh = self.search()
+        self.assertEqual(fresh["X-Cache"], "HIT")
+        self.assertNotIn(self.ids(first)[1], self.ids(fresh))
+
+    def test_entries_hold_the_ids_of_the_normalized_filters(self):
+        padded = self.search(city="Lagos ")
+        self.assertEqual(padded["X-Cache"], "MISS")
+        plain = self.search()
+        self.assertEqual(plain["X-Cache"], "HIT")
+        self.assertEqual(self.ids(plain), self.ids(padded))
+        self.assertEqual(
+            self.ids(plain),
+            list(Property.objects.order_by("-id").values_list("id", flat=True)[:10]),
+        )
+
+
+@override_settings(CACHES=LOCMEM)
+class RankedPagingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        titles = [
+            "Duplex",
+            "Duplex duplex in Lekki",
+            "Garden duplex",
+            "Duplex with a long description of the garden and the pool",
+            "Lekki duplex duplex duplex",
+            "Small duplex",
+            "Duplex near the marina",
+        ]
+        index.index_properties(
+            Property.objects.bulk_create(
+                [make_property(cls.owner, title, bedrooms=2) for title in titles]
+            )
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, search, **params):
+        url = reverse("advanced-property-search")
+        query = "&".join(f"{name}={value}" for name, value in params.items())
+        return self.client.post(
+            f"{url}?{query}", {"search": search}, content_type="application/json"
+        )
+
+    def ids(self, response):
+        return [row["id"] for row in response.data["results"]]
+
+    def test_pages_follow_the_cursor_row_when_the_statistics_change(self):
+        for search in ("duplex", "duplex 2bhk"):
+            with self.subTest(search=search):
+                cache.clear()
+                first = self.search(search, page_size=3)
+                cursor = parse_qs(urlsplit(first.data["next"]).query)["cursor"][0]
+                # More documents without the term raise its weight, and so
+                # every score, once the statistics are computed again.
+                index.index_properties(
+                    Property.objects.bulk_create(
+                        [make_property(self.owner, "Flat") for _ in range(10)]
+                    )
+                )
+                cache.delete(index.CORPUS_STATS_KEY)
+
+                ranked = [pk for _, pk in index.top_ranked(["duplex"], 10)]
+                expected = ranked[ranked.index(self.ids(first)[-1]) + 1 :][:3]
+                second = self.search(search, page_size=3, cursor=cursor)
+                self.assertEqual(self.ids(second), expected)
+                with patch.object(
+                    AdvancedPropertySearchView, "cached_page", return_value=None
+                ):
+                    uncached = self.search(search, page_size=3, cursor=cursor)
+                self.assertEqual(self.ids(uncached), expected)
@@ -1,6 +1,15 @@
 from django.urls import path
-from .views import AdvancedPropertySearchView
+from raininfotech.settings import ASYNC_VIEWS
+from .views import (
+    AdvancedPropertySearchView,
+    AsyncAdvancedPropertySearchView,
+    PropertySuggestView,
+)
+
+if ASYNC_VIEWS:
+    AdvancedPropertySearchView = AsyncAdvancedPropertySearchView
 
 urlpatterns = [
     path("advanced/", AdvancedPropertySearchView.as_view(), name="advanced-property-search",),
+    path("suggest/", PropertySuggestView.as_view(), name="property-suggest"),
 ]
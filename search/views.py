@@ -1,22 +1,231 @@
+from functools import partial
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from django.db.models import Q
+from django.db.models import F, FloatField, Q, Subquery, Value
+from django.db.models.functions import (
+    ASin,
+    Cast,
+    Coalesce,
+    Cos,
+    Least,
+    Power,
+    Radians,
+    Sin,
+    Sqrt,
+)
+from rest_framework.exceptions import ValidationError
+from properties import fragments, geo
 from properties.models import Property
-from properties.serializers import PropertySerializer
+from properties.pagination import KeysetPagination
+from properties.promotion import promoted_ordering, wants_promoted
+from properties.serializers import (
+    CARD_VIEW,
+    FULL_VIEW,
+    PropertyCardSerializer,
+    PropertySerializer,
+    card_values,
+    wants_cards,
+)
+from raininfotech.async_views import AsyncAPIViewMixin, serialize
+from raininfotech.renderers import FastJSONRenderer, NDJSONRenderer
+from search import facets as search_facets
+from search import index as search_index
+from search import results as search_results
+from search.query import normalize_query, parse_query
+from search import suggest as search_suggest
 
 
 class AdvancedPropertySearchView(APIView):
+    pagination_class = KeysetPagination
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+    default_radius_km = 5
+    max_radius_km = 500
+    stream_chunk_size = 500
+    # What the search is, for the result-id cache; set by get() and post().
+    result_signature = None
+    # Computes the first rows of a pure free-text search faster than its
+    # queryset (search.index.top_ranked); set by search_queryset().
+    top_rows = None
+    # Ranked searches sort on BM25 scores, which move with the corpus
+    # statistics: the statistics generation the scores were computed under
+    # goes in the cursor, and refresh_position() re-scores the cursor's row
+    # when it no longer matches (see KeysetPagination); set by
+    # search_queryset().
+    keyset_generation = None
+    refresh_position = None
+
     def get_permissions(self):
         return [permissions.AllowAny()]
 
     def get_queryset(self):
         return Property.objects.all()
 
+    def paginated_response(self, qs, id_field=None):
+        """
+        Paginate ``qs`` and serialize the page. When ``id_field`` is given the
+        queryset yields ranked ``values()`` rows and the page is hydrated into
+        Property instances in rank order.
+        """
+        self.apply_sort(id_field)
+        if self.wants_stream():
+            return self.streaming_response(self.stream_chunks(qs, id_field))
+        response = self.cached_page(qs, id_field)
+        if response is not None:
+            return response
+        cards = wants_cards(self.request)
+        if cards and not id_field:
+            qs = self.project_cards(qs)
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(qs, self.request, view=self)
+        return paginator.get_paginated_response(
+            self.serialize_rows(page, id_field, cards)
+        )
+
+    def apply_sort(self, id_field):
+        """
+        ``sort=promoted`` puts active promotions first, ahead of the search's
+        own order. Pure free-text matches page over the index postings,
+        which carry no promotion state, and keep their relevance order.
+        """
+        if not wants_promoted(self.request) or id_field == "property_id":
+            return
+        ordering = getattr(self, "keyset_ordering", None)
+        self.keyset_ordering = promoted_ordering(
+            ordering or self.pagination_class.ordering
+        )
+
+    def cached_page(self, qs, id_field):
+        """
+        The page from the cached ids of this search (search.results) and
+        the per-property fragment cache, or None to page over ``qs``.
+        """
+        if self.result_signature is None:
+            return None
+        ordering = tuple(
+            getattr(self, "keyset_ordering", None) or self.pagination_class.ordering
+        )
+        names = [field.lstrip("-") for field in ordering]
+        id_name = names[-1]
+        key = search_results.results_key(
+            [*self.result_signature, ordering, self.keyset_generation]
+        )
+
+        def compute():
+            limit = search_results.MAX_RESULTS + 1
+            if self.top_rows is not None:
+                return self.top_rows(limit)
+            return list(qs.order_by(*ordering).values_list(*names)[:limit])
+
+        entry, state = search_results.result_cache.get(
+            key,
+            compute=compute,
+            matches=lambda ids: qs.filter(**{f"{id_name}__in": ids}).exists(),
+        )
+        paginator = self.pagination_class()
+        page = paginator.paginate_rows(
+            entry["rows"], self.request, view=self, complete=entry["complete"]
+        )
+        if page is None:
+            return None
+        data = self.fragment_page(
+            [row[id_name] for row in page], wants_cards(self.request)
+        )
+        response = paginator.get_paginated_response(data)
+        response["X-Cache"] = state
+        return response
+
+    def fragment_page(self, ids, cards):
+        """Serialized rows for ``ids`` in order, cached per property."""
+        view = CARD_VIEW if cards else FULL_VIEW
+        found = fragments.get_many(view, ids)
+        missing = [i for i in ids if i not in found]
+        if missing:
+            rows = self.serialize_rows([{"id": i} for i in missing], "id", cards)
+            fresh = {row["id"]: row for row in rows}
+            fragments.set_many(view, fresh)
+            found.update(fresh)
+        return [found[i] for i in ids if i in found]
+
+    def serialize_rows(self, rows, id_field, cards):
+        """Serialize a page or chunk, hydrating ranked rows in rank order."""
+        if id_field:
+            ids = [row[id_field] for row in rows]
+            found = self.hydrate(ids) if cards else self.get_queryset().in_bulk(ids)
+            rows = self.in_rank_order(ids, found)
+        serializer_class = PropertyCardSerializer if cards else PropertySerializer
+        return serializer_class(rows, many=True).data
+
+    def wants_stream(self):
+        """``?stream=1`` streams a JSON document, an NDJSON Accept one row per line."""
+        return (
+            self.request.accepted_renderer.format == NDJSONRenderer.format
+            or self.request.query_params.get("stream") in ("1", "true")
+        )
+
+    def stream_queryset(self, qs, id_field):
+        # Every matching row, in the order pagination would return them.
+        if wants_cards(self.request) and not id_field:
+            qs = self.project_cards(qs)
+        ordering = getattr(self, "keyset_ordering", None)
+        return qs.order_by(*(ordering or self.pagination_class.ordering))
+
+    def stream_chunks(self, qs, id_field):
+        """
+        Yield serialized rows ``stream_chunk_size`` at a time, so memory use
+        does not grow with the result size. The full representation
+        prefetches relations once per chunk.
+        """
+        cards = wants_cards(self.request)
+        rows = self.stream_queryset(qs, id_field).iterator(
+            chunk_size=self.stream_chunk_size
+        )
+        while chunk := list(islice(rows, self.stream_chunk_size)):
+            yield self.serialize_rows(chunk, id_field, cards)
+
+    def streaming_response(self, chunks):
+        ndjson = self.request.accepted_renderer.format == NDJSONRenderer.format
+        encoder = StreamEncoder(ndjson)
+        if hasattr(chunks, "__aiter__"):
+            content = aencode_stream(chunks, encoder)
+        else:
+            content = encode_stream(chunks, encoder)
+        response = StreamingHttpResponse(
+            content,
+            content_type=NDJSONRenderer.media_type if ndjson else "application/json",
+        )
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    def project_cards(self, qs):
+        ordering = getattr(self, "keyset_ordering", None)
+        ordering = ordering or self.pagination_class.ordering
+        return card_values(qs, extra=[field.lstrip("-") for field in ordering])
+
+    def card_rows(self, ids):
+        return card_values(self.get_queryset().filter(id__in=ids))
+
+    def hydrate(self, ids):
+        return {row["id"]: row for row in self.card_rows(ids)}
+
+    def in_rank_order(self, ids, found):
+        return [found[i] for i in ids if i in found]
+
     def get(self, request):
-        qs = self.apply_filters(self.get_queryset(), request.GET)
-        serializer = PropertySerializer(qs.distinct(), many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        facets = search_facets.requested_facets(request.GET)
+        filters = search_facets.normalize_filters(request.GET)
+        qs = self.apply_filters(self.get_queryset(), filters)
+        self.result_signature = ("filters", filters)
+        response = self.paginated_response(qs.distinct())
+        if facets and isinstance(response, Response):
+            response.data["facets"] = search_facets.facet_counts(
+                qs, filters, facets
+            )
+        return response
 
     def post(self, request):
         search = request.data.get("search", "").strip().lower()
@@ -24,55 +233,64 @@ class AdvancedPropertySearchView(APIView):
             return Response(
                 {"detail": "Empty search string"}, status=status.HTTP_400_BAD_REQUEST
             )
+        self.result_signature = ("search", normalize_query(search))
+        return self.paginated_response(*self.search_queryset(search))
 
-        tokens = search.split()
-        query = Q()
+    def search_queryset(self, search):
+        """
+        Turn a free-form search string into ``(queryset, id_field)`` for
+        paginated_response(). Every condition in the string must hold (see
+        search.query).
+        """
+        plan = parse_query(search)
+        filters = plan.filters()
+        terms = plan.terms
 
-        for token in tokens:
-            if token in {"1bhk", "2bhk", "3bhk", "4bhk", "5bhk"}:
-                bhk = int(token[0])
-                query |= Q(bedrooms=bhk)
-            elif token.isdigit():
-                num = int(token)
-                # Smart handling: assume it's a price or room count
-                if num <= 10:
-                    query |= Q(bedrooms=num)
-                else:
-                    query |= Q(mini_price__lte=num) | Q(max_price__gte=num)
-            elif token in ["flat", "apartment"]:
-                query |= Q(type__icontains="flat_apartment")
-            elif token in ["house", "villa", "detached"]:
-                query |= Q(type__icontains="detached_house")
-            elif token in ["office", "workspace"]:
-                query |= Q(type__icontains="office_space")
-            elif token in ["shop", "store"]:
-                query |= Q(type__icontains="shop")
-            elif token in ["furnished"]:
-                query |= Q(furnished=True)
-            elif token in ["unfurnished"]:
-                query |= Q(furnished=False)
-            elif token in ["serviced"]:
-                query |= Q(serviced=True)
-            elif token in ["nonserviced", "unserviced"]:
-                query |= Q(serviced=False)
-            elif token in ["rent", "sale", "shortlet", "jv"]:
-                query |= Q(category__icontains=token)
-            else:
-                query |= (
-                    Q(title__icontains=token)
-                    | Q(description__icontains=token)
-                    | Q(location__icontains=token)
-                    | Q(city__icontains=token)
-                    | Q(state__icontains=token)
-                    | Q(keyword_tags__icontains=token)
-                )
+        if terms:
+            self.keyset_generation = search_index.corpus_stats()["generation"]
+            # Built here: the async view pages outside sync_to_async() and
+            # the BM25 weights may need the sync ORM.
+            ranked = search_index.ranking(terms).values("search_rank")
+            self.refresh_position = partial(self.rescored_position, ranked)
+
+        # Free-text terms are matched through the inverted index and ranked
+        # by BM25, best matches first.
+        if terms and not filters:
+            self.keyset_ordering = ("-search_rank", "-property_id")
+            self.top_rows = partial(search_index.top_ranked, terms, require_all=True)
+            return search_index.ranking(terms, require_all=True), "property_id"
+        if terms:
+            qs = (
+                self.get_queryset()
+                .filter(filters, search_index.match(terms))
+                .values("id", "boost_rank", "rank_score", "created_at")
+                .annotate(search_rank=search_index.rank(terms))
+            )
+            self.keyset_ordering = ("-search_rank",) + KeysetPagination.ordering
+            return search_index.match_all(qs, terms), "id"
 
-        qs = self.get_queryset().filter(query).distinct()
-        serializer = PropertySerializer(qs, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return self.get_queryset().filter(filters), None
+
+    def rescored_position(self, ranked, position):
+        """
+        ``position`` with its search_rank replaced by the cursor row's score
+        under the current corpus statistics, so the next page starts after
+        that row in today's order rather than at a score from an older one.
+        A row that no longer matches keeps the cursor's score.
+        """
+        names = [field.lstrip("-") for field in self.keyset_ordering]
+        index = names.index("search_rank")
+        position = list(position)
+        score = ranked.filter(property_id=position[-1])[:1]
+        position[index] = Coalesce(
+            Subquery(score, output_field=FloatField()), Value(position[index])
+        )
+        return position
 
     def apply_filters(self, qs, params):
         location = params.get("location")
+        city = params.get("city")
+        state = params.get("state")
         category = params.get("category")
         type_ = params.get("type")
         bedrooms = params.get("bedrooms")
@@ -84,6 +302,10 @@ class AdvancedPropertySearchView(APIView):
 
         if location:
             qs = qs.filter(location__icontains=location)
+        if city:
+            qs = qs.filter(city=city)
+        if state:
+            qs = qs.filter(state=state)
         if category:
             qs = qs.filter(category=category)
         if type_:
@@ -110,4 +332,214 @@ class AdvancedPropertySearchView(APIView):
                 | Q(description__icontains=keyword)
                 | Q(keyword_tags__icontains=keyword)
             )
+        return self.apply_geo_filters(qs, params)
+
+    def apply_geo_filters(self, qs, params):
+        """
+        ``near=lat,lng&radius_km=`` keeps properties within the radius, sorted
+        by distance; ``bbox=min_lng,min_lat,max_lng,max_lat`` keeps properties
+        inside the box. Both prefilter on the geohash cells covering the area
+        before the exact check.
+        """
+        near = params.get("near")
+        bbox = params.get("bbox")
+
+        if bbox:
+            west, south, east, north = self.parse_coordinates(bbox, 4, "bbox")
+            qs = qs.filter(
+                self.geohash_cells_filter(south, west, north, east),
+                latitude__range=(south, north),
+                longitude__range=(west, east),
+            )
+
+        if near:
+            latitude, longitude = self.parse_coordinates(near, 2, "near")
+            try:
+                radius_km = float(params.get("radius_km", self.default_radius_km))
+            except ValueError:
+                raise ValidationError({"radius_km": "Must be a number."})
+            if not 0 < radius_km <= self.max_radius_km:
+                raise ValidationError(
+                    {"radius_km": f"Must be between 0 and {self.max_radius_km}."}
+                )
+            qs = (
+                qs.filter(
+                    self.geohash_cells_filter(
+                        *geo.radius_bounds(latitude, longitude, radius_km)
+                    )
+                )
+                .annotate(distance_km=self.distance_expression(latitude, longitude))
+                .filter(distance_km__lte=radius_km)
+            )
+            self.keyset_ordering = ("distance_km", "id")
         return qs
+
+    def parse_coordinates(self, value, count, name):
+        try:
+            numbers = [float(v) for v in value.split(",")]
+        except ValueError:
+            numbers = []
+        if len(numbers) != count:
+            raise ValidationError(
+                {name: f"Expected {count} comma-separated numbers."}
+            )
+        return numbers
+
+    def geohash_cells_filter(self, south, west, north, east):
+        # Range lookups rather than startswith so every backend can use the
+        # geohash index.
+        query = Q()
+        for cell in geo.cells_covering(south, west, north, east):
+            query |= Q(geohash__gte=cell, geohash__lt=cell + "~")
+        return query
+
+    def distance_expression(self, latitude, longitude):
+        """Great-circle distance in km from the point (haversine)."""
+        lat = Cast(F("latitude"), FloatField())
+        lng = Cast(F("longitude"), FloatField())
+        half_dlat = Radians(lat - Value(latitude)) / 2
+        half_dlng = Radians(lng - Value(longitude)) / 2
+        a = Power(Sin(half_dlat), 2) + Cos(Radians(Value(latitude))) * Cos(
+            Radians(lat)
+        ) * Power(Sin(half_dlng), 2)
+        return 2 * geo.EARTH_RADIUS_KM * ASin(Least(Sqrt(a), Value(1.0)))
+
+
+class AsyncAdvancedPropertySearchView(AsyncAPIViewMixin, AdvancedPropertySearchView):
+    """AdvancedPropertySearchView on the async ORM, used under ASGI."""
+
+    async def apaginated_response(self, qs, id_field=None):
+        self.apply_sort(id_field)
+        if self.wants_stream():
+            return self.streaming_response(self.astream_chunks(qs, id_field))
+        response = await sync_to_async(self.cached_page)(qs, id_field)
+        if response is not None:
+            return response
+        cards = wants_cards(self.request)
+        if cards and not id_field:
+            qs = self.project_cards(qs)
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(qs, self.request, view=self)
+        if id_field:
+            ids = [row[id_field] for row in page]
+            if cards:
+                found = {row["id"]: row async for row in self.card_rows(ids)}
+            else:
+                found = await self.get_queryset().ain_bulk(ids)
+            page = self.in_rank_order(ids, found)
+        serializer_class = PropertyCardSerializer if cards else PropertySerializer
+        data = await serialize(serializer_class, page, many=True)
+        return paginator.get_paginated_response(data)
+
+    async def get(self, request):
+        facets = search_facets.requested_facets(request.GET)
+        filters = search_facets.normalize_filters(request.GET)
+        qs = self.apply_filters(self.get_queryset(), filters)
+        self.result_signature = ("filters", filters)
+        response = await self.apaginated_response(qs.distinct())
+        if facets and isinstance(response, Response):
+            response.data["facets"] = await search_facets.afacet_counts(
+                qs, filters, facets
+            )
+        return response
+
+    async def post(self, request):
+        search = request.data.get("search", "").strip().lower()
+        if not search:
+            return Response(
+                {"detail": "Empty search string"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        self.result_signature = ("search", normalize_query(search))
+        # BM25 weights read corpus statistics with the sync ORM.
+        qs, id_field = await sync_to_async(self.search_queryset)(search)
+        return await self.apaginated_response(qs, id_field)
+
+    async def astream_chunks(self, qs, id_field):
+        """stream_chunks() over the async ORM; ASGI would buffer a sync iterator."""
+        cards = wants_cards(self.request)
+        serialize_rows = sync_to_async(self.serialize_rows)
+        chunk = []
+        rows = self.stream_queryset(qs, id_field).aiterator(
+            chunk_size=self.stream_chunk_size
+        )
+        async for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.stream_chunk_size:
+                yield await serialize_rows(chunk, id_field, cards)
+                chunk = []
+        if chunk:
+            yield await serialize_rows(chunk, id_field, cards)
+
+
+class StreamEncoder:
+    """
+    Encodes serialized chunks as NDJSON lines, or as the pieces of one
+    ``{"results": [...]}`` JSON document.
+    """
+
+    def __init__(self, ndjson):
+        self.ndjson = ndjson
+        self.render = FastJSONRenderer().render
+        self.first = True
+
+    def start(self):
+        return b"" if self.ndjson else b'{"results":['
+
+    def encode(self, rows):
+        if self.ndjson:
+            return b"".join(self.render(row) + b"\n" for row in rows)
+        body = b",".join(self.render(row) for row in rows)
+        if body and not self.first:
+            body = b"," + body
+        self.first = self.first and not body
+        return body
+
+    def end(self):
+        return b"" if self.ndjson else b"]}"
+
+
+def encode_stream(chunks, encoder):
+    yield encoder.start()
+    for rows in chunks:
+        yield encoder.encode(rows)
+    yield encoder.end()
+
+
+async def aencode_stream(chunks, encoder):
+    yield encoder.start()
+    async for rows in chunks:
+        yield encoder.encode(rows)
+    yield encoder.end()
+
+
+class PropertySuggestView(APIView):
+    """
+    Autocomplete for the search box: cities, states, locations and keyword
+    tags starting with ``q`` (or within a typo or two of it), most used first.
+    Each suggestion names the advanced search parameter it fills in.
+    """
+
+    def get_permissions(self):
+        return [permissions.AllowAny()]
+
+    def get(self, request):
+        query = request.query_params.get("q", "")
+        limit = request.query_params.get("limit", search_suggest.DEFAULT_LIMIT)
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            raise ValidationError({"limit": "limit must be an integer."})
+        if not 1 <= limit <= search_suggest.MAX_LIMIT:
+            raise ValidationError(
+                {"limit": f"limit must be between 1 and {search_suggest.MAX_LIMIT}."}
+            )
+        results = [
+            {
+                "text": term.text,
+                "params": sorted(param for param, n in term.fields.items() if n > 0),
+                "count": term.count,
+                "distance": distance,
+            }
+            for _, term, distance in search_suggest.suggestions.search(query, limit)
+        ]
+        return Response({"query": query, "suggestions": results})
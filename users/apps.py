@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class UsersConfig(AppConfig):
+    name = 'users'
+
+    def ready(self):
+        from raininfotech import cache  # noqa: F401  (registers its system check)
+        from . import signals  # noqa: F401
@@ -0,0 +1,80 @@
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from raininfotech.helper import decodeJwt, encodeJwt
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the per-request JWT blacklist check against the file cache "
+        "alone and the two-tier cache in front of it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=20000)
+        parser.add_argument("--tokens", type=int, default=200)
+        parser.add_argument("--blacklisted", type=float, default=0.01)
+
+    def handle(self, *args, **options):
+        rng = random.Random(3)
+        tokens = [self.make_token(i) for i in range(options["tokens"])]
+        revoked = set(
+            rng.sample(tokens, max(1, int(len(tokens) * options["blacklisted"])))
+        )
+        # Most traffic comes from a small set of active sessions.
+        active = tokens[: max(1, len(tokens) // 10)]
+        workload = [
+            rng.choice(active) if rng.random() < 0.8 else rng.choice(tokens)
+            for _ in range(options["requests"])
+        ]
+
+        with tempfile.TemporaryDirectory() as directory:
+            settings = {
+                "file": {
+                    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                    "LOCATION": directory,
+                },
+                "two_tier": {
+                    "BACKEND": "raininfotech.cache.TwoTierCache",
+                    "LOCATION": "file",
+                },
+            }
+            with override_settings(CACHES=settings):
+                for alias in ("file", "two_tier"):
+                    backend = caches[alias]
+                    for token in revoked:
+                        backend.set(f"blacklist:{token}", True, timeout=600)
+                    check = [self.time(backend, t) for t in workload]
+                    full = [self.time(backend, t, decode=True) for t in workload]
+                    self.report(f"{alias}: blacklist check", check)
+                    self.report(f"{alias}: check + JWT decode", full)
+
+    def make_token(self, index):
+        now = datetime.now(timezone.utc)
+        payload = {
+            "sub": str(index),
+            "type": "access",
+            "iat": now,
+            "exp": now + timedelta(minutes=15),
+        }
+        return "2f." + encodeJwt(payload)
+
+    def time(self, backend, token, decode=False):
+        start = time.perf_counter()
+        backend.get(f"blacklist:{token}")
+        if decode:
+            decodeJwt(token)
+        return (time.perf_counter() - start) * 1e6
+
+    def report(self, label, timings):
+        timings = sorted(timings)
+        self.stdout.write(
+            f"{label}: mean={statistics.fmean(timings):.1f}us "
+            f"p50={timings[len(timings) // 2]:.1f}us "
+            f"p99={timings[int(len(timings) * 0.99)]:.1f}us"
+        )
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from raininfotech.settings import TOKEN_LOG_RETENTION_DAYS
+from users import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Drop token log months older than the retention window, create the "
+        "upcoming monthly partitions (PostgreSQL) and forget expired revoked "
+        "tokens. Meant to run daily from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retention-days", type=int, default=TOKEN_LOG_RETENTION_DAYS
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--months-ahead", type=int, default=2)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        created = []
+        if partitions.is_partitioned():
+            created = partitions.ensure_partitions(options["months_ahead"])
+        dropped, deleted = partitions.prune_token_logs(
+            options["retention_days"], batch_size
+        )
+        revoked = partitions.prune_revoked_tokens(batch_size)
+
+        if created:
+            self.stdout.write(f"Created partitions: {', '.join(map(str, created))}")
+        if dropped:
+            self.stdout.write(f"Dropped partitions: {', '.join(map(str, dropped))}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {deleted} token log rows and {revoked} expired revoked tokens."
+            )
+        )
@@ -1,10 +1,15 @@
 from rest_framework import authentication, exceptions
-from users.models import Users
 from raininfotech.helper import decodeJwt
+from users.revocation import revocations
+from users.user_cache import auth_users
 from users.utils import is_token_blacklisted
 
 
 class JWTAuthentication(authentication.BaseAuthentication):
+    def authenticate_header(self, request):
+        # Makes DRF answer failed authentication with 401, not 403.
+        return 'Bearer realm="api"'
+
     def authenticate(self, request):
         auth_header = request.headers.get("Authorization")
 
@@ -18,10 +23,6 @@ class JWTAuthentication(authentication.BaseAuthentication):
         except ValueError:
             raise exceptions.AuthenticationFailed("Invalid Authorization header format")
 
-        # ✅ Check blacklist
-        if is_token_blacklisted(token):
-            raise exceptions.AuthenticationFailed("Token has been blacklisted")
-
         # ✅ Decode JWT with proper fallback
         payload = None
         try:
@@ -32,10 +33,22 @@ class JWTAuthentication(authentication.BaseAuthentication):
         if not payload or not payload.get("sub"):
             raise exceptions.AuthenticationFailed("Invalid or expired token")
 
-        # ✅ Get user
+        # ✅ Check revocation: by jti in memory, or the legacy per-token blacklist
+        jti = payload.get("jti")
+        if jti:
+            if revocations.is_revoked(jti):
+                raise exceptions.AuthenticationFailed("Token has been blacklisted")
+        elif is_token_blacklisted(token):
+            raise exceptions.AuthenticationFailed("Token has been blacklisted")
+
+        # ✅ Get user (slim, cached row; see users.user_cache)
         try:
-            user = Users.objects.get(id=payload["sub"])
-        except Users.DoesNotExist:
+            user = auth_users.get(payload["sub"])
+        except (TypeError, ValueError):
+            user = None
+        if user is None:
             raise exceptions.AuthenticationFailed("User not found")
+        if user.is_block:
+            raise exceptions.AuthenticationFailed("Account blocked")
 
         return (user, None)
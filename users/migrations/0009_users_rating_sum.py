@@ -0,0 +1,44 @@
+# Generated by Django 5.2 on 2026-10-18 12:26
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_counters(apps, schema_editor):
+    Users = apps.get_model('users', 'Users')
+    OwnerReview = apps.get_model('users', 'OwnerReview')
+
+    totals = (
+        OwnerReview.objects.values('owner')
+        .annotate(rating_sum=Sum('rating'), review_count=Count('id'))
+        .order_by()
+    )
+    Users.objects.bulk_update(
+        [
+            Users(
+                pk=row['owner'],
+                rating_sum=row['rating_sum'],
+                review_count=row['review_count'],
+                rating=row['rating_sum'] / row['review_count'],
+            )
+            for row in totals
+        ],
+        ['rating_sum', 'review_count', 'rating'],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_users_avatar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='users',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_counters, migrations.RunPython.noop),
+    ]
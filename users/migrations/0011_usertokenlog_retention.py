@@ -0,0 +1,144 @@
+# Generated by Django 5.2 on 2026-10-18 12:40
+
+import hashlib
+from datetime import timezone
+
+from django.db import migrations, models
+from django.utils import timezone as django_timezone
+
+COLUMNS = 'id, user_id, user_token, token_hash, bucket, is_block, created_at, updated_at'
+INDEXES = (
+    'CREATE INDEX token_logs_user_hash_idx ON user_token_logs (user_id, token_hash)',
+    'CREATE INDEX token_logs_bucket_idx ON user_token_logs (bucket)',
+)
+
+
+def bucket_of(moment):
+    moment = moment.astimezone(timezone.utc)
+    return moment.year * 100 + moment.month
+
+
+def next_bucket(bucket):
+    year, month = divmod(bucket, 100)
+    return (year + 1) * 100 + 1 if month == 12 else bucket + 1
+
+
+def backfill_token_keys(apps, schema_editor):
+    UserTokenLog = apps.get_model('users', 'UserTokenLog')
+
+    rows = UserTokenLog.objects.only('id', 'user_token', 'created_at')
+    batch = []
+    for log in rows.iterator(chunk_size=1000):
+        log.token_hash = hashlib.sha256(log.user_token.encode('utf-8')).hexdigest()
+        log.bucket = bucket_of(log.created_at)
+        batch.append(log)
+        if len(batch) >= 1000:
+            UserTokenLog.objects.bulk_update(batch, ['token_hash', 'bucket'])
+            batch = []
+    UserTokenLog.objects.bulk_update(batch, ['token_hash', 'bucket'])
+
+
+def partition_by_month(apps, schema_editor):
+    """
+    On PostgreSQL, rebuild user_token_logs as a table partitioned by RANGE
+    (bucket) with one partition per month and a DEFAULT partition, so
+    expired months can be dropped instead of deleted row by row.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT DISTINCT bucket FROM user_token_logs')
+        buckets = {row[0] for row in cursor.fetchall()}
+    current = bucket_of(django_timezone.now())
+    buckets.update({current, next_bucket(current), next_bucket(next_bucket(current))})
+
+    execute = schema_editor.execute
+    execute('DROP INDEX token_logs_user_hash_idx')
+    execute('DROP INDEX token_logs_bucket_idx')
+    execute('ALTER TABLE user_token_logs RENAME TO user_token_logs_unpartitioned')
+    execute(
+        'CREATE TABLE user_token_logs ('
+        ' id bigint GENERATED BY DEFAULT AS IDENTITY,'
+        ' user_id bigint NOT NULL,'
+        ' user_token text NOT NULL,'
+        ' token_hash varchar(64) NOT NULL,'
+        ' bucket integer NOT NULL CHECK (bucket >= 0),'
+        ' is_block integer NOT NULL,'
+        ' created_at timestamp with time zone NOT NULL,'
+        ' updated_at timestamp with time zone NOT NULL,'
+        # The partition key has to be part of the primary key.
+        ' CONSTRAINT user_token_logs_id_bucket_pk PRIMARY KEY (id, bucket)'
+        ') PARTITION BY RANGE (bucket)'
+    )
+    execute('CREATE TABLE user_token_logs_default PARTITION OF user_token_logs DEFAULT')
+    for bucket in sorted(buckets):
+        execute(
+            f'CREATE TABLE user_token_logs_p{bucket} PARTITION OF user_token_logs '
+            f'FOR VALUES FROM ({bucket}) TO ({next_bucket(bucket)})'
+        )
+    execute(
+        f'INSERT INTO user_token_logs ({COLUMNS}) OVERRIDING SYSTEM VALUE '
+        f'SELECT {COLUMNS} FROM user_token_logs_unpartitioned'
+    )
+    execute('DROP TABLE user_token_logs_unpartitioned')
+    execute(
+        "SELECT setval(pg_get_serial_sequence('user_token_logs', 'id'), "
+        'COALESCE((SELECT MAX(id) FROM user_token_logs), 0) + 1, false)'
+    )
+    for statement in INDEXES:
+        execute(statement)
+
+
+def unpartition(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    execute = schema_editor.execute
+    execute('ALTER TABLE user_token_logs RENAME TO user_token_logs_partitioned')
+    execute('DROP INDEX token_logs_user_hash_idx')
+    execute('DROP INDEX token_logs_bucket_idx')
+    execute(
+        'CREATE TABLE user_token_logs (LIKE user_token_logs_partitioned '
+        'INCLUDING DEFAULTS INCLUDING IDENTITY)'
+    )
+    execute(
+        f'INSERT INTO user_token_logs ({COLUMNS}) OVERRIDING SYSTEM VALUE '
+        f'SELECT {COLUMNS} FROM user_token_logs_partitioned'
+    )
+    execute('DROP TABLE user_token_logs_partitioned')
+    execute('ALTER TABLE user_token_logs ADD CONSTRAINT user_token_logs_pkey PRIMARY KEY (id)')
+    execute(
+        "SELECT setval(pg_get_serial_sequence('user_token_logs', 'id'), "
+        'COALESCE((SELECT MAX(id) FROM user_token_logs), 0) + 1, false)'
+    )
+    for statement in INDEXES:
+        execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usertokenlog',
+            name='bucket',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='usertokenlog',
+            name='token_hash',
+            field=models.CharField(default='', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='usertokenlog',
+            index=models.Index(fields=['user_id', 'token_hash'], name='token_logs_user_hash_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usertokenlog',
+            index=models.Index(fields=['bucket'], name='token_logs_bucket_idx'),
+        ),
+        migrations.RunPython(backfill_token_keys, migrations.RunPython.noop),
+        migrations.RunPython(partition_by_month, unpartition),
+    ]
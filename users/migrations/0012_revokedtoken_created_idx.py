@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 13:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_usertokenlog_retention'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='revokedtoken',
+            index=models.Index(fields=['created_at'], name='revoked_tokens_created_idx'),
+        ),
+    ]
@@ -1,4 +1,7 @@
+import hashlib
+from datetime import timezone as dt_timezone
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     PermissionsMixin,
@@ -39,7 +42,9 @@ class Users(AbstractBaseUser, PermissionsMixin):
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Maintained incrementally from OwnerReview (see users.signals).
     rating = models.FloatField(default=0.0)
+    rating_sum = models.PositiveIntegerField(default=0)
     review_count = models.PositiveIntegerField(default=0)
 
     whatsapp = models.CharField(max_length=32, null=True, blank=True)
@@ -65,10 +70,18 @@ class Users(AbstractBaseUser, PermissionsMixin):
         return self.firstname + " " + self.lastname
 
 
+def token_log_bucket(moment):
+    """Monthly storage bucket (YYYYMM, UTC) of a token log row."""
+    moment = moment.astimezone(dt_timezone.utc)
+    return moment.year * 100 + moment.month
+
+
 class UserTokenLog(models.Model):
     id = models.BigAutoField(primary_key=True)
     user_id = models.BigIntegerField()
-    user_token = models.CharField(max_length=255)
+    user_token = models.TextField()  # tokens carrying a jti exceed 255 chars
+    token_hash = models.CharField(max_length=64, default="")  # sha256 of user_token
+    bucket = models.PositiveIntegerField(default=0)  # YYYYMM partition key, see users/partitions.py
     is_block = models.IntegerField(default=0)
     created_at = models.DateTimeField(
         auto_now_add=True
@@ -81,10 +94,46 @@ class UserTokenLog(models.Model):
         db_table = "user_token_logs"  # Explicitly specifying table name
         verbose_name = "User Token Log"
         verbose_name_plural = "User Token Logs"
+        indexes = [
+            models.Index(fields=["user_id", "token_hash"], name="token_logs_user_hash_idx"),
+            models.Index(fields=["bucket"], name="token_logs_bucket_idx"),
+        ]
 
     def __str__(self):
         return f"Token Log for User {self.user_id}"
 
+    def save(self, *args, **kwargs):
+        self.set_derived_fields()
+        super().save(*args, **kwargs)
+
+    def set_derived_fields(self):
+        # bulk_create() skips save(); callers using it must call this first.
+        self.token_hash = self.hash_token(self.user_token)
+        if not self.bucket:
+            self.bucket = token_log_bucket(self.created_at or timezone.now())
+
+    @staticmethod
+    def hash_token(token):
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class RevokedToken(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    jti = models.CharField(max_length=32, unique=True)
+    user_id = models.BigIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "revoked_tokens"
+        indexes = [
+            # RevocationList re-scans recent rows on every sync.
+            models.Index(fields=["created_at"], name="revoked_tokens_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"Revoked token {self.jti} for User {self.user_id}"
+
 
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -117,3 +166,9 @@ class OwnerReview(models.Model):
     class Meta:
         unique_together = ("owner", "reviewer")
         ordering = ["-created_at"]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_rating = instance.__dict__.get("rating")
+        return instance
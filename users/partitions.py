@@ -0,0 +1,136 @@
+from datetime import timedelta
+from django.db import connection, transaction
+from django.utils import timezone
+from users.models import RevokedToken, UserTokenLog, token_log_bucket
+
+# On PostgreSQL user_token_logs is partitioned by RANGE (bucket) into one
+# table per month, user_token_logs_pYYYYMM, plus a DEFAULT partition for rows
+# outside every range (migration 0011). Expired months are dropped whole.
+# Other databases keep a single table with an index on bucket and expired
+# months are deleted in small batches.
+PARENT = UserTokenLog._meta.db_table
+DEFAULT_PARTITION = f"{PARENT}_default"
+
+
+def add_months(bucket, months):
+    year, month = divmod(bucket, 100)
+    year, month = divmod(year * 12 + month - 1 + months, 12)
+    return year * 100 + month + 1
+
+
+def partition_name(bucket):
+    return f"{PARENT}_p{bucket}"
+
+
+def is_partitioned():
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [PARENT],
+        )
+        return cursor.fetchone() is not None
+
+
+def partition_buckets():
+    """Buckets that currently have their own partition, oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s AND pg_table_is_visible(p.oid)",
+            [PARENT],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    prefix = f"{PARENT}_p"
+    return sorted(
+        int(name[len(prefix):])
+        for name in names
+        if name.startswith(prefix) and name[len(prefix):].isdigit()
+    )
+
+
+def ensure_partitions(months_ahead=2):
+    """
+    Create the partitions for this month and the next ``months_ahead``.
+    Rows that already landed in the DEFAULT partition for one of those
+    months are moved into the new partition before it is attached.
+    Returns the buckets created.
+    """
+    current = token_log_bucket(timezone.now())
+    existing = set(partition_buckets())
+    created = []
+    quote = connection.ops.quote_name
+    for offset in range(months_ahead + 1):
+        bucket = add_months(current, offset)
+        if bucket in existing:
+            continue
+        name = quote(partition_name(bucket))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE {name} (LIKE {quote(PARENT)} INCLUDING DEFAULTS)"
+            )
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {quote(DEFAULT_PARTITION)} "
+                f"WHERE bucket = %s RETURNING *) INSERT INTO {name} SELECT * FROM moved",
+                [bucket],
+            )
+            cursor.execute(
+                f"ALTER TABLE {quote(PARENT)} ATTACH PARTITION {name} "
+                f"FOR VALUES FROM ({int(bucket)}) TO ({int(add_months(bucket, 1))})"
+            )
+        created.append(bucket)
+    return created
+
+
+def drop_partitions(before_bucket):
+    """Detach and drop every monthly partition older than ``before_bucket``."""
+    dropped = []
+    quote = connection.ops.quote_name
+    for bucket in partition_buckets():
+        if bucket >= before_bucket:
+            break
+        name = quote(partition_name(bucket))
+        # Each drop holds the parent's lock only for the catalog change.
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {quote(PARENT)} DETACH PARTITION {name}")
+            cursor.execute(f"DROP TABLE {name}")
+        dropped.append(bucket)
+    return dropped
+
+
+def delete_in_batches(queryset, batch_size):
+    """Delete ``queryset`` a batch of primary keys at a time; returns the count."""
+    model = queryset.model
+    deleted = 0
+    while True:
+        ids = list(queryset.order_by().values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += model.objects.filter(pk__in=ids).delete()[0]
+
+
+def prune_token_logs(retention_days, batch_size=5000):
+    """
+    Remove token log buckets older than ``retention_days`` (whole months, so
+    at least that much history is kept). Returns (dropped buckets, deleted
+    rows).
+    """
+    cutoff = token_log_bucket(timezone.now() - timedelta(days=retention_days))
+    dropped = drop_partitions(cutoff) if is_partitioned() else []
+    # Leftovers: rows in the DEFAULT partition or in an unpartitioned table.
+    deleted = delete_in_batches(
+        UserTokenLog.objects.filter(bucket__lt=cutoff), batch_size
+    )
+    return dropped, deleted
+
+
+def prune_revoked_tokens(batch_size=5000):
+    """Expired tokens fail signature checks anyway; forget their jti."""
+    return delete_in_batches(
+        RevokedToken.objects.filter(expires_at__lte=timezone.now()), batch_size
+    )
@@ -0,0 +1,139 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.db.models import Q
+from django.utils import timezone
+from raininfotech.settings import (
+    JWT_REVOCATION_SYNC_SECONDS,
+    REDIS_BLACKLIST_EXPIRY_SECONDS,
+)
+from users.models import RevokedToken
+
+# How far behind the previous sync a top-up looks again. Ids are taken at
+# insert and rows commit out of order, so a row below last_id can appear
+# after the sync that moved past it; the window also covers clock skew
+# between servers.
+GRACE = timedelta(seconds=5)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing."""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+
+class RevocationList:
+    """
+    In-memory view of the revoked token IDs (``jti``) in RevokedToken.
+
+    The Bloom filter answers the common "not revoked" case without any I/O.
+    It is topped up from the table at most every ``sync_interval`` seconds
+    (rows past the last primary key seen, plus those created up to GRACE
+    before the previous sync) and rebuilt from the unexpired rows every
+    ``rebuild_interval`` seconds or when it fills up. Probable hits are
+    confirmed against the cache and then the table.
+    """
+
+    error_rate = 0.001
+
+    def __init__(self, capacity=100000, sync_interval=5, rebuild_interval=3600):
+        self.capacity = capacity
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self.lock = threading.Lock()
+        self.bloom = None
+        self.last_id = 0
+        self.synced_at = 0.0
+        self.built_at = 0.0
+        # Wall-clock start of the previous sync, compared with created_at.
+        self.scanned_from = None
+
+    def is_revoked(self, jti):
+        self.refresh()
+        if jti not in self.bloom:
+            return False
+        revoked = cache.get(self.cache_key(jti))
+        if revoked is None:
+            revoked = RevokedToken.objects.filter(jti=jti).exists()
+            cache.set(self.cache_key(jti), revoked, timeout=self.sync_interval)
+        return revoked
+
+    def revoke(self, jti, user_id, expires_at):
+        try:
+            RevokedToken.objects.create(jti=jti, user_id=user_id, expires_at=expires_at)
+        except IntegrityError:
+            pass  # already revoked
+        cache.set(self.cache_key(jti), True, timeout=REDIS_BLACKLIST_EXPIRY_SECONDS)
+        self.refresh()
+        with self.lock:
+            self.bloom.add(jti)
+
+    def refresh(self):
+        now = time.monotonic()
+        if self.bloom is not None and now - self.synced_at < self.sync_interval:
+            return
+        with self.lock:
+            if self.bloom is not None and now - self.synced_at < self.sync_interval:
+                return
+            started = timezone.now()
+            if (
+                self.bloom is None
+                or now - self.built_at >= self.rebuild_interval
+                or self.bloom.count >= self.bloom.capacity
+            ):
+                self._rebuild()
+            else:
+                recent = Q(id__gt=self.last_id) | Q(
+                    created_at__gte=self.scanned_from - GRACE
+                )
+                self._add_rows(RevokedToken.objects.filter(recent), self.bloom)
+            self.synced_at = now
+            self.scanned_from = started
+
+    def _rebuild(self):
+        active = RevokedToken.objects.filter(expires_at__gt=timezone.now())
+        capacity = max(self.capacity, active.count() * 2)
+        bloom = BloomFilter(capacity, self.error_rate)
+        self.last_id = 0
+        self._add_rows(active, bloom)
+        self.bloom = bloom
+        self.built_at = time.monotonic()
+
+    def _add_rows(self, queryset, bloom):
+        for row_id, jti in queryset.order_by("id").values_list("id", "jti").iterator():
+            # Rows re-read from the grace window are already in.
+            if jti not in bloom:
+                bloom.add(jti)
+            self.last_id = max(self.last_id, row_id)
+
+    def cache_key(self, jti):
+        return f"revoked_jti:{jti}"
+
+
+revocations = RevocationList(sync_interval=JWT_REVOCATION_SYNC_SECONDS)
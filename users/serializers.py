@@ -99,7 +99,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
         }
 
     def get_reviews(self, obj):
-        return obj.owner_reviews.count()
+        return obj.review_count
 
 
 class OwnerReviewSerializer(serializers.ModelSerializer):
@@ -132,22 +132,9 @@ class OwnerReviewSerializer(serializers.ModelSerializer):
             existing.rating = validated_data.get("rating", existing.rating)
             existing.comment = validated_data.get("comment", existing.comment)
             existing.save()
-            self.update_owner_stats(owner_id)
             return existing
 
-        review = OwnerReview.objects.create(
+        # Owner rating counters are kept current by users.signals.
+        return OwnerReview.objects.create(
             owner_id=owner_id, reviewer=reviewer, **validated_data
         )
-        self.update_owner_stats(owner_id)
-        return review
-
-    def update_owner_stats(self, owner_id):
-        from django.db.models import Avg, Count
-
-        owner = Users.objects.get(id=owner_id)
-        stats = OwnerReview.objects.filter(owner=owner).aggregate(
-            avg=Avg("rating"), count=Count("id")
-        )
-        owner.rating = stats["avg"] or 0
-        owner.review_count = stats["count"]
-        owner.save()
@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from raininfotech.helper import apply_rating_delta
+from .models import Users, OwnerReview
+from .user_cache import auth_users
+
+
+@receiver(post_save, sender=OwnerReview)
+def owner_review_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_loaded_rating", None)
+    if created:
+        apply_rating_delta(Users, instance.owner_id, instance.rating, 1, "rating")
+    elif previous is not None and previous != instance.rating:
+        apply_rating_delta(
+            Users, instance.owner_id, instance.rating - previous, 0, "rating"
+        )
+    instance._loaded_rating = instance.rating
+
+
+@receiver(post_delete, sender=OwnerReview)
+def owner_review_deleted(sender, instance, **kwargs):
+    apply_rating_delta(Users, instance.owner_id, -instance.rating, -1, "rating")
+
+
+@receiver(post_save, sender=Users)
+@receiver(post_delete, sender=Users)
+def invalidate_auth_user(sender, instance, **kwargs):
+    auth_users.invalidate(instance.pk)
@@ -0,0 +1,324 @@
+import io
+import queue
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone as django_timezone
+from rest_framework.test import APIClient
+
+from raininfotech.helper import create_token, decodeJwt, encodeJwt
+from users import partitions
+from users.models import RevokedToken, Users, UserTokenLog, token_log_bucket
+from users.revocation import BloomFilter, RevocationList, revocations
+from users.token_log import TokenLogWriter, token_logs
+from users.user_cache import AuthUserCache, auth_users
+from users.utils import is_token_blacklisted
+
+
+def make_user(index, **fields):
+    return Users.objects.create(
+        firstname=f"First{index}",
+        lastname=f"Last{index}",
+        email=f"user{index}@example.com",
+        telephone=f"80000{index:05d}",
+        password="!",
+        **fields,
+    )
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out waiting for the token log writer")
+        time.sleep(0.01)
+
+
+class TokenLogWriterTests(SimpleTestCase):
+    def make_writer(self, **kwargs):
+        writer = TokenLogWriter(**kwargs)
+        batches = []
+        patcher = patch.object(writer, "_write", side_effect=batches.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(writer.flush)
+        return writer, batches
+
+    def test_rows_are_written_in_batches(self):
+        writer, batches = self.make_writer(batch_size=3, flush_interval=60)
+        for i in range(7):
+            writer.log(1, f"token-{i}")
+        wait_for(lambda: len(batches) == 2)
+        self.assertEqual([len(batch) for batch in batches], [3, 3])
+
+        writer.flush()
+        self.assertEqual(
+            [entry.user_token for batch in batches for entry in batch],
+            [f"token-{i}" for i in range(7)],
+        )
+        self.assertFalse(writer.thread.is_alive())
+        self.assertEqual(writer.stats()["queued"], 7)
+
+    def test_flush_writes_the_batch_the_flusher_holds(self):
+        writer, batches = self.make_writer(batch_size=10, flush_interval=60)
+        for i in range(3):
+            writer.log(1, f"token-{i}")
+        # The flusher has taken the rows off the queue and waits for more.
+        wait_for(lambda: writer.queue.qsize() == 0)
+        self.assertEqual(batches, [])
+
+        writer.flush()
+        self.assertEqual([len(batch) for batch in batches], [3])
+
+        # Logging again starts a new flusher.
+        writer.log(1, "token-3")
+        self.assertTrue(writer.thread.is_alive())
+        writer.flush()
+        self.assertEqual([len(batch) for batch in batches], [3, 1])
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class UserTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user(1)
+        # Login rows stay buffered until flush(); no flusher thread runs.
+        for patcher in (
+            patch.object(token_logs, "queue", queue.Queue()),
+            patch.object(token_logs, "_ensure_started"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get_profile(self, token):
+        return self.client.get(
+            reverse("user-profile"), HTTP_AUTHORIZATION=f"Bearer {token}"
+        )
+
+    def logout(self, token):
+        return self.client.post(reverse("logout"), HTTP_AUTHORIZATION=f"Bearer {token}")
+
+
+class TokenLogTests(UserTestCase):
+    def test_logout_before_the_login_row_is_written(self):
+        token = create_token(self.user)["access"]
+        self.assertFalse(UserTokenLog.objects.exists())
+
+        self.assertEqual(self.logout(token).status_code, 200)
+        token_logs.flush()
+
+        rows = UserTokenLog.objects.filter(token_hash=UserTokenLog.hash_token(token))
+        self.assertEqual(
+            list(rows.values_list("user_id", "is_block")), [(self.user.id, 1)]
+        )
+
+    def test_rows_blocked_while_their_batch_is_written(self):
+        token = create_token(self.user)["access"]
+        bulk_create = UserTokenLog.objects.bulk_create
+
+        def logout_then_insert(batch):
+            # The logout lands between the blocked-token check and the insert.
+            UserTokenLog.objects.create(
+                user_id=self.user.id, user_token=token, is_block=1
+            )
+            return bulk_create(batch)
+
+        with patch.object(
+            UserTokenLog.objects, "bulk_create", side_effect=logout_then_insert
+        ):
+            token_logs.flush()
+
+        rows = UserTokenLog.objects.filter(token_hash=UserTokenLog.hash_token(token))
+        self.assertEqual(list(rows.values_list("is_block", flat=True)), [1, 1])
+
+    def test_stats_are_for_admins(self):
+        client = APIClient()
+        url = reverse("token-log-stats")
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get(url).status_code, 403)
+
+        admin = make_user(2, is_staff=True)
+        client.force_authenticate(admin)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["capacity"], token_logs.queue.maxsize)
+
+
+class BloomFilterTests(SimpleTestCase):
+    def test_added_values_are_always_found(self):
+        bloom = BloomFilter(1000, 0.01)
+        values = [uuid.uuid4().hex for _ in range(1000)]
+        for value in values:
+            bloom.add(value)
+        self.assertTrue(all(value in bloom for value in values))
+        self.assertEqual(bloom.count, 1000)
+
+    def test_false_positives_stay_near_the_error_rate(self):
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f"revoked-{i}")
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class RevocationTests(UserTestCase):
+    def test_revoked_token_is_rejected(self):
+        token = create_token(self.user)["access"]
+        self.assertEqual(self.get_profile(token).status_code, 200)
+
+        self.assertEqual(self.logout(token).status_code, 200)
+        self.assertTrue(RevokedToken.objects.filter(jti=decodeJwt(token)["jti"]))
+        self.assertEqual(self.get_profile(token).status_code, 401)
+        # Other tokens of the user still work.
+        self.assertEqual(
+            self.get_profile(create_token(self.user)["access"]).status_code, 200
+        )
+
+    def test_other_processes_see_revocations_after_a_sync(self):
+        other = RevocationList(sync_interval=0)
+        jti = uuid.uuid4().hex
+        self.assertFalse(other.is_revoked(jti))
+
+        revocations.revoke(jti, self.user.id, datetime.now(timezone.utc))
+        cache.clear()  # Only the table is shared.
+        self.assertTrue(other.is_revoked(jti))
+
+    def test_rows_committed_out_of_id_order_are_picked_up(self):
+        other = RevocationList(sync_interval=0)
+        expires_at = datetime.now(timezone.utc) + timedelta(minutes=15)
+        RevokedToken.objects.create(
+            id=100, jti="committed-first", user_id=self.user.id, expires_at=expires_at
+        )
+        other.refresh()
+        self.assertEqual(other.last_id, 100)
+
+        # A logout that took a lower id commits after the sync that saw 100.
+        RevokedToken.objects.create(
+            id=50, jti="committed-late", user_id=self.user.id, expires_at=expires_at
+        )
+        self.assertTrue(other.is_revoked("committed-late"))
+        self.assertTrue(other.is_revoked("committed-first"))
+
+    def test_unrevoked_tokens_cost_no_query(self):
+        revocation_list = RevocationList(sync_interval=60)
+        revocation_list.refresh()
+        with self.assertNumQueries(0):
+            self.assertFalse(revocation_list.is_revoked(uuid.uuid4().hex))
+
+    def test_tokens_without_jti_fall_back_to_the_blacklist(self):
+        payload = {
+            "sub": str(self.user.id),
+            "type": "access",
+            "exp": datetime.now(timezone.utc) + timedelta(minutes=15),
+        }
+        token = "2f." + encodeJwt(payload)
+        self.assertEqual(self.get_profile(token).status_code, 200)
+
+        self.assertEqual(self.logout(token).status_code, 200)
+        self.assertFalse(RevokedToken.objects.exists())
+        self.assertTrue(is_token_blacklisted(token))
+        self.assertEqual(self.get_profile(token).status_code, 401)
+
+
+class AuthUserCacheTests(UserTestCase):
+    def test_rows_are_served_from_memory(self):
+        users = AuthUserCache(ttl=60)
+        self.assertEqual(users.get(self.user.id).email, self.user.email)
+        with self.assertNumQueries(0):
+            user = users.get(str(self.user.id))
+        self.assertEqual(user.firstname, "First1")
+        self.assertIsNone(users.get(self.user.id + 1000))
+
+    def test_saving_a_user_invalidates_every_process(self):
+        # Another process's cache only shares the version key.
+        other = AuthUserCache(ttl=60)
+        other.get(self.user.id)
+        auth_users.get(self.user.id)
+
+        self.user.firstname = "Renamed"
+        self.user.save()
+        self.assertEqual(auth_users.get(self.user.id).firstname, "Renamed")
+        self.assertEqual(other.get(self.user.id).firstname, "Renamed")
+
+    def test_blocked_users_get_401(self):
+        token = create_token(self.user)["access"]
+        self.assertEqual(self.get_profile(token).status_code, 200)
+
+        self.user.is_block = True
+        self.user.save()
+        response = self.get_profile(token)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data["detail"], "Account blocked")
+
+    def test_profile_view_loads_the_full_row(self):
+        Users.objects.filter(id=self.user.id).update(whatsapp="+2348000000001")
+        self.assertIn("whatsapp", auth_users.get(self.user.id).get_deferred_fields())
+
+        token = create_token(self.user)["access"]
+        # The slim row is cached; the profile is one full-row query, not one
+        # query per deferred field.
+        with self.assertNumQueries(1):
+            response = self.get_profile(token)
+        self.assertEqual(response.data["data"]["whatsapp"], "+2348000000001")
+
+
+class TokenLogPruneTests(TestCase):
+    def make_logs(self, count, bucket):
+        return UserTokenLog.objects.bulk_create(
+            UserTokenLog(
+                user_id=1,
+                user_token=f"token-{bucket}-{i}",
+                token_hash=UserTokenLog.hash_token(f"token-{bucket}-{i}"),
+                bucket=bucket,
+            )
+            for i in range(count)
+        )
+
+    def test_add_months(self):
+        self.assertEqual(partitions.add_months(202411, 2), 202501)
+        self.assertEqual(partitions.add_months(202501, -1), 202412)
+        self.assertEqual(partitions.add_months(202406, 0), 202406)
+
+    def test_delete_in_batches(self):
+        self.make_logs(7, 202401)
+        self.make_logs(2, 202402)
+        old = UserTokenLog.objects.filter(bucket=202401)
+        # Three batches of ids and their deletes, then the empty batch.
+        with self.assertNumQueries(7):
+            self.assertEqual(partitions.delete_in_batches(old, batch_size=3), 7)
+        self.assertEqual(
+            list(UserTokenLog.objects.values_list("bucket", flat=True)),
+            [202402, 202402],
+        )
+
+    def test_prune_command(self):
+        now = django_timezone.now()
+        current = token_log_bucket(now)
+        self.make_logs(3, partitions.add_months(current, -4))
+        self.make_logs(2, current)
+        RevokedToken.objects.create(
+            jti="expired", user_id=1, expires_at=now - timedelta(minutes=1)
+        )
+        RevokedToken.objects.create(
+            jti="active", user_id=1, expires_at=now + timedelta(minutes=15)
+        )
+
+        out = io.StringIO()
+        call_command("prune_token_logs", retention_days=90, batch_size=2, stdout=out)
+        self.assertIn(
+            "Deleted 3 token log rows and 1 expired revoked tokens.", out.getvalue()
+        )
+        self.assertEqual(
+            set(UserTokenLog.objects.values_list("bucket", flat=True)), {current}
+        )
+        self.assertEqual(
+            list(RevokedToken.objects.values_list("jti", flat=True)), ["active"]
+        )
@@ -0,0 +1,205 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from django.db import close_old_connections
+from django.db.models import Exists, OuterRef
+from raininfotech.settings import (
+    TOKEN_LOG_ASYNC,
+    TOKEN_LOG_BATCH_SIZE,
+    TOKEN_LOG_FLUSH_SECONDS,
+    TOKEN_LOG_QUEUE_SIZE,
+)
+from users.models import UserTokenLog
+
+logger = logging.getLogger(__name__)
+
+# Queued by flush() to make the flusher write what it holds and exit.
+STOP = object()
+# How long flush() waits for the flusher to finish its batch.
+STOP_TIMEOUT = 5.0
+
+
+class TokenLogWriter:
+    """
+    Buffers UserTokenLog rows in-process and writes them with bulk_create
+    from a background thread, once ``batch_size`` rows are queued or
+    ``flush_interval`` seconds have passed, and once more at interpreter
+    exit.
+
+    A logout can reach the database before its token's login row: it then
+    finds nothing to block and inserts a blocked row itself. Rows of tokens
+    already blocked that way are dropped when the batch is written, and
+    any that slip past that check are blocked right after the insert.
+
+    The queue is bounded. When it is full the caller waits up to
+    ``put_timeout`` seconds and then writes its own row synchronously, so a
+    burst slows logins down instead of dropping log entries; ``stats()``
+    reports how often that happened.
+    """
+
+    def __init__(
+        self,
+        batch_size=200,
+        flush_interval=1.0,
+        max_queued=10000,
+        put_timeout=0.05,
+        enabled=True,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.enabled = enabled
+        self.queue = queue.Queue(maxsize=max_queued)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.pid = None
+        self.counts = {
+            "queued": 0,
+            "written": 0,
+            "batches": 0,
+            "overflow": 0,
+            "failed": 0,
+            "max_depth": 0,
+        }
+        atexit.register(self.flush)
+
+    def log(self, user_id, token, is_block=0):
+        entry = UserTokenLog(user_id=user_id, user_token=token, is_block=is_block)
+        entry.set_derived_fields()
+        if not self.enabled:
+            self._write([entry])
+            return
+        self._ensure_started()
+        try:
+            self.queue.put(entry, timeout=self.put_timeout)
+        except queue.Full:
+            self._count("overflow")
+            self._write([entry])
+            return
+        depth = self.queue.qsize()
+        with self.lock:
+            self.counts["queued"] += 1
+            self.counts["max_depth"] = max(self.counts["max_depth"], depth)
+
+    def flush(self):
+        """
+        Write every row logged so far: stop the flusher, which writes the
+        batch it holds, then drain the queue from the calling thread. The
+        next log() starts a new flusher.
+        """
+        thread = self.thread
+        if (
+            thread is not None
+            and thread is not threading.current_thread()
+            and self.pid == os.getpid()
+            and thread.is_alive()
+        ):
+            try:
+                self.queue.put(STOP, timeout=STOP_TIMEOUT)
+            except queue.Full:
+                pass
+            thread.join(STOP_TIMEOUT)
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                return
+            self._write(batch)
+
+    def stats(self):
+        with self.lock:
+            counts = dict(self.counts)
+        counts["depth"] = self.queue.qsize()
+        counts["capacity"] = self.queue.maxsize
+        return counts
+
+    def _ensure_started(self):
+        # Threads do not survive fork(), so a pre-forking server gets one
+        # flusher per worker process.
+        if self.pid == os.getpid() and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.pid == os.getpid() and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(
+                target=self._run, name="token-log-writer", daemon=True
+            )
+            self.pid = os.getpid()
+            self.thread.start()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            deadline = time.monotonic() + self.flush_interval
+            batch = []
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if entry is STOP:
+                    stopping = True
+                    break
+                batch.append(entry)
+            if batch:
+                close_old_connections()
+                self._write(batch)
+        close_old_connections()
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                entry = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not STOP:
+                batch.append(entry)
+        return batch
+
+    def _write(self, batch):
+        hashes = {entry.token_hash for entry in batch}
+        try:
+            blocked = set(
+                UserTokenLog.objects.filter(token_hash__in=hashes, is_block=1)
+                .values_list("user_id", "token_hash")
+            )
+            batch = [
+                entry
+                for entry in batch
+                if (entry.user_id, entry.token_hash) not in blocked
+            ]
+            UserTokenLog.objects.bulk_create(batch)
+            # A logout that blocked a token while this batch was written.
+            UserTokenLog.objects.filter(token_hash__in=hashes, is_block=0).filter(
+                Exists(
+                    UserTokenLog.objects.filter(
+                        user_id=OuterRef("user_id"),
+                        token_hash=OuterRef("token_hash"),
+                        is_block=1,
+                    )
+                )
+            ).update(is_block=1)
+        except Exception:
+            logger.exception("Error logging %d token(s)", len(batch))
+            self._count("failed", len(batch))
+            return
+        self._count("written", len(batch))
+        self._count("batches")
+
+    def _count(self, name, amount=1):
+        with self.lock:
+            self.counts[name] += amount
+
+
+token_logs = TokenLogWriter(
+    batch_size=TOKEN_LOG_BATCH_SIZE,
+    flush_interval=TOKEN_LOG_FLUSH_SECONDS,
+    max_queued=TOKEN_LOG_QUEUE_SIZE,
+    enabled=TOKEN_LOG_ASYNC,
+)
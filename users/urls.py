@@ -6,6 +6,7 @@ from .views import (
     VerifyOtpLoginView,
     HealthCheckView,
     LogoutUserView,
+    TokenLogStatsView,
     PasswordResetView,
     UserProfileView,
     OwnerReviewListView,
@@ -21,6 +22,7 @@ urlpatterns = [
     path("auth/login/", UserLoginView.as_view(), name="user_login"),
     path("auth/verify-otp/", VerifyOtpLoginView.as_view(), name="verify-otp"),
     path("auth/logout/", LogoutUserView.as_view(), name="logout"),
+    path("auth/token-logs/stats/", TokenLogStatsView.as_view(), name="token-log-stats"),
     path("auth/password-reset/", PasswordResetView.as_view(), name="password_reset"),
     path("users/profile/", UserProfileView.as_view(), name="user-profile"),
     path("owners/<int:owner_id>/reviews/", OwnerReviewListView.as_view(), name="owner-review-list"),
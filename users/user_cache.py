@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import OrderedDict
+from django.core.cache import cache
+from raininfotech.settings import AUTH_USER_CACHE_SECONDS
+from users.models import Users
+
+# Columns needed to authenticate and authorize a request; anything else is
+# deferred and loaded on first access. Kept in model field order, which
+# Model.from_db() expects.
+AUTH_FIELDS = tuple(
+    f.attname
+    for f in Users._meta.concrete_fields
+    if f.attname
+    in {
+        "id",
+        "email",
+        "firstname",
+        "lastname",
+        "telephone",
+        "user_type",
+        "is_block",
+        "is_active",
+        "is_staff",
+        "is_superuser",
+    }
+)
+
+
+class AuthUserCache:
+    """
+    Short-lived per-process cache of the slim user row used by
+    JWTAuthentication.
+
+    Entries are stamped with a per-user version kept in the shared cache and
+    bumped whenever the user is saved, so edits (including blocking) are
+    seen by every process as soon as the cache propagates them, and by
+    ``ttl`` seconds at the latest for writes that bypass save().
+    """
+
+    def __init__(self, ttl, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        user_id = int(user_id)
+        version = cache.get(self.version_key(user_id))
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry and entry[0] > now and entry[1] == version:
+                self.entries.move_to_end(user_id)
+                return self.build(entry[2])
+
+        values = Users.objects.filter(id=user_id).values_list(*AUTH_FIELDS).first()
+        if values is None:
+            return None
+        with self.lock:
+            self.entries[user_id] = (now + self.ttl, version, values)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return self.build(values)
+
+    def build(self, values):
+        # A fresh instance per request, so callers never share state.
+        return Users.from_db(Users.objects.db, AUTH_FIELDS, values)
+
+    def invalidate(self, user_id):
+        user_id = int(user_id)
+        with self.lock:
+            self.entries.pop(user_id, None)
+        key = self.version_key(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Seed from the clock so a lost key never matches an old stamp.
+            cache.set(key, time.time_ns(), timeout=None)
+
+    def version_key(self, user_id):
+        return f"auth_user_version:{user_id}"
+
+
+auth_users = AuthUserCache(ttl=AUTH_USER_CACHE_SECONDS)
@@ -1,5 +1,4 @@
 import random
-from django.db.models import Avg, Count
 from rest_framework.views import APIView
 from django.db import transaction, IntegrityError
 from django.core.cache import cache
@@ -7,10 +6,13 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from django.contrib.auth.hashers import make_password, check_password
 from rest_framework import status, generics, permissions
-from raininfotech.helper import create_token, email_validation, cache_set
+from datetime import datetime, timezone
+from raininfotech.helper import create_token, decodeJwt, email_validation, cache_set
 from .serializers import UserSerializer, UserProfileSerializer, OwnerReviewSerializer
 import traceback
 from users.models import Users, UserTokenLog, OwnerReview
+from users.revocation import revocations
+from users.token_log import token_logs
 from users.utils import (
     data_sanitization,
     phone_no_validation,
@@ -323,7 +325,7 @@ class LogoutUserView(APIView):
 
         # Block token in DB
         token_log = UserTokenLog.objects.filter(
-            user_id=user.id, user_token=token
+            user_id=user.id, token_hash=UserTokenLog.hash_token(token)
         ).first()
 
         if token_log:
@@ -334,14 +336,29 @@ class LogoutUserView(APIView):
                 user_id=user.id, user_token=token, is_block=True
             )
 
-        # Blacklist in Redis
-        blacklist_token(token)
+        # Revoke by jti; tokens issued before jti existed use the cache blacklist
+        payload = decodeJwt(token) or {}
+        if payload.get("jti"):
+            revocations.revoke(
+                payload["jti"],
+                user.id,
+                datetime.fromtimestamp(payload["exp"], tz=timezone.utc),
+            )
+        else:
+            blacklist_token(token)
 
         return Response(
             {"message": "Successfully logged out."}, status=status.HTTP_200_OK
         )
 
 
+class TokenLogStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(token_logs.stats(), status=status.HTTP_200_OK)
+
+
 class PasswordResetView(APIView):
     permission_classes = [AllowAny]
 
@@ -455,7 +472,8 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
+        # request.user is the slim authentication row; load the full profile.
+        return Users.objects.get(pk=self.request.user.pk)
 
     def get(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -488,8 +506,14 @@ class OwnerReviewListView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def get(self, request, owner_id):
-        reviews = OwnerReview.objects.filter(owner_id=owner_id).order_by("-created_at")
-        stats = reviews.aggregate(avg=Avg("rating"), count=Count("id"))
+        reviews = (
+            OwnerReview.objects.filter(owner_id=owner_id)
+            .select_related("reviewer")
+            .order_by("-created_at")
+        )
+        owner = Users.objects.filter(id=owner_id).values(
+            "rating", "review_count"
+        ).first() or {"rating": None, "review_count": 0}
         serializer = OwnerReviewSerializer(reviews, many=True)
 
         formatted_reviews = [
@@ -506,8 +530,10 @@ class OwnerReviewListView(APIView):
         return Response(
             {
                 "reviews": {
-                    "total_reviews": stats["count"],
-                    "average_rating": stats["avg"],  # ❌ Do not round
+                    "total_reviews": owner["review_count"],
+                    "average_rating": (
+                        owner["rating"] if owner["review_count"] else None
+                    ),  # ❌ Do not round
                     "reviews_list": formatted_reviews,
                 }
             }